@@ -15,6 +15,36 @@ if _env_path.exists():
 
 GOOGLE_BOOKS_API_KEY = os.environ.get("GOOGLE_BOOKS_API_KEY", "")
 
+# Outbound HTTP (books/transport.py) — shared keep-alive pools for the provider clients
+HTTP_TIMEOUT = (3.05, 8)   # (connect, read) seconds, used by every provider call
+HTTP_RETRIES = 2           # retries on connection errors and 429/5xx, with exponential backoff
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_POOL_SIZE = 10        # connections per host not listed below
+HTTP_POOL_SIZES = {
+    "openlibrary.org": 8,
+    "inventaire.io": 4,
+    "www.googleapis.com": 4,
+    "www.goodreads.com": 1,
+}
+# Per-host token buckets: (requests per second, burst). Hosts not listed use HTTP_RATE_LIMIT.
+HTTP_RATE_LIMIT = (10.0, 10)
+HTTP_RATE_LIMITS = {
+    "openlibrary.org": (5.0, 8),
+    "inventaire.io": (3.0, 4),
+    "www.googleapis.com": (5.0, 4),
+    "www.goodreads.com": (1 / 1.5, 1),
+}
+HTTP_RATE_LIMIT_WAIT = 5.0    # seconds a call may queue for a token before failing fast
+HTTP_BREAKER_FAILURES = 5     # consecutive failures that open a host's circuit breaker
+HTTP_BREAKER_RESET = 30.0     # seconds an open breaker waits before letting a probe through
+
+# Upload snapshots (books/snapshots.py) — re-uploading an identical CSV restores these
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+SNAPSHOT_MAX_BYTES = 200 * 1024 * 1024   # least recently used snapshots are evicted beyond this
+GRAPH_CACHE_MAX_BYTES = 64 * 1024 * 1024  # compressed ego-graph pages kept in memory (LRU)
+PRECOMPUTE_RECOMMENDATIONS = True         # render every read book's ego graph once enrichment is done
+PRECOMPUTE_TOP_N = 50                     # only the N best-rated books (None: all)
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from books import corpus
+
+logger = logging.getLogger(__name__)
+
+# Titles per IN query — keeps each query well under SQLite's bound-parameter limit.
+PREFETCH_BATCH_SIZE = 500
+
+# Write-behind buffer: flush once this many books have pending changes,
+# or FLUSH_INTERVAL seconds after the first unflushed change.
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 5.0
+
+# Merge rules applied by update_book():
+#   flags   — only ever go from False to True (never downgrade is_read)
+#   fill    — only written while the stored value is empty (never overwrite a cover)
+#   replace — the newest fetch wins
+#   append  — list entries are added, never removed or reordered
+_FLAG_FIELDS = {
+    "is_read", "openlibrary_fetched", "inventaire_fetched", "google_books_fetched", "description_fetched",
+}
+_FILL_FIELDS = {
+    "cover_url", "openlibrary_id", "inventaire_uri", "description", "page_count",
+    "publisher", "published_date", "first_publish_year", "isbn_13", "isbn_10", "language",
+    "ol_ratings_average", "ol_ratings_count", "want_to_read_count",
+}
+_REPLACE_FIELDS = {"subjects", "award_slugs", "google_books_genres"}
+_APPEND_FIELDS = {"found_by_subjects", "found_by_award_slugs"}
+
+_LOCK = threading.Lock()
+_FLUSH_LOCK = threading.Lock()
+
+# (title, author) → CachedBook, or None when the pair is known to have no row.
+# Holds the prefetched pairs plus any pair with unflushed changes; the objects
+# reflect buffered writes, so lookups never see stale data.
+_ROWS: dict = {}
+_PREFETCHED: set = set()
+
+# (title, author) → names of fields changed since the last flush
+_PENDING: dict = {}
+_flush_timer = None
+
+
+def prefetch(pairs) -> None:
+    """Load the CachedBook rows for every (title, author) pair in a few IN queries.
+
+    Replaces whatever was prefetched for the previous upload (after flushing
+    its pending writes). Pairs without a row are remembered as misses so the
+    provider clients skip the DB lookup for them as well.
+    """
+    from books.models import CachedBook
+
+    flush()
+    wanted = set(pairs)
+    rows = dict.fromkeys(wanted)
+    titles = sorted({title for title, _ in wanted})
+    for start in range(0, len(titles), PREFETCH_BATCH_SIZE):
+        batch = titles[start:start + PREFETCH_BATCH_SIZE]
+        for obj in CachedBook.objects.filter(title__in=batch):
+            key = (obj.title, obj.author)
+            if key in wanted:
+                rows[key] = obj
+
+    with _LOCK:
+        _ROWS.clear()
+        _ROWS.update(rows)
+        _PREFETCHED.clear()
+        _PREFETCHED.update(wanted)
+
+
+def get_cached_book(title: str, author: str):
+    """Return the CachedBook for (title, author), or None if there is no row.
+
+    Prefetched pairs and pairs with buffered writes are answered from memory;
+    anything else falls through to a single DB query.
+    """
+    key = (title, author)
+    with _LOCK:
+        if key in _ROWS:
+            return _ROWS[key]
+
+    from books.models import CachedBook
+    try:
+        return CachedBook.objects.get(title=title, author=author)
+    except CachedBook.DoesNotExist:
+        return None
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == []
+
+
+def update_book(title: str, author: str, **fields) -> None:
+    """Buffer field updates for one CachedBook; they are written by flush().
+
+    Values are merged into the in-memory row immediately using the rules
+    above, so later lookups in the same pass (and the local corpus) see
+    them. Empty values for flag/fill fields are ignored. Creates the row on
+    flush if it does not exist yet.
+    """
+    from books.models import CachedBook
+
+    key = (title, author)
+    with _LOCK:
+        # Read the DB under the lock: flush() only drops a key from _ROWS after
+        # its row is committed, so a row is either here or visible to the query,
+        # and no second unsaved CachedBook is ever built for the same pair.
+        if key in _ROWS:
+            obj = _ROWS[key]
+        else:
+            obj = CachedBook.objects.filter(title=title, author=author).first()
+        if obj is None:
+            obj = CachedBook(title=title, author=author)
+        _ROWS[key] = obj
+
+        changed = _PENDING.setdefault(key, set())
+        for name, value in fields.items():
+            current = getattr(obj, name, None)
+            if name in _FLAG_FIELDS:
+                if value and not current:
+                    setattr(obj, name, True)
+                    changed.add(name)
+            elif name in _FILL_FIELDS:
+                if not _is_empty(value) and _is_empty(current):
+                    setattr(obj, name, value)
+                    changed.add(name)
+            elif name in _REPLACE_FIELDS:
+                if value != current:
+                    setattr(obj, name, value)
+                    changed.add(name)
+            elif name in _APPEND_FIELDS:
+                new = [v for v in value if v not in current]
+                if new:
+                    setattr(obj, name, current + new)
+                    changed.add(name)
+            else:
+                raise ValueError(f"Unknown CachedBook field: {name}")
+
+        if not changed and obj.pk is not None:
+            del _PENDING[key]
+        due = len(_PENDING) >= FLUSH_EVERY
+
+    if changed:
+        corpus.note(obj)
+    if due:
+        flush()
+    elif _PENDING:
+        _schedule_flush()
+
+
+def _schedule_flush() -> None:
+    global _flush_timer
+    with _LOCK:
+        if _flush_timer is not None:
+            return
+        _flush_timer = threading.Timer(FLUSH_INTERVAL, _timed_flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def _timed_flush() -> None:
+    from django.db import connection
+    try:
+        flush()
+    finally:
+        connection.close()
+
+
+def flush() -> None:
+    """Write all buffered changes: one bulk_create for new rows plus one
+    bulk_update per changed-field set, inside a single transaction.
+    """
+    global _flush_timer
+    from django.db import DatabaseError, transaction
+    from books.models import CachedBook
+
+    with _FLUSH_LOCK:
+        with _LOCK:
+            if _flush_timer is not None:
+                _flush_timer.cancel()
+                _flush_timer = None
+            pending = dict(_PENDING)
+            _PENDING.clear()
+            objs = {key: _ROWS[key] for key in pending}
+        if not pending:
+            return
+
+        created = [obj for obj in objs.values() if obj.pk is None]
+        by_fields = defaultdict(list)
+        for key, obj in objs.items():
+            if obj.pk is not None and pending[key]:
+                by_fields[tuple(sorted(pending[key]))].append(obj)
+
+        try:
+            with transaction.atomic():
+                CachedBook.objects.bulk_create(created)
+                for names, group in by_fields.items():
+                    CachedBook.objects.bulk_update(group, names)
+        except DatabaseError:
+            # Keep the changes buffered and retry on the next flush.
+            logger.exception("Could not write %d buffered CachedBook changes", len(pending))
+            with _LOCK:
+                for key, names in pending.items():
+                    _PENDING.setdefault(key, set()).update(names)
+            for obj in created:
+                obj.pk = None
+            return
+
+        with _LOCK:
+            for key in pending:
+                if key not in _PREFETCHED and key not in _PENDING:
+                    _ROWS.pop(key, None)
+
+
+def clear() -> None:
+    flush()
+    with _LOCK:
+        _ROWS.clear()
+        _PREFETCHED.clear()
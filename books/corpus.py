@@ -0,0 +1,143 @@
+import threading
+
+# Local candidate retrieval over CachedBook for the OpenLibrary subject, award
+# and era fetchers. Every book those fetchers return is persisted, together
+# with the subject or award it was found for (found_by_subjects /
+# found_by_award_slugs), its want_to_read_count and its first publish year,
+# so the corpus grows with every network answer. Books are indexed under
+# their work data's subjects and awards plus those search tags.
+
+_LOCK = threading.Lock()
+_ENTRIES = None      # (title, author) → candidate dict; None until first used
+_BY_SUBJECT = {}     # subject.lower() → {(title, author), ...}
+_BY_AWARD = {}       # award slug → {(title, author), ...}
+_BY_DECADE = {}      # decade start → {(title, author), ...}
+_STATS = {"local": 0, "network": 0}
+
+
+def _index(key, row) -> None:
+    """(Re-)index one row; row is a CachedBook or an object with the same fields."""
+    old = _ENTRIES.pop(key, None)
+    if old is not None:
+        _unindex(key, old)
+    year = row.first_publish_year
+    entry = {
+        "title": row.title,
+        "author": row.author,
+        "cover_url": row.cover_url or None,
+        "openlibrary_id": row.openlibrary_id or None,
+        "want_to_read_count": row.want_to_read_count or 0,
+        "first_publish_year": year,
+        "is_read": row.is_read,
+        "subjects": {s.lower() for s in [*(row.subjects or ()), *(row.found_by_subjects or ())]},
+        "award_slugs": {*(row.award_slugs or ()), *(row.found_by_award_slugs or ())},
+        "decade": (year // 10) * 10 if year else None,
+    }
+    if not (entry["subjects"] or entry["award_slugs"] or entry["decade"]):
+        return
+    _ENTRIES[key] = entry
+    for subject in entry["subjects"]:
+        _BY_SUBJECT.setdefault(subject, set()).add(key)
+    for slug in entry["award_slugs"]:
+        _BY_AWARD.setdefault(slug, set()).add(key)
+    if entry["decade"] is not None:
+        _BY_DECADE.setdefault(entry["decade"], set()).add(key)
+
+
+def _drop(index, name, key) -> None:
+    bucket = index.get(name)
+    if bucket is not None:
+        bucket.discard(key)
+        if not bucket:
+            del index[name]
+
+
+def _unindex(key, entry) -> None:
+    for subject in entry["subjects"]:
+        _drop(_BY_SUBJECT, subject, key)
+    for slug in entry["award_slugs"]:
+        _drop(_BY_AWARD, slug, key)
+    if entry["decade"] is not None:
+        _drop(_BY_DECADE, entry["decade"], key)
+
+
+def _load() -> None:
+    """Build the index from every CachedBook row. Call with _LOCK held.
+
+    Buffered writes are flushed first; writes made while the rows are read
+    wait in note() until the index exists and are applied on top of it.
+    """
+    global _ENTRIES
+    from books import book_cache
+    from books.models import CachedBook
+
+    book_cache.flush()
+    _ENTRIES = {}
+    for row in CachedBook.objects.only(
+        "title", "author", "cover_url", "openlibrary_id", "want_to_read_count",
+        "first_publish_year", "is_read", "subjects", "award_slugs",
+        "found_by_subjects", "found_by_award_slugs",
+    ).iterator():
+        _index((row.title, row.author), row)
+
+
+def note(row) -> None:
+    """Re-index a CachedBook after book_cache merged a change into it."""
+    with _LOCK:
+        if _ENTRIES is not None:
+            _index((row.title, row.author), row)
+
+
+def _candidates(index, name, limit, where=None) -> list:
+    """Unread books filed under index[name], most wanted-to-read first, as fetcher result dicts."""
+    with _LOCK:
+        if _ENTRIES is None:
+            _load()
+        entries = [_ENTRIES[key] for key in index.get(name, ())]
+    entries = [e for e in entries if not e["is_read"] and (where is None or where(e))]
+    entries.sort(key=lambda e: (-e["want_to_read_count"], e["title"], e["author"]))
+    return [{
+        "title": e["title"],
+        "author": e["author"],
+        "cover_url": e["cover_url"],
+        "want_to_read_count": e["want_to_read_count"],
+        "openlibrary_id": e["openlibrary_id"],
+        "first_publish_year": e["first_publish_year"],
+    } for e in entries[:limit]]
+
+
+def books_by_subject(subject: str, limit: int) -> list:
+    """Up to `limit` unread CachedBooks listing `subject` (case-insensitive)."""
+    return _candidates(_BY_SUBJECT, subject.lower(), limit)
+
+
+def books_by_award(award_slug: str, limit: int) -> list:
+    """Up to `limit` unread CachedBooks that won the award."""
+    return _candidates(_BY_AWARD, award_slug, limit)
+
+
+def books_by_era(decade_start: int, subject, limit: int) -> list:
+    """Up to `limit` unread CachedBooks first published in the decade, listing `subject` if given."""
+    where = None if not subject else (lambda e: subject.lower() in e["subjects"])
+    return _candidates(_BY_DECADE, decade_start, limit, where)
+
+
+def record(answered_locally: bool) -> None:
+    """Count a subject, award or era lookup as answered locally or from the network."""
+    with _LOCK:
+        _STATS["local" if answered_locally else "network"] += 1
+
+
+def clear() -> None:
+    """Forget the index; it is rebuilt from the DB on next use."""
+    global _ENTRIES
+    with _LOCK:
+        _ENTRIES = None
+        _BY_SUBJECT.clear()
+        _BY_AWARD.clear()
+        _BY_DECADE.clear()
+
+
+def stats() -> dict:
+    with _LOCK:
+        return {**_STATS, "books": len(_ENTRIES or ())}
@@ -0,0 +1,222 @@
+import queue
+import threading
+
+from books.graph_engine.extract import _apply_gb_genres, _apply_ol_data
+from books.inventaire.client import fetch_cover as inventaire_fetch_cover
+from books.openlibrary.client import (
+    ISBN_BATCH_SIZE,
+    fetch_cover_for_read_book,
+    fetch_description,
+    fetch_work_data,
+    fetch_work_data_by_isbn,
+)
+
+# Worker threads per provider stage. Each upstream gets its own bounded pool,
+# so a slow provider only backs up its own queue.
+STAGE_WORKERS = {
+    "work_data": 4,      # OpenLibrary search + works API
+    "ol_cover": 2,       # OpenLibrary cover search
+    "inventaire": 2,     # Inventaire cover search
+    "google_books": 2,   # Google Books categories
+    "description": 2,    # OpenLibrary edition/work record, for ISBN-enriched books
+}
+
+# Concurrent /api/books requests during the ISBN pass
+ISBN_WORKERS = 4
+
+
+# ── Stage bodies ──────────────────────────────────────────────────────────────
+# Each takes (book, is_read), mutates the BookNode in place, and returns the
+# name of the next stage (or None when the book is finished).
+
+def _work_data(book, is_read):
+    _apply_ol_data(book, fetch_work_data(book.title, book.author, is_read=is_read))
+    if not book.cover_url:
+        return "ol_cover"
+    return "google_books" if is_read else None
+
+
+def _ol_cover(book, is_read):
+    cover = fetch_cover_for_read_book(book.title, book.author, is_read=is_read)
+    if cover:
+        book.cover_url = cover
+        return "google_books" if is_read else None
+    return "inventaire" if is_read else None
+
+
+def _inventaire(book, is_read):
+    cover = inventaire_fetch_cover(book.title, book.author)
+    if cover:
+        book.cover_url = cover
+    return "google_books"
+
+
+def _google_books(book, is_read):
+    _apply_gb_genres(book)
+    # None until OL has been asked (books enriched by ISBN); "" once it had none.
+    return "description" if book.description is None and book.openlibrary_id else None
+
+
+def _description(book, is_read):
+    book.description = fetch_description(book.title, book.author, book.openlibrary_id)
+    return None
+
+
+_STAGES = {
+    "work_data": _work_data,
+    "ol_cover": _ol_cover,
+    "inventaire": _inventaire,
+    "google_books": _google_books,
+    "description": _description,
+}
+
+
+def _first_stage(book, is_read):
+    """Where a book enters the pipeline.
+
+    Only books missing a cover or subjects hit OpenLibrary; read books always
+    get the (DB-cached) Google Books genres step.
+    """
+    if not book.cover_url or not book.subjects:
+        return "work_data"
+    return "google_books" if is_read else None
+
+
+# ── Pipeline ──────────────────────────────────────────────────────────────────
+
+def enrich_concurrently(books, is_read=True, on_book_done=None, should_stop=None):
+    """Enrich BookNodes through per-provider stages connected by queues.
+
+    Read books: work_data → ol_cover → inventaire → google_books →
+    description, where the cover stages are skipped once a cover is found
+    and the description stage only runs for books without one. Want-to-read books
+    (is_read=False) only go through work_data and ol_cover.
+
+    A book is in exactly one stage at a time, so BookNodes are never mutated
+    concurrently. on_book_done(book) is called (from a worker thread) as each
+    book leaves the pipeline. Blocks until every book is finished.
+
+    should_stop() is checked before every stage: once it returns True, the
+    books still in the pipeline are dropped without further stages or
+    on_book_done calls (used to stop an upload job a newer upload replaced).
+    """
+    books = list(books)
+    if not books:
+        return
+
+    def stopped():
+        return should_stop is not None and should_stop()
+
+    queues = {name: queue.Queue() for name in _STAGES}
+    remaining = len(books)
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def complete(book):
+        nonlocal remaining
+        if on_book_done is not None and not stopped():
+            try:
+                on_book_done(book)
+            except Exception:
+                pass
+        with lock:
+            remaining -= 1
+            if remaining == 0:
+                finished.set()
+
+    def dispatch(book, stage):
+        if stage is None:
+            complete(book)
+        else:
+            queues[stage].put(book)
+
+    def worker(stage):
+        from django.db import connection
+        try:
+            while True:
+                book = queues[stage].get()
+                if book is None:
+                    return
+                try:
+                    next_stage = None if stopped() else _STAGES[stage](book, is_read)
+                except Exception:
+                    next_stage = None  # Never let a single book stall the pipeline
+                dispatch(book, next_stage)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(stage,), daemon=True)
+        for stage, count in STAGE_WORKERS.items()
+        for _ in range(count)
+    ]
+    for t in threads:
+        t.start()
+
+    for book in books:
+        dispatch(book, _first_stage(book, is_read))
+
+    finished.wait()
+    for stage, count in STAGE_WORKERS.items():
+        for _ in range(count):
+            queues[stage].put(None)
+
+
+# ── ISBN pass ─────────────────────────────────────────────────────────────────
+
+def enrich_by_isbn(books, is_read=True, should_stop=None):
+    """Fill BookNodes from OpenLibrary's multi-key books API before the pipeline.
+
+    Books with an ISBN are looked up ISBN_BATCH_SIZE at a time (ISBN_WORKERS
+    batches in flight), so a library costs a handful of requests instead of
+    two per book. Hits come back with subjects and usually a cover, and are
+    cached as openlibrary_fetched, so enrich_concurrently skips or short-cuts
+    them; only ISBN misses and books without an ISBN still go through the
+    title search. No further batches are looked up once should_stop()
+    returns True.
+
+    Returns the number of books that matched by ISBN.
+    """
+    with_isbn = [book for book in books if book.isbn_13 or book.isbn_10]
+    batches = queue.Queue()
+    for start in range(0, len(with_isbn), ISBN_BATCH_SIZE):
+        batches.put(with_isbn[start:start + ISBN_BATCH_SIZE])
+    hits = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal hits
+        from django.db import connection
+        try:
+            while True:
+                if should_stop is not None and should_stop():
+                    return
+                try:
+                    batch = batches.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    results = fetch_work_data_by_isbn(
+                        [(b.title, b.author, b.isbn_13, b.isbn_10) for b in batch],
+                        is_read=is_read,
+                    )
+                except Exception:
+                    continue
+                for book in batch:
+                    data = results.get((book.title, book.author))
+                    if data:
+                        _apply_ol_data(book, data)
+                with lock:
+                    hits += len(results)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(min(ISBN_WORKERS, batches.qsize()))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return hits
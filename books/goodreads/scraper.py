@@ -1,11 +1,11 @@
 import json
 import re
-import time
 
-import requests
+from books import transport
+from books.singleflight import single_flight
 
-# Polite delay between Goodreads requests (personal use only)
-_DELAY = 1.5
+# Requests are paced by the www.goodreads.com token bucket in
+# settings.HTTP_RATE_LIMITS (one every 1.5 s — personal use only).
 
 _HEADERS = {
     "User-Agent": (
@@ -52,8 +52,8 @@ def _genres_from_cachedbook(title: str, author: str) -> list:
     if not title or not author:
         return []
     try:
-        from books.models import CachedBook
-        obj = CachedBook.objects.filter(title=title, author=author).first()
+        from books.book_cache import get_cached_book
+        obj = get_cached_book(title, author)
         if obj is None:
             return []
         # Prefer google_books_genres; fall back to OL subjects
@@ -62,6 +62,10 @@ def _genres_from_cachedbook(title: str, author: str) -> list:
         return []
 
 
+@single_flight(
+    "goodreads.genres",
+    key=lambda goodreads_id, title="", author="": str(goodreads_id).strip(),
+)
 def fetch_genres(goodreads_id: str, title: str = "", author: str = "") -> list:
     """Return crowd-sourced genre tags for a book from Goodreads.
 
@@ -95,9 +99,8 @@ def fetch_genres(goodreads_id: str, title: str = "", author: str = "") -> list:
     # ── Scrape Goodreads book page ─────────────────────────────────────────────
     genres = []
     try:
-        time.sleep(_DELAY)
         url = f"https://www.goodreads.com/book/show/{gid}"
-        resp = requests.get(url, headers=_HEADERS, timeout=12)
+        resp = transport.get(url, headers=_HEADERS)
         print(f"[Goodreads] {title!r} (id={gid}) → HTTP {resp.status_code}")
         if resp.status_code == 200:
             match = re.search(
@@ -1,20 +1,20 @@
-import requests
 from django.conf import settings
 
+from books import transport
+from books.book_cache import get_cached_book, update_book
+from books.singleflight import single_flight
+
 _BASE = "https://www.googleapis.com/books/v1/volumes"
 
 
 def _mark_fetched(title: str, author: str, genres: list) -> None:
     try:
-        from books.models import CachedBook
-        obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-        obj.google_books_genres = genres
-        obj.google_books_fetched = True
-        obj.save(update_fields=["google_books_genres", "google_books_fetched"])
+        update_book(title, author, google_books_genres=genres, google_books_fetched=True)
     except Exception:
         pass
 
 
+@single_flight("google_books.categories")
 def fetch_categories(title: str, author: str) -> list:
     """Fetch genre categories for a book from the Google Books API.
 
@@ -25,15 +25,10 @@ def fetch_categories(title: str, author: str) -> list:
     Each slash-separated segment is split and deduplicated to give
     clean tags like ["Fiction", "Fantasy", "General"].
     """
-    from books.models import CachedBook
-
     # ── Permanent DB lookup ────────────────────────────────────────────────────
-    try:
-        record = CachedBook.objects.get(title=title, author=author)
-        if record.google_books_fetched:
-            return record.google_books_genres
-    except CachedBook.DoesNotExist:
-        pass
+    record = get_cached_book(title, author)
+    if record is not None and record.google_books_fetched:
+        return record.google_books_genres
 
     # ── Google Books API call ──────────────────────────────────────────────────
     params = {
@@ -47,7 +42,7 @@ def fetch_categories(title: str, author: str) -> list:
         params["key"] = api_key
 
     try:
-        resp = requests.get(_BASE, params=params, timeout=8)
+        resp = transport.get(_BASE, params=params)
         if resp.status_code != 200:
             # Mark as fetched anyway so we don't retry on every upload
             _mark_fetched(title, author, [])
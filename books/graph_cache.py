@@ -0,0 +1,126 @@
+import threading
+import weakref
+import gzip
+from collections import OrderedDict
+
+from django.conf import settings
+
+from books.graph_engine import state
+
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_LOCK = threading.Lock()
+_ENTRIES = OrderedDict()   # key → gzip-compressed page, least recently used first
+_SIZE = 0                  # total compressed bytes in _ENTRIES
+# (weakref to builder, weakref to library index, versions) of the library
+# version every entry was rendered from; any newer version empties the cache.
+_OWNER = None
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def library_version():
+    """The library state a rendered ego graph depends on, or None if it can't be cached.
+
+    Returns (builder, library index, versions); versions changes whenever the
+    graph builder applies a change or either shelf of the library index is
+    re-indexed (after every read or want-to-read enrichment). Graphs without
+    an IncrementalGraphBuilder have no version and are never cached. Call it
+    before computing a page, so a page computed across a change is stored
+    under the older version and never served.
+    """
+    with state.GRAPH_LOCK:
+        builder, index = state.GRAPH_BUILDER, state.LIBRARY_INDEX
+        if builder is None or index is None or builder.author_graph is not state.GRAPH:
+            return None
+        return builder, index, (builder.version, index.read.version, index.want_to_read.version)
+
+
+def _claim(builder, index, versions) -> bool:
+    """Make this library version the entries' owner, dropping pages cached for any other.
+
+    Returns False, storing and serving nothing, for a version that is already
+    out of date: an older version of the owning library, or a library that
+    is no longer state's.
+    """
+    global _OWNER, _SIZE
+    if _OWNER is not None and _OWNER[0]() is builder and _OWNER[1]() is index:
+        if versions == _OWNER[2]:
+            return True
+        if any(new < old for new, old in zip(versions, _OWNER[2])):
+            return False
+    if builder is not state.GRAPH_BUILDER or index is not state.LIBRARY_INDEX:
+        return False
+    _ENTRIES.clear()
+    _SIZE = 0
+    _OWNER = (weakref.ref(builder), weakref.ref(index), versions)
+    return True
+
+
+def get(key, version):
+    """The gzip-compressed page cached for key at this library version, or None."""
+    if version is None:
+        return None
+    with _LOCK:
+        page = _ENTRIES.get(key) if _claim(*version) else None
+        if page is None:
+            _STATS["misses"] += 1
+            return None
+        _ENTRIES.move_to_end(key)
+        _STATS["hits"] += 1
+        return page
+
+
+def contains(key, version) -> bool:
+    """True if a page for key at this library version is cached (without counting a hit or miss)."""
+    if version is None:
+        return False
+    builder, index, versions = version
+    with _LOCK:
+        if _OWNER is None or _OWNER[0]() is not builder or _OWNER[1]() is not index:
+            return False
+        return _OWNER[2] == versions and key in _ENTRIES
+
+
+def free_bytes() -> int:
+    """Bytes left before storing another page evicts one."""
+    with _LOCK:
+        return getattr(settings, "GRAPH_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES) - _SIZE
+
+
+def put(key, version, html: str) -> None:
+    """Cache a rendered page, then evict least recently used pages over GRAPH_CACHE_MAX_BYTES.
+
+    Pages are stored gzip-compressed, ready to be sent as-is with
+    Content-Encoding: gzip: most of each page is the same inlined vis.js
+    bundle, so they shrink about fourfold.
+    """
+    global _SIZE
+    if version is None:
+        return
+    page = gzip.compress(html.encode(), compresslevel=1, mtime=0)
+    max_bytes = getattr(settings, "GRAPH_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES)
+    with _LOCK:
+        if not _claim(*version) or len(page) > max_bytes:
+            return
+        old = _ENTRIES.pop(key, None)
+        if old is not None:
+            _SIZE -= len(old)
+        _ENTRIES[key] = page
+        _SIZE += len(page)
+        while _SIZE > max_bytes:
+            _, evicted = _ENTRIES.popitem(last=False)
+            _SIZE -= len(evicted)
+            _STATS["evictions"] += 1
+
+
+def clear() -> None:
+    global _OWNER, _SIZE
+    with _LOCK:
+        _ENTRIES.clear()
+        _SIZE = 0
+        _OWNER = None
+
+
+def stats() -> dict:
+    with _LOCK:
+        return {**_STATS, "entries": len(_ENTRIES), "bytes": _SIZE}
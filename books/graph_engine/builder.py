@@ -1,4 +1,7 @@
 import re
+import threading
+from collections import Counter
+
 import networkx as nx
 
 _GENERIC_SUBJECTS = {
@@ -78,6 +81,36 @@ def _expand_subject(subject: str) -> list:
     return [s]
 
 
+def _genre_subjects(book) -> list:
+    """The normalised subject node names a book links to in the genre graph.
+
+    Subjects are expanded via _expand_subject, generic and very short tags
+    are dropped, and the rest are title-cased and de-duplicated.
+    """
+    names = []
+    seen_subjects: set = set()
+    for subject in book.subjects:
+        for raw_norm in _expand_subject(subject):
+            if not raw_norm or raw_norm.lower() in _GENERIC_SUBJECTS or len(raw_norm) < 3:
+                continue
+            # Normalise to title case so "fantasy", "Fantasy", "FANTASY" → same node
+            norm = raw_norm.strip().title()
+            key = norm.lower()
+            if key in seen_subjects:
+                continue
+            seen_subjects.add(key)
+            names.append(norm)
+    return names
+
+
+def _author_edge_weight(book) -> float:
+    # Rating 3 = neutral (1.0), rating 5 = maximum boost (1.2)
+    rating_multiplier = 1.0
+    if book.rating:
+        rating_multiplier = min(1.0 + ((book.rating - 3) * 0.1), 1.2)
+    return 1.0 * rating_multiplier
+
+
 def build_genre_graph(books):
     """Build a NetworkX graph for genre-based community detection.
 
@@ -91,22 +124,11 @@ def build_genre_graph(books):
     for book in books:
         book_node = f"book::{book.id}"
         G.add_node(book_node, type="book", title=book.title, author=book.author, rating=book.rating)
-
-        seen_subjects: set = set()
-        for subject in book.subjects:
-            for raw_norm in _expand_subject(subject):
-                if not raw_norm or raw_norm.lower() in _GENERIC_SUBJECTS or len(raw_norm) < 3:
-                    continue
-                # Normalise to title case so "fantasy", "Fantasy", "FANTASY" → same node
-                norm = raw_norm.strip().title()
-                key = norm.lower()
-                if key in seen_subjects:
-                    continue
-                seen_subjects.add(key)
-                subject_node = f"subject::{norm}"
-                if not G.has_node(subject_node):
-                    G.add_node(subject_node, type="subject", name=norm)
-                G.add_edge(book_node, subject_node, weight=1.0)
+        for norm in _genre_subjects(book):
+            subject_node = f"subject::{norm}"
+            if not G.has_node(subject_node):
+                G.add_node(subject_node, type="subject", name=norm)
+            G.add_edge(book_node, subject_node, weight=1.0)
 
     return G
 
@@ -138,11 +160,220 @@ def build_author_graph(books):
                 G.add_node(subject_node, type="subject", name=subject)
             G.add_edge(book_node, subject_node, weight=0.8)
 
-        # Rating 3 = neutral (1.0), rating 5 = maximum boost (1.2)
-        rating_multiplier = 1.0
-        if book.rating:
-            rating_multiplier = min(1.0 + ((book.rating - 3) * 0.1), 1.2)
-
-        G.add_edge(book_node, author_node, weight=1.0 * rating_multiplier)
+        G.add_edge(book_node, author_node, weight=_author_edge_weight(book))
 
     return G
+
+
+class IncrementalGraphBuilder:
+    """Keeps an author graph and a genre graph up to date as books come and go.
+
+    author_graph and genre_graph always have the nodes and edges that
+    build_author_graph and build_genre_graph would return for the books
+    added so far, but are updated per book instead of rebuilt. Each author
+    and subject node has a reference count of the books linking to it and
+    is removed when that drops to zero.
+
+    Two lookup tables used by the ego-graph view are kept alongside:
+    `genre_scores` (author-graph subject name → sum of the ratings of the
+    books linked to it, unrated books counting as 3) and `read_titles`
+    (normalised, lower-cased title → number of books with it).
+
+    The graphs are live objects (state.GRAPH / state.GENRE_GRAPH point at
+    them), so every change happens under `lock`; readers that iterate the
+    graphs should hold it too. `version` is bumped by every change;
+    `subject_version` only when a book's author or subject links change (a
+    book added, removed or re-linked), and is also stored on both graphs as
+    graph.graph["subject_version"] so derived data such as the book-book
+    projection can be cached against it.
+    """
+
+    def __init__(self, lock=None):
+        self.author_graph = nx.Graph()
+        self.genre_graph = nx.Graph()
+        self.lock = lock or threading.RLock()
+        self.version = 0
+        self.subject_version = 0
+        # book id → (author node, author-graph subject nodes, genre-graph subject nodes)
+        self._books = {}
+        self._author_refs = Counter()
+        self._author_subject_refs = Counter()
+        self._genre_subject_refs = Counter()
+        self.genre_scores = Counter()
+        self.read_titles = Counter()
+        # book id → (genre score weight, read_titles key) it contributed
+        self._indexed = {}
+
+    @classmethod
+    def from_books(cls, books, lock=None):
+        builder = cls(lock=lock)
+        for book in books:
+            builder.add_book(book)
+        return builder
+
+    def __getstate__(self):
+        # Picklable for upload snapshots; the lock is re-attached on restore.
+        return {k: v for k, v in self.__dict__.items() if k != "lock"}
+
+    def __setstate__(self, data):
+        self.__dict__.update(data)
+        self.lock = threading.RLock()
+
+    def __contains__(self, book_id) -> bool:
+        return book_id in self._books
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    # ── Subject bookkeeping ────────────────────────────────────────────────────
+
+    def _subjects_changed(self) -> None:
+        self.subject_version += 1
+        self.author_graph.graph["subject_version"] = self.subject_version
+        self.genre_graph.graph["subject_version"] = self.subject_version
+
+    @staticmethod
+    def _subject_nodes(book):
+        author_subjects = tuple(dict.fromkeys(f"subject::{s}" for s in book.subjects))
+        genre_subjects = tuple(f"subject::{norm}" for norm in _genre_subjects(book))
+        return author_subjects, genre_subjects
+
+    @staticmethod
+    def _link(G, refs, book_node, subject_node, weight) -> None:
+        if not G.has_node(subject_node):
+            G.add_node(subject_node, type="subject", name=subject_node[len("subject::"):])
+        G.add_edge(book_node, subject_node, weight=weight)
+        refs[subject_node] += 1
+
+    @staticmethod
+    def _unlink(G, refs, book_node, subject_node) -> None:
+        if G.has_edge(book_node, subject_node):
+            G.remove_edge(book_node, subject_node)
+        refs[subject_node] -= 1
+        if refs[subject_node] <= 0:
+            del refs[subject_node]
+            if G.has_node(subject_node):
+                G.remove_node(subject_node)
+
+    # ── Genre score / title index ──────────────────────────────────────────────
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        from books.openlibrary.client import normalize_title
+        return normalize_title(title).lower()
+
+    @staticmethod
+    def _adjust(counter, key, delta) -> None:
+        counter[key] += delta
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _index_subjects(self, subject_nodes, weight, sign) -> None:
+        for subject_node in subject_nodes:
+            self._adjust(self.genre_scores, subject_node[len("subject::"):], sign * weight)
+
+    def _index_book(self, book, author_subjects) -> None:
+        weight, title_key = book.rating or 3, self._title_key(book.title)
+        self._index_subjects(author_subjects, weight, +1)
+        self._adjust(self.read_titles, title_key, +1)
+        self._indexed[book.id] = (weight, title_key)
+
+    def _unindex_book(self, book_id, author_subjects) -> None:
+        weight, title_key = self._indexed.pop(book_id)
+        self._index_subjects(author_subjects, weight, -1)
+        self._adjust(self.read_titles, title_key, -1)
+
+    # ── Operations ─────────────────────────────────────────────────────────────
+
+    def add_book(self, book) -> None:
+        """Add a BookNode to both graphs; a book already present is replaced."""
+        with self.lock:
+            previous = self._books.get(book.id)
+            if previous is not None:
+                self._remove(book.id)
+
+            book_node = f"book::{book.id}"
+            author_node = f"author::{book.author}"
+            author_subjects, genre_subjects = self._subject_nodes(book)
+            attrs = {"type": "book", "title": book.title, "author": book.author, "rating": book.rating}
+
+            self.author_graph.add_node(book_node, **attrs)
+            self.author_graph.add_node(author_node, type="author", name=book.author)
+            self._author_refs[author_node] += 1
+            for subject_node in author_subjects:
+                self._link(self.author_graph, self._author_subject_refs, book_node, subject_node, 0.8)
+            self.author_graph.add_edge(book_node, author_node, weight=_author_edge_weight(book))
+
+            self.genre_graph.add_node(book_node, **attrs)
+            for subject_node in genre_subjects:
+                self._link(self.genre_graph, self._genre_subject_refs, book_node, subject_node, 1.0)
+
+            self._books[book.id] = (author_node, author_subjects, genre_subjects)
+            self._index_book(book, author_subjects)
+            self.version += 1
+            if previous != self._books[book.id]:
+                self._subjects_changed()
+
+    def update_book_subjects(self, book) -> bool:
+        """Re-link a book whose subjects changed (e.g. after enrichment).
+
+        Only the edges that differ are touched. Returns True if either graph
+        changed; books that were never added are ignored.
+        """
+        with self.lock:
+            entry = self._books.get(book.id)
+            if entry is None:
+                return False
+            author_node, old_author, old_genre = entry
+            new_author, new_genre = self._subject_nodes(book)
+            if new_author == old_author and new_genre == old_genre:
+                return False
+
+            book_node = f"book::{book.id}"
+            for G, refs, old, new, weight in (
+                (self.author_graph, self._author_subject_refs, old_author, new_author, 0.8),
+                (self.genre_graph, self._genre_subject_refs, old_genre, new_genre, 1.0),
+            ):
+                old_set, new_set = set(old), set(new)
+                for subject_node in old:
+                    if subject_node not in new_set:
+                        self._unlink(G, refs, book_node, subject_node)
+                for subject_node in new:
+                    if subject_node not in old_set:
+                        self._link(G, refs, book_node, subject_node, weight)
+
+            if new_author != old_author:
+                weight = self._indexed[book.id][0]
+                self._index_subjects(old_author, weight, -1)
+                self._index_subjects(new_author, weight, +1)
+            self._books[book.id] = (author_node, new_author, new_genre)
+            self.version += 1
+            self._subjects_changed()
+            return True
+
+    def remove_book(self, book_id) -> bool:
+        """Remove a book, and any author or subject node no other book links to."""
+        with self.lock:
+            if book_id not in self._books:
+                return False
+            self._remove(book_id)
+            self.version += 1
+            self._subjects_changed()
+            return True
+
+    def _remove(self, book_id) -> None:
+        author_node, author_subjects, genre_subjects = self._books.pop(book_id)
+        self._unindex_book(book_id, author_subjects)
+        book_node = f"book::{book_id}"
+
+        for subject_node in author_subjects:
+            self._unlink(self.author_graph, self._author_subject_refs, book_node, subject_node)
+        for subject_node in genre_subjects:
+            self._unlink(self.genre_graph, self._genre_subject_refs, book_node, subject_node)
+
+        self.author_graph.remove_node(book_node)
+        self.genre_graph.remove_node(book_node)
+        self._author_refs[author_node] -= 1
+        if self._author_refs[author_node] <= 0:
+            del self._author_refs[author_node]
+            self.author_graph.remove_node(author_node)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from .schemas import BookNode
+
+# BookNode fields filled by enrichment rather than read from the CSV.
+_ENRICHED_FIELDS = (
+    "subjects", "award_slugs", "cover_url", "openlibrary_id", "description",
+    "page_count", "first_publish_year", "ol_ratings_average", "inventaire_uri",
+)
+
+
+@dataclass
+class LibraryDiff:
+    books: List[BookNode] = field(default_factory=list)    # The new library, in CSV order
+    added: List[BookNode] = field(default_factory=list)
+    removed: List[BookNode] = field(default_factory=list)
+    changed: List[Tuple[BookNode, BookNode]] = field(default_factory=list)  # (old, new)
+    unchanged: int = 0
+
+    def summary(self) -> dict:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged,
+        }
+
+
+def book_key(book: BookNode) -> str:
+    """Identity of a row across exports: the Goodreads Book Id, else "Title::Author"."""
+    return f"goodreads::{book.goodreads_id}" if book.goodreads_id else book.id
+
+
+def _csv_fields(book: BookNode) -> tuple:
+    return (book.title, book.author, book.rating, book.shelf, book.date_read)
+
+
+def is_enriched(book: BookNode) -> bool:
+    """True once a book has both a cover and subjects; others still go through enrichment."""
+    return bool(book.cover_url and book.subjects)
+
+
+def copy_enrichment(source: BookNode, target: BookNode) -> None:
+    """Copy fetched metadata from an earlier BookNode for the same book onto a fresh one."""
+    for name in _ENRICHED_FIELDS:
+        value = getattr(source, name)
+        setattr(target, name, list(value) if isinstance(value, list) else value)
+
+
+def diff_library(old_books, new_books, donors=()) -> LibraryDiff:
+    """Compare a freshly parsed library against the one currently loaded.
+
+    Rows are matched by book_key. Unchanged rows keep their existing BookNode
+    object, so everything already fetched (and its place in the graphs) is
+    reused. Rows whose rating, shelf or date read changed get the new
+    BookNode with the old one's metadata copied over; if the title or author
+    changed, the metadata is fetched again. New rows are seeded from `donors`
+    (e.g. the want-to-read shelf a book just moved off) when possible.
+    """
+    old = {book_key(book): book for book in old_books}
+    donor = {book_key(book): book for book in donors}
+    diff = LibraryDiff()
+
+    for book in new_books:
+        key = book_key(book)
+        previous = old.pop(key, None)
+        if previous is None:
+            source = donor.get(key)
+            if source is not None and source.id == book.id:
+                copy_enrichment(source, book)
+            diff.added.append(book)
+            diff.books.append(book)
+        elif _csv_fields(previous) == _csv_fields(book):
+            diff.unchanged += 1
+            diff.books.append(previous)
+        else:
+            if previous.id == book.id:
+                copy_enrichment(previous, book)
+            diff.changed.append((previous, book))
+            diff.books.append(book)
+
+    diff.removed = list(old.values())
+    return diff
@@ -54,7 +54,8 @@ def _apply_ol_data(book: BookNode, ol_data: dict) -> None:
         book.award_slugs = ol_data["award_slugs"]
     if not book.openlibrary_id and ol_data.get("openlibrary_id"):
         book.openlibrary_id = ol_data["openlibrary_id"]
-    if not book.description and ol_data.get("description"):
+    # "" means OL was asked and has none; None leaves it to the description stage.
+    if not book.description and ol_data.get("description") is not None:
         book.description = ol_data["description"]
     if not book.page_count and ol_data.get("page_count"):
         book.page_count = ol_data["page_count"]
@@ -64,24 +65,39 @@ def _apply_ol_data(book: BookNode, ol_data: dict) -> None:
         book.ol_ratings_average = ol_data["ol_ratings_average"]
 
 
-def extract_books_from_df(df):
-    """Convert a Goodreads DataFrame into a list of BookNode objects.
+def _parse_goodreads_id(raw_gid):
+    """Goodreads book ID — cast via int→str to strip any ".0" from pandas float parsing."""
+    try:
+        return str(int(raw_gid)) if raw_gid and str(raw_gid) not in ("", "nan") else None
+    except (ValueError, TypeError):
+        return None
 
-    For the first MAX_COVER_LOOKUPS books, metadata is fetched immediately.
-    The remaining books have their covers loaded by the background thread.
 
-    Fetch strategy (all results are DB-cached with a 30-day TTL):
-      1. OpenLibrary work data — subjects, awards, cover, description, metadata
-      2. OpenLibrary cover search — cover only, if still missing
-      3. Inventaire — cover only, as last resort
+def _parse_isbn(raw, length):
+    """Goodreads writes ISBNs as ="0441172717" (or ="" when missing); return the bare digits."""
+    if raw is None or str(raw) == "nan":
+        return None
+    isbn = str(raw).strip().lstrip("=").strip('"').replace("-", "").upper()
+    if len(isbn) != length or not (isbn[:-1].isdigit() and (isbn[-1].isdigit() or isbn[-1] == "X")):
+        return None
+    return isbn
+
+
+def _parse_text(raw):
+    """A CSV cell as a stripped string, or None when pandas read it as NaN/empty."""
+    if raw is None or str(raw) == "nan":
+        return None
+    return str(raw).strip() or None
+
+
+def parse_books_from_df(df):
+    """Convert a Goodreads DataFrame into BookNode objects without any network calls.
+
+    Rows missing a title or author are skipped. A rating of 0 (Goodreads'
+    "not rated") becomes None.
     """
     books = []
-    total_rows = len(df)
-    state.UPLOAD_PROGRESS["total"] = total_rows
-    state.UPLOAD_PROGRESS["current"] = 0
-    state.UPLOAD_PROGRESS["phase"] = "fetching"
-
-    for i, (_, row) in enumerate(df.iterrows()):
+    for _, row in df.iterrows():
         title = row.get("Title")
         author = row.get("Author")
         if not title or not author:
@@ -91,30 +107,65 @@ def extract_books_from_df(df):
         if rating == 0:
             rating = None
 
-        # Goodreads book ID — cast via int→str to strip any ".0" from pandas float parsing
-        raw_gid = row.get("Book Id")
-        try:
-            goodreads_id = str(int(raw_gid)) if raw_gid and str(raw_gid) not in ("", "nan") else None
-        except (ValueError, TypeError):
-            goodreads_id = None
-
-        book = BookNode(
+        books.append(BookNode(
             id=f"{title}::{author}",
             title=title,
             author=author,
             rating=rating,
-            goodreads_id=goodreads_id,
+            goodreads_id=_parse_goodreads_id(row.get("Book Id")),
+            shelf=_parse_text(row.get("Exclusive Shelf")),
+            date_read=_parse_text(row.get("Date Read")),
+            isbn_13=_parse_isbn(row.get("ISBN13"), 13),
+            isbn_10=_parse_isbn(row.get("ISBN"), 10),
+        ))
+    return books
+
+
+def parse_want_to_read_from_df(df):
+    """Return lightweight BookNodes for the to-read / currently-reading shelves.
+
+    Metadata for these books is fetched later by the background thread.
+    """
+    if "Exclusive Shelf" not in df.columns:
+        return []
+    wtr_df = df[df["Exclusive Shelf"].isin(["to-read", "currently-reading"])]
+    return [
+        BookNode(
+            id=book.id,
+            title=book.title,
+            author=book.author,
+            goodreads_id=book.goodreads_id,
+            shelf=book.shelf,
+            isbn_13=book.isbn_13,
+            isbn_10=book.isbn_10,
         )
+        for book in parse_books_from_df(wtr_df)
+    ]
+
+
+def enrich_books(books, limit=MAX_COVER_LOOKUPS, should_stop=None):
+    """Fetch metadata for the first `limit` books, updating UPLOAD_PROGRESS as it goes.
 
-        if i < MAX_COVER_LOOKUPS:
-            _apply_ol_data(book, fetch_work_data(title, author, is_read=True))
+    Returns early, leaving UPLOAD_PROGRESS alone, once should_stop() returns True.
+
+    Fetch strategy (all results are DB-cached):
+      1. OpenLibrary work data — subjects, awards, cover, description, metadata
+      2. OpenLibrary cover search — cover only, if still missing
+      3. Inventaire — cover only, as last resort
+      4. Google Books genres
+    """
+    state.UPLOAD_PROGRESS["total"] = len(books)
+    state.UPLOAD_PROGRESS["current"] = 0
+    state.UPLOAD_PROGRESS["phase"] = "fetching"
+
+    for i, book in enumerate(books):
+        if should_stop is not None and should_stop():
+            return
+        if i < limit:
+            _apply_ol_data(book, fetch_work_data(book.title, book.author, is_read=True))
             if not book.cover_url:
-                book.cover_url = fetch_cover_for_read_book(title, author, is_read=True)
+                book.cover_url = fetch_cover_for_read_book(book.title, book.author, is_read=True)
             if not book.cover_url:
-                book.cover_url = inventaire_fetch_cover(title, author)
+                book.cover_url = inventaire_fetch_cover(book.title, book.author)
             _apply_gb_genres(book)
-
-        books.append(book)
         state.UPLOAD_PROGRESS["current"] = i + 1
-
-    return books
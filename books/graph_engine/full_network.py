@@ -1,9 +1,8 @@
 import json
 
-import networkx as nx
-from networkx.algorithms import bipartite
 from pyvis.network import Network
 
+from books.graph_engine.projection import cached_projection
 from books.graph_engine.universe import _CLUSTER_COLORS
 from books.graph_engine.visualize_interactive import truncate
 
@@ -26,14 +25,10 @@ def render_full_network(graph, communities=None, cover_map: dict = None) -> str:
             for book_node in cluster["book_nodes"]:
                 node_colors[book_node] = color
 
-    book_node_set = {n for n, d in graph.nodes(data=True) if d.get("type") == "book"}
-
     # Project book↔subject bipartite graph to book-book graph.
     # Edge weight = number of shared subjects between the two books.
-    try:
-        projected = bipartite.weighted_projected_graph(graph, book_node_set)
-    except Exception:
-        projected = nx.Graph()
+    projection = cached_projection(graph)
+    degrees = dict(zip(projection.nodes, projection.degree().tolist()))
 
     net = Network(
         height="670px",
@@ -48,7 +43,7 @@ def render_full_network(graph, communities=None, cover_map: dict = None) -> str:
     image_overlay_nodes: dict = {}
     click_node_info: dict = {}
 
-    for node_id in book_node_set:
+    for node_id in projection.nodes:
         data = graph.nodes[node_id]
         full_title = data.get("title", "")
         label = truncate(full_title)
@@ -57,7 +52,7 @@ def render_full_network(graph, communities=None, cover_map: dict = None) -> str:
         color = node_colors.get(node_id, "#c4b7a6")
 
         # Size by degree in projected graph so well-connected books stand out
-        deg = projected.degree(node_id) if projected.has_node(node_id) else 0
+        deg = degrees.get(node_id, 0)
         size = min(20 + deg * 2, 42)
 
         hover_node_info[node_id] = {
@@ -84,9 +79,10 @@ def render_full_network(graph, communities=None, cover_map: dict = None) -> str:
             net.add_node(node_id, label=label, title="", color=color, size=size)
 
     # Only draw edges with 2+ shared subjects to keep the graph readable
-    for u, v, edata in projected.edges(data=True):
-        if edata.get("weight", 1) >= 2:
-            net.add_edge(u, v, value=edata["weight"], color="rgba(120, 110, 90, 0.25)", smooth=True)
+    strong = projection.pruned(2)
+    nodes = strong.nodes
+    for u, v, weight in zip(strong.sources.tolist(), strong.targets.tolist(), strong.weights.tolist()):
+        net.add_edge(nodes[u], nodes[v], value=weight, color="rgba(120, 110, 90, 0.25)", smooth=True)
 
     net.set_options("""
     {
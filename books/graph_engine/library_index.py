@@ -0,0 +1,190 @@
+import heapq
+import threading
+from collections import Counter
+
+from books.graph_engine.series import SeriesIndex
+
+
+def _title_key(title: str) -> str:
+    from books.openlibrary.client import normalize_title
+    return normalize_title(title).lower()
+
+
+class ShelfIndex:
+    """Lookup maps over one shelf of BookNodes: by id, author, subject and normalised title.
+
+    Also keeps a SeriesIndex of the shelf's titles (in_started_series).
+
+    Books are keyed by object identity, so duplicate rows (same "Title::Author"
+    id) are indexed separately, and results come back in shelf (CSV) order.
+    BookNodes are enriched in place after they are indexed; call update(book)
+    once a book's subjects, title or publish year may have changed.
+    `version` is bumped by every add, update and remove.
+    """
+
+    def __init__(self, books=()):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._position = {}      # id(book) → shelf position
+        self._entries = {}       # id(book) → (book, the keys it is indexed under)
+        self._next_position = 0
+        self._by_id = {}         # book.id → {id(book): book}
+        self._by_author = {}     # author.lower() → {id(book): book}
+        self._by_subject = {}    # subject → {id(book): book}
+        self._by_title = {}      # normalised lower-cased title → {id(book): book}
+        self.subject_counts = Counter()
+        self.author_counts = Counter()
+        self.year_counts = Counter()
+        self.series = SeriesIndex()
+        for book in books:
+            self.add(book)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, book) -> bool:
+        return id(book) in self._entries
+
+    # ── Maintenance ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _put(index, key, book) -> None:
+        index.setdefault(key, {})[id(book)] = book
+
+    @staticmethod
+    def _drop(index, key, book) -> None:
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(id(book), None)
+            if not bucket:
+                del index[key]
+
+    @staticmethod
+    def _decrement(counter, key) -> None:
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _insert(self, book) -> None:
+        subjects = tuple(book.subjects or ())
+        entry = (book.id, book.author, subjects, _title_key(book.title), book.first_publish_year, book.title)
+        self._entries[id(book)] = (book, entry)
+        self._put(self._by_id, book.id, book)
+        self._put(self._by_author, book.author.lower(), book)
+        for subject in dict.fromkeys(subjects):
+            self._put(self._by_subject, subject, book)
+        self._put(self._by_title, entry[3], book)
+        self.subject_counts.update(subjects)
+        self.author_counts[book.author] += 1
+        if book.first_publish_year:
+            self.year_counts[book.first_publish_year] += 1
+        self.series.add(book.title)
+
+    def _delete(self, book) -> None:
+        _, (book_id, author, subjects, title_key, year, title) = self._entries.pop(id(book))
+        self._drop(self._by_id, book_id, book)
+        self._drop(self._by_author, author.lower(), book)
+        for subject in dict.fromkeys(subjects):
+            self._drop(self._by_subject, subject, book)
+        self._drop(self._by_title, title_key, book)
+        for subject in subjects:
+            self._decrement(self.subject_counts, subject)
+        self._decrement(self.author_counts, author)
+        if year:
+            self._decrement(self.year_counts, year)
+        self.series.remove(title)
+
+    def add(self, book) -> None:
+        """Index a book at the end of the shelf (re-indexes it in place if already present)."""
+        with self._lock:
+            if id(book) in self._entries:
+                self._delete(book)
+            else:
+                self._position[id(book)] = self._next_position
+                self._next_position += 1
+            self._insert(book)
+            self.version += 1
+
+    def update(self, book) -> None:
+        """Re-index a book after enrichment; books not on this shelf are ignored."""
+        with self._lock:
+            if id(book) in self._entries:
+                self._delete(book)
+                self._insert(book)
+                self.version += 1
+
+    def remove(self, book) -> None:
+        with self._lock:
+            if id(book) in self._entries:
+                self._delete(book)
+                del self._position[id(book)]
+                self.version += 1
+
+    # ── Lookups ────────────────────────────────────────────────────────────────
+
+    def _ordered(self, buckets, limit=None, where=None) -> list:
+        candidates = {}
+        for bucket in buckets:
+            candidates.update(bucket)
+        books = (book for book in candidates.values() if where is None or where(book))
+        key = lambda book: self._position[id(book)]
+        return sorted(books, key=key) if limit is None else heapq.nsmallest(limit, books, key=key)
+
+    def position(self, book) -> int:
+        """The book's place on the shelf (CSV order). Takes no lock, so it is safe in a `where`."""
+        return self._position[id(book)]
+
+    def get(self, book_id):
+        """The first book on the shelf with this id, or None."""
+        with self._lock:
+            found = self._ordered([self._by_id.get(book_id, {})], limit=1)
+        return found[0] if found else None
+
+    def all_with_id(self, book_id) -> list:
+        """Every book on the shelf with this id (duplicate rows), in shelf order."""
+        with self._lock:
+            return self._ordered([self._by_id.get(book_id, {})])
+
+    def by_author(self, author: str, limit=None, where=None) -> list:
+        """Books by `author` (case-insensitive), in shelf order."""
+        with self._lock:
+            return self._ordered([self._by_author.get(author.lower(), {})], limit, where)
+
+    def with_any_subject(self, subjects, limit=None, where=None) -> list:
+        """Books listing at least one of `subjects`, in shelf order."""
+        with self._lock:
+            return self._ordered([self._by_subject.get(s, {}) for s in subjects], limit, where)
+
+    def has_title(self, title: str) -> bool:
+        """True if a book with the same normalised title is on the shelf."""
+        return _title_key(title) in self._by_title
+
+    def in_started_series(self, title: str) -> bool:
+        """True if `title` looks like part of a series some book on this shelf belongs to.
+
+        Same answer as any(_detect_series(t, title) for t in shelf titles),
+        from the SeriesIndex instead of a scan.
+        """
+        with self._lock:
+            return self.series.matches(title)
+
+    def titles(self):
+        """Normalised, lower-cased titles on the shelf (a live view)."""
+        return self._by_title.keys()
+
+    def top_subjects(self, n: int) -> list:
+        with self._lock:
+            return [subject for subject, _ in self.subject_counts.most_common(n)]
+
+    def year_range(self):
+        """(earliest, latest) first publish year on the shelf, or None."""
+        with self._lock:
+            return (min(self.year_counts), max(self.year_counts)) if self.year_counts else None
+
+
+class LibraryIndex:
+    """ShelfIndexes for the read and want-to-read shelves (state.LIBRARY_INDEX)."""
+
+    def __init__(self, read_books=(), want_to_read=()):
+        self.read = ShelfIndex(read_books)
+        self.want_to_read = ShelfIndex(want_to_read)
@@ -0,0 +1,182 @@
+from collections import deque
+
+import numpy as np
+
+
+def adjacency(projection):
+    """Symmetric CSR adjacency (indptr, indices, weights) of a Projection."""
+    n = len(projection.nodes)
+    rows = np.concatenate([projection.sources, projection.targets])
+    cols = np.concatenate([projection.targets, projection.sources])
+    weights = np.concatenate([projection.weights, projection.weights]).astype(np.float64)
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order], weights[order]
+
+
+def modularity(projection, membership, resolution: float = 1.0) -> float:
+    """Weighted modularity of `membership` (one label per projection node, -1 = excluded)."""
+    src, dst, w = projection.sources, projection.targets, projection.weights.astype(np.float64)
+    m = w.sum()
+    if m == 0:
+        return 0.0
+    k = np.bincount(np.concatenate([src, dst]), weights=np.concatenate([w, w]), minlength=len(membership))
+    included = membership >= 0
+    labels, inverse = np.unique(membership[included], return_inverse=True)
+    sigma = np.bincount(inverse, weights=k[included], minlength=len(labels))
+    inside = w[(membership[src] == membership[dst]) & (membership[src] >= 0)].sum()
+    return float(inside / m - resolution * (sigma ** 2).sum() / (4 * m * m))
+
+
+def local_moving(projection, membership, active, resolution: float = 1.0, max_moves=None) -> int:
+    """Louvain's local-moving phase, started from an existing partition.
+
+    membership holds one integer label per projection node (-1 for nodes
+    left out, e.g. isolated books) and is updated in place. Only `active`
+    node indices are visited; a node that changes community puts its
+    neighbours back on the queue, so the work stays around the part of the
+    graph that actually changed instead of re-clustering everything.
+
+    Each node moves to the neighbouring community with the largest
+    modularity gain  k_i,c − resolution · k_i · Σ_tot(c) / 2m,  and stays
+    put on ties. Returns the number of moves made.
+    """
+    indptr, indices, weights = adjacency(projection)
+    two_m = weights.sum()
+    if two_m == 0:
+        return 0
+    n = len(membership)
+    degree = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+
+    sigma_tot: dict = {}
+    for label, k in zip(membership.tolist(), degree.tolist()):
+        if label >= 0:
+            sigma_tot[label] = sigma_tot.get(label, 0.0) + k
+
+    queue = deque(sorted(set(active)))
+    queued = set(queue)
+    max_moves = max_moves if max_moves is not None else 20 * n
+    moves = 0
+
+    while queue and moves < max_moves:
+        i = queue.popleft()
+        queued.discard(i)
+        current = int(membership[i])
+        if current < 0:
+            continue
+        nbrs = indices[indptr[i]:indptr[i + 1]]
+        if not len(nbrs):
+            continue
+        labels, inverse = np.unique(membership[nbrs], return_inverse=True)
+        k_ic = np.bincount(inverse, weights=weights[indptr[i]:indptr[i + 1]])
+        k_i = degree[i]
+
+        sigma_tot[current] -= k_i
+        pos = np.searchsorted(labels, current)
+        own = k_ic[pos] if pos < len(labels) and labels[pos] == current else 0.0
+        best, best_gain = current, own - resolution * k_i * sigma_tot[current] / two_m
+        for label, k_c in zip(labels.tolist(), k_ic.tolist()):
+            if label < 0 or label == current:
+                continue
+            gain = k_c - resolution * k_i * sigma_tot[label] / two_m
+            if gain > best_gain + 1e-12:
+                best, best_gain = label, gain
+        sigma_tot[best] = sigma_tot.get(best, 0.0) + k_i
+
+        if best != current:
+            membership[i] = best
+            moves += 1
+            for j in nbrs.tolist():
+                if j not in queued:
+                    queue.append(j)
+                    queued.add(j)
+    return moves
+
+
+# Largest rows × labels score matrix label_propagation builds densely; above
+# it, per-(book, label) weights are aggregated by sorting instead.
+DENSE_SCORE_CELLS = 20_000_000
+
+
+def label_propagation(
+    projection, resolution: float = 1.0, max_iter: int = 30, tol: float = 0.02, seed: int = 42
+) -> np.ndarray:
+    """Vectorized weighted label propagation with a modularity penalty (LPAm).
+
+    Every book starts in its own community. Each round, a random half of the
+    books adopts the neighbouring label with the largest
+    k_i,c − resolution · k_i · Σ_tot(c) / 2m — the same gain Louvain uses, so
+    large popular labels do not swallow the whole graph the way plain label
+    propagation does on dense projections. Scores for all books are computed
+    at once with NumPy; updating only half of them per round avoids the
+    oscillation of fully synchronous updates. Stops once at most `tol` of the
+    books would still move (the last few tend to flip back and forth between
+    two equally good labels) or after max_iter rounds.
+
+    Returns one label per projection node, numbered 0..k-1 by first
+    appearance, with -1 for books that have no projected neighbours.
+    """
+    n = len(projection.nodes)
+    indptr, cols, weights = adjacency(projection)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    degree = np.bincount(rows, weights=weights, minlength=n)
+    two_m = weights.sum()
+    membership = np.where(degree > 0, np.arange(n), -1)
+    if two_m == 0:
+        return membership
+
+    rng = np.random.default_rng(seed)
+    active = degree > 0
+    for _ in range(max_iter):
+        sigma = np.bincount(membership[active], weights=degree[active], minlength=n)
+        neighbour_labels = membership[cols]
+        same = neighbour_labels == membership[rows]
+
+        # Score of staying: the book's own community, scored without the book in it.
+        k_own = np.bincount(rows, weights=weights * same, minlength=n)
+        own_score = k_own - resolution * degree * (sigma[np.maximum(membership, 0)] - degree) / two_m
+
+        # Best other neighbouring community per book.
+        other_rows, other_weights = rows[~same], weights[~same]
+        # Labels are node indices, so compact them with a lookup table rather than a sort.
+        other_labels = neighbour_labels[~same]
+        present = np.zeros(n, dtype=bool)
+        present[other_labels] = True
+        labels = np.flatnonzero(present)
+        k = len(labels)
+        lookup = np.zeros(n, dtype=np.int64)
+        lookup[labels] = np.arange(k)
+        inverse = lookup[other_labels]
+        best = membership.copy()
+        best_score = np.full(n, -np.inf)
+        if k and n * k <= DENSE_SCORE_CELLS:
+            k_ic = np.bincount(other_rows * k + inverse, weights=other_weights, minlength=n * k).reshape(n, k)
+            score = k_ic - resolution * np.outer(degree, sigma[labels]) / two_m
+            score[k_ic <= 0] = -np.inf
+            best_col = score.argmax(axis=1)
+            best_score = score[np.arange(n), best_col]
+            best = np.where(np.isfinite(best_score), labels[best_col], membership)
+        elif k:
+            pairs, pair_inverse = np.unique(other_rows * k + inverse, return_inverse=True)
+            k_ic = np.bincount(pair_inverse, weights=other_weights)
+            pair_rows, pair_labels = pairs // k, labels[pairs % k]
+            score = k_ic - resolution * degree[pair_rows] * sigma[pair_labels] / two_m
+            order = np.lexsort((-score, pair_rows))
+            sorted_rows = pair_rows[order]
+            first = order[np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]]
+            best[pair_rows[first]] = pair_labels[first]
+            best_score[pair_rows[first]] = score[first]
+
+        improves = active & (best_score > own_score + 1e-12)
+        if improves.sum() <= tol * active.sum():
+            break
+        move = improves & (rng.random(n) < 0.5)
+        membership = np.where(move, best, membership)
+
+    compact = np.full(n, -1)
+    found, first_seen = np.unique(membership[active], return_index=True)
+    rank = np.empty(len(found), dtype=np.int64)
+    rank[np.argsort(first_seen)] = np.arange(len(found))
+    compact[active] = rank[np.searchsorted(found, membership[active])]
+    return compact
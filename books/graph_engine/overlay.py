@@ -0,0 +1,98 @@
+from collections import ChainMap
+
+
+class OverlayGraph:
+    """Request-local nodes and edges layered over a shared, read-only graph.
+
+    book_graph_view used to copy the whole library graph just to add a few
+    dozen recommendation nodes. An OverlayGraph keeps those additions in its
+    own small dicts and answers reads by consulting them first and the base
+    graph second, so building one costs nothing regardless of library size
+    and the base graph is never modified.
+
+    It supports the subset of the networkx.Graph API the ego-graph view
+    uses: `in`, has_node, has_edge, add_node, add_edge, neighbors, and
+    nodes[n] / nodes.get(n) / adj[n] lookups. Attribute dicts of base nodes
+    and edges are returned as read-only views layered under any overlay
+    attributes; writes always go to the overlay.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._node = {}   # node → overlay attributes (shadowing base attributes)
+        self._adj = {}    # node → {neighbour: overlay edge attributes}
+
+    def __contains__(self, n) -> bool:
+        return n in self._node or n in self.base
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for n in self._node if n not in self.base)
+
+    def has_node(self, n) -> bool:
+        return n in self
+
+    def has_edge(self, u, v) -> bool:
+        return v in self._adj.get(u, ()) or self.base.has_edge(u, v)
+
+    def add_node(self, n, **attr) -> None:
+        self._node.setdefault(n, {}).update(attr)
+
+    def add_edge(self, u, v, **attr) -> None:
+        for n in (u, v):
+            if n not in self:
+                self._node[n] = {}
+        data = dict(self.base.adj[u][v]) if self.base.has_edge(u, v) else {}
+        data.update(self._adj.get(u, {}).get(v, {}), **attr)
+        self._adj.setdefault(u, {})[v] = data
+        self._adj.setdefault(v, {})[u] = data
+
+    def neighbors(self, n):
+        return iter(self.adj[n])
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    @property
+    def adj(self):
+        return _AdjView(self)
+
+    def _node_data(self, n):
+        overlay = self._node.get(n)
+        if n not in self.base:
+            if overlay is None:
+                raise KeyError(n)
+            return overlay
+        base = self.base.nodes[n]
+        return base if overlay is None else ChainMap(overlay, base)
+
+    def _neighbours(self, n):
+        overlay = self._adj.get(n)
+        if n not in self.base:
+            if overlay is None and n not in self._node:
+                raise KeyError(n)
+            return overlay or {}
+        base = self.base.adj[n]
+        return base if overlay is None else ChainMap(overlay, base)
+
+
+class _NodeView:
+    def __init__(self, graph: OverlayGraph):
+        self._graph = graph
+
+    def __contains__(self, n) -> bool:
+        return n in self._graph
+
+    def __getitem__(self, n):
+        return self._graph._node_data(n)
+
+    def get(self, n, default=None):
+        return self._graph._node_data(n) if n in self._graph else default
+
+
+class _AdjView:
+    def __init__(self, graph: OverlayGraph):
+        self._graph = graph
+
+    def __getitem__(self, n):
+        return self._graph._neighbours(n)
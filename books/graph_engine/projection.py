@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+
+import networkx as nx
+import numpy as np
+
+from books.graph_engine import state
+
+# Book pairs buffered while multiplying B·Bᵀ before they are reduced to
+# (pair, weight) totals. A subject shared by thousands of books is split into
+# blocks of this size, so it never needs all of its pairs in memory at once.
+CHUNK_PAIRS = 4_000_000
+
+
+@dataclass
+class Projection:
+    """A weighted book-book projection of a bipartite book↔subject graph.
+
+    nodes[i] is the graph node id of book i. Each edge appears once, with
+    sources[k] < targets[k], and weights[k] is the number of neighbours
+    (subjects, authors, …) the two books share — the same weights as
+    networkx.bipartite.weighted_projected_graph.
+    """
+
+    nodes: list
+    sources: np.ndarray
+    targets: np.ndarray
+    weights: np.ndarray
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.weights)
+
+    def degree(self) -> np.ndarray:
+        """Number of projected neighbours per book, aligned with nodes."""
+        return np.bincount(
+            np.concatenate([self.sources, self.targets]), minlength=len(self.nodes)
+        )
+
+    def pruned(self, min_weight: int) -> "Projection":
+        """The same projection keeping only edges with weight >= min_weight."""
+        keep = self.weights >= min_weight
+        return Projection(self.nodes, self.sources[keep], self.targets[keep], self.weights[keep])
+
+    def to_networkx(self, graph=None) -> nx.Graph:
+        """Build the projection as a NetworkX graph.
+
+        Every book becomes a node — including books with no projected
+        neighbours — carrying its attributes from `graph` when given, as
+        weighted_projected_graph does.
+        """
+        G = nx.Graph()
+        if graph is not None:
+            G.graph.update(graph.graph)
+            G.add_nodes_from((n, graph.nodes[n]) for n in self.nodes)
+        else:
+            G.add_nodes_from(self.nodes)
+        nodes = self.nodes
+        G.add_weighted_edges_from(
+            (nodes[u], nodes[v], w)
+            for u, v, w in zip(self.sources.tolist(), self.targets.tolist(), self.weights.tolist())
+        )
+        return G
+
+
+def _incidence(graph, book_nodes):
+    """CSC-style book×neighbour incidence: for each neighbour column, the sorted book rows linking to it."""
+    row_of = {node: i for i, node in enumerate(book_nodes)}
+    col_of: dict = {}
+    rows, cols = [], []
+    for node in book_nodes:
+        r = row_of[node]
+        for nbr in graph.neighbors(node):
+            c = col_of.setdefault(nbr, len(col_of))
+            rows.append(r)
+            cols.append(c)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    order = np.lexsort((rows, cols))
+    indices = rows[order]
+    indptr = np.zeros(len(col_of) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=len(col_of)), out=indptr[1:])
+    return indptr, indices
+
+
+def _pair_blocks(indptr, indices, n):
+    """Yield encoded (u * n + v, u < v) keys of book pairs that share a column.
+
+    Small columns yield all their pairs at once; a column with more than
+    CHUNK_PAIRS pairs is split into runs of rows so no block exceeds it.
+    """
+    for c in range(len(indptr) - 1):
+        members = indices[indptr[c]:indptr[c + 1]]
+        k = len(members)
+        if k < 2:
+            continue
+        if k * (k - 1) // 2 <= CHUNK_PAIRS:
+            iu, iv = np.triu_indices(k, 1)
+            yield members[iu] * n + members[iv]
+            continue
+        block, block_pairs = [], 0
+        for i in range(k - 1):
+            block.append(members[i] * n + members[i + 1:])
+            block_pairs += k - 1 - i
+            if block_pairs >= CHUNK_PAIRS:
+                yield np.concatenate(block)
+                block, block_pairs = [], 0
+        if block:
+            yield np.concatenate(block)
+
+
+def _merge(keys, weights, new_keys, new_weights):
+    """Sum two (sorted unique key, weight) edge lists into one."""
+    if not len(keys):
+        return new_keys, new_weights
+    all_keys = np.concatenate([keys, new_keys])
+    merged, inverse = np.unique(all_keys, return_inverse=True)
+    summed = np.bincount(inverse, weights=np.concatenate([weights, new_weights]), minlength=len(merged))
+    return merged, summed.astype(np.int64)
+
+
+def project(graph, book_nodes=None, min_weight: int = 1) -> Projection:
+    """Project a bipartite book↔subject graph onto its books with NumPy.
+
+    Builds the sparse book×neighbour incidence matrix B (CSC: one sorted run
+    of book rows per neighbour column) and computes the off-diagonal of
+    B·Bᵀ column by column: every subject adds one to each pair of books it
+    links. Pairs are reduced with np.unique every CHUNK_PAIRS pairs and
+    merged into the running totals, so memory stays bounded by the output
+    plus one chunk.
+
+    book_nodes defaults to every node with type == "book". Edges lighter
+    than min_weight are dropped. Node order is sorted, so the result is
+    deterministic for a given graph.
+    """
+    if book_nodes is None:
+        book_nodes = [n for n, d in graph.nodes(data=True) if d.get("type") == "book"]
+    book_nodes = sorted(book_nodes)
+    n = len(book_nodes)
+
+    indptr, indices = _incidence(graph, book_nodes)
+
+    keys = np.empty(0, dtype=np.int64)
+    weights = np.empty(0, dtype=np.int64)
+    pending, pending_pairs = [], 0
+
+    def reduce_pending():
+        nonlocal keys, weights, pending, pending_pairs
+        chunk_keys, chunk_weights = np.unique(np.concatenate(pending), return_counts=True)
+        keys, weights = _merge(keys, weights, chunk_keys, chunk_weights)
+        pending, pending_pairs = [], 0
+
+    for block in _pair_blocks(indptr, indices, n):
+        pending.append(block)
+        pending_pairs += len(block)
+        if pending_pairs >= CHUNK_PAIRS:
+            reduce_pending()
+    if pending:
+        reduce_pending()
+
+    if min_weight > 1:
+        keep = weights >= min_weight
+        keys, weights = keys[keep], weights[keep]
+
+    return Projection(
+        nodes=book_nodes,
+        sources=(keys // n).astype(np.int64) if n else keys,
+        targets=(keys % n).astype(np.int64) if n else keys,
+        weights=weights.astype(np.int64),
+    )
+
+
+def projected_graph(graph, book_nodes=None, min_weight: int = 1) -> nx.Graph:
+    """Drop-in replacement for bipartite.weighted_projected_graph(graph, book_nodes).
+
+    book_nodes must be the whole book side of the graph: for a subset,
+    networkx also links the given books to books outside it, while this
+    keeps both ends of every edge inside book_nodes.
+    """
+    return project(graph, book_nodes, min_weight=min_weight).to_networkx(graph)
+
+
+def cached_projection(graph) -> Projection:
+    """project(graph) over all of its books, cached in state.PROJECTIONS.
+
+    Graphs owned by an IncrementalGraphBuilder carry a "subject_version"
+    that changes only when book↔author/subject links do, so the projection
+    is reused across views and enrichment passes until then. Other graphs
+    are projected on every call.
+    """
+    with state.GRAPH_LOCK:
+        version = graph.graph.get("subject_version")
+        if version is None:
+            return project(graph)
+        cached = state.PROJECTIONS.get(graph)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        projection = project(graph)
+        state.PROJECTIONS[graph] = (version, projection)
+        return projection
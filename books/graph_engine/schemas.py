@@ -24,3 +24,7 @@ class BookNode:
 
     # Goodreads data
     goodreads_id: Optional[str] = None
+    shelf: Optional[str] = None       # Exclusive Shelf: "read", "to-read", "currently-reading"
+    date_read: Optional[str] = None   # As exported, e.g. "2024/03/17"
+    isbn_13: Optional[str] = None
+    isbn_10: Optional[str] = None
@@ -0,0 +1,68 @@
+import re
+from collections import Counter
+from itertools import combinations
+
+_SERIES_NUMBER_RE = re.compile(r'\s*[#(]\d+[)\s].*$')
+
+
+def series_base(title: str) -> str:
+    """Title with trailing series numbers ("#1", "(1)") and ": subtitle" removed, lower-cased."""
+    t = _SERIES_NUMBER_RE.sub('', title)
+    t = t.split(":")[0]
+    return t.lower().strip()
+
+
+def _word_pairs(title: str):
+    """Every pair of (position, word) in the lower-cased title, as one hashable key each."""
+    words = title.lower().split()
+    return combinations(enumerate(words), 2)
+
+
+class SeriesIndex:
+    """Answers "is this candidate in a series the reader already started?" without a scan.
+
+    Matches views._detect_series(read_title, candidate) for any read title:
+    a read title with a series base of 4+ characters matches a candidate
+    with the same base, or one sharing the same word at two or more
+    positions (word i of both titles equal, for two different i). Each
+    indexed title stores its base and every pair of positioned words in
+    hash maps, so a lookup costs O(words in the candidate²) no matter how
+    many titles are indexed. Counts let titles be removed again.
+    """
+
+    def __init__(self, titles=()):
+        self._bases = Counter()
+        self._pairs = Counter()
+        for title in titles:
+            self.add(title)
+
+    @staticmethod
+    def _keys(title: str):
+        base = series_base(title)
+        if len(base) < 4:
+            return None, ()
+        return base, _word_pairs(title)
+
+    def add(self, title: str) -> None:
+        base, pairs = self._keys(title)
+        if base is None:
+            return
+        self._bases[base] += 1
+        self._pairs.update(pairs)
+
+    def remove(self, title: str) -> None:
+        base, pairs = self._keys(title)
+        if base is None:
+            return
+        self._bases.subtract([base])
+        self._pairs.subtract(pairs)
+        if self._bases[base] <= 0:
+            del self._bases[base]
+        for pair in _word_pairs(title):
+            if self._pairs.get(pair, 1) <= 0:
+                del self._pairs[pair]
+
+    def matches(self, candidate: str) -> bool:
+        if series_base(candidate) in self._bases:
+            return True
+        return any(pair in self._pairs for pair in _word_pairs(candidate))
@@ -1,11 +1,26 @@
+import threading
+import weakref
+
 # Global application state — shared across all views within one server process.
 # Note: with multiple concurrent users, they would overwrite each other's data.
 # Intended for single-user / personal use only.
 
 BOOK_NODES = []            # List of BookNode objects after CSV upload
 WANT_TO_READ_NODES = []   # List of BookNode objects from user's to-read / currently-reading shelf
+LIBRARY_INDEX = None       # library_index.LibraryIndex over BOOK_NODES and WANT_TO_READ_NODES
 GRAPH = None               # NetworkX graph built from BOOK_NODES
+GENRE_GRAPH = None         # Book↔normalised-subject graph used for community detection
+# IncrementalGraphBuilder that owns GRAPH and GENRE_GRAPH. Background enrichment
+# updates both graphs in place under GRAPH_LOCK; hold it while iterating them.
+GRAPH_BUILDER = None
+GRAPH_LOCK = threading.RLock()
+# Book-book projections of the live graphs, shared by community detection and the
+# full network view: graph → (subject version, Projection). Weakly keyed, so a
+# replaced graph drops out; see projection.cached_projection.
+PROJECTIONS = weakref.WeakKeyDictionary()
 COMMUNITIES = None         # Cached community clusters (list of dicts from universe.py)
+# Last community detection run: backend, library size, wall time and modularity.
+COMMUNITY_REPORT = {}
 
 # Progress tracking for the upload flow.
 # phase: "idle" | "parsing" | "fetching" | "building" | "done"
@@ -18,3 +33,17 @@ UNIVERSE_VERSION = 0
 # Progress of the background cover/subject fetching thread.
 # done=True once the thread has finished processing all books.
 BACKGROUND_PROGRESS = {"current": 0, "total": 0, "done": True}
+
+# Progress of the precompute phase that renders every read book's ego graph
+# into the page cache once enrichment is done (see books/precompute.py).
+# stopped names why it ended early ("library changed", "replaced", "cache full").
+PRECOMPUTE_PROGRESS = {"current": 0, "total": 0, "rendered": 0, "done": True, "stopped": None}
+
+# Ego-graph requests rendered with recommendation sources still pending, keyed
+# by token, for their follow-up requests (see books/recommendations.py).
+PENDING_RECOMMENDATIONS = {}
+
+# Upload jobs started by upload_goodreads, keyed by job id (see books/jobs.py).
+# Only the most recent upload's job is allowed to publish into the globals above.
+UPLOAD_JOBS = {}
+CURRENT_JOB_ID = None
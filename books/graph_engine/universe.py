@@ -1,6 +1,7 @@
 import html as _html
 import json
 import re
+import time
 
 from pyvis.network import Network
 
@@ -152,12 +153,105 @@ def _generate_tooltip_html(label: str, book_count: int, analysis: dict) -> str:
 
 # ── Community detection ─────────────────────────────────────────────────────────
 
-def detect_communities(graph) -> list:
-    """Detect reading-taste communities using greedy modularity maximisation.
+# Backend used by detect_communities: a key of COMMUNITY_BACKENDS, or "auto" to
+# pick Louvain for libraries up to AUTO_LOUVAIN_MAX_BOOKS books and
+# AUTO_LOUVAIN_MAX_EDGES projected edges, and label propagation above that.
+COMMUNITY_BACKEND = "auto"
+AUTO_LOUVAIN_MAX_BOOKS = 2_000
+AUTO_LOUVAIN_MAX_EDGES = 1_000_000
+
+# Louvain with resolution > 1 produces more fine-grained clusters; the label
+# propagation backend uses the same resolution in its modularity penalty.
+_RESOLUTION = 1.5
+
+COMMUNITY_BACKENDS = {}
+
+
+def community_backend(name: str):
+    """Register a detection backend: fn(projection, graph) → iterable of book node id collections.
+
+    The projection has isolated books (no shared subjects) still in it;
+    backends should leave them out of every community.
+    """
+    def decorator(func):
+        COMMUNITY_BACKENDS[name] = func
+        return func
+    return decorator
+
+
+@community_backend("louvain")
+def _louvain(projection, graph):
+    import networkx as nx
+    from networkx.algorithms.community import (
+        louvain_communities,
+        greedy_modularity_communities,
+    )
+
+    projected = projection.to_networkx(graph)
+    # Drop isolated books that share no subjects with any other book.
+    projected.remove_nodes_from(list(nx.isolates(projected)))
+
+    # Fall back to greedy if Louvain is unavailable (older NetworkX).
+    try:
+        return louvain_communities(projected, weight="weight", resolution=_RESOLUTION, seed=42)
+    except Exception:
+        return greedy_modularity_communities(projected, weight="weight")
+
+
+@community_backend("label_propagation")
+def _label_propagation(projection, graph):
+    from books.graph_engine.modularity import label_propagation
+
+    membership = label_propagation(projection, resolution=_RESOLUTION)
+    communities: dict = {}
+    for node, label in zip(projection.nodes, membership.tolist()):
+        if label >= 0:
+            communities.setdefault(label, []).append(node)
+    return communities.values()
+
+
+def choose_backend(projection) -> str:
+    """Resolve COMMUNITY_BACKEND, applying the "auto" size thresholds."""
+    if COMMUNITY_BACKEND != "auto":
+        return COMMUNITY_BACKEND
+    if len(projection.nodes) <= AUTO_LOUVAIN_MAX_BOOKS and projection.edge_count <= AUTO_LOUVAIN_MAX_EDGES:
+        return "louvain"
+    return "label_propagation"
+
+
+def _report(backend: str, projection, communities, seconds: float, resolution: float) -> None:
+    """Record how the last detection went in state.COMMUNITY_REPORT (shown by the diagnostics endpoint).
+
+    Modularity is scored at the resolution the backend optimised for.
+    """
+    import numpy as np
+    from books.graph_engine import state
+    from books.graph_engine.modularity import modularity
+
+    index = {node: i for i, node in enumerate(projection.nodes)}
+    membership = np.full(len(projection.nodes), -1, dtype=np.int64)
+    for label, book_nodes in enumerate(communities):
+        membership[[index[node] for node in book_nodes]] = label
+    state.COMMUNITY_REPORT = {
+        "backend": backend,
+        "books": len(projection.nodes),
+        "edges": projection.edge_count,
+        "communities": len(communities),
+        "seconds": round(seconds, 3),
+        "resolution": resolution,
+        "modularity": round(modularity(projection, membership, resolution), 4),
+    }
+
+
+def detect_communities(graph, backend: str = None) -> list:
+    """Detect reading-taste communities by modularity maximisation.
 
     Projects the bipartite book↔subject graph onto a book-book graph first
     (an edge = shared subject, weight = number of shared subjects), then runs
     community detection on that projection so books genuinely cluster by genre.
+    `backend` names one of COMMUNITY_BACKENDS and defaults to
+    COMMUNITY_BACKEND; the backend used, its wall time and the modularity of
+    the result are recorded in state.COMMUNITY_REPORT.
 
     Returns a list of cluster dicts sorted by book count (largest first).
     Each dict contains:
@@ -170,59 +264,136 @@ def detect_communities(graph) -> list:
         return []
 
     try:
-        import networkx as nx
-        from networkx.algorithms import bipartite
-        from networkx.algorithms.community import (
-            louvain_communities,
-            greedy_modularity_communities,
-        )
-
-        book_node_set = {n for n, d in graph.nodes(data=True) if d.get("type") == "book"}
-        if len(book_node_set) < 4:
-            return []
+        from books.graph_engine.projection import cached_projection
 
         # Project bipartite book↔subject graph to book-book graph.
         # Edge weight = number of shared subjects between two books.
-        projected = bipartite.weighted_projected_graph(graph, book_node_set)
-
-        # Drop isolated books that share no subjects with any other book.
-        projected.remove_nodes_from(list(nx.isolates(projected)))
-        if len(projected) < 4:
+        projection = cached_projection(graph)
+        if int((projection.degree() > 0).sum()) < 4:
             return []
 
-        # Louvain with resolution > 1 produces more fine-grained clusters.
-        # Fall back to greedy if Louvain is unavailable (older NetworkX).
-        try:
-            raw = list(louvain_communities(projected, weight="weight", resolution=1.5, seed=42))
-        except Exception:
-            raw = list(greedy_modularity_communities(projected, weight="weight"))
+        backend = backend or choose_backend(projection)
+        start = time.perf_counter()
+        raw = [list(comm) for comm in COMMUNITY_BACKENDS[backend](projection, graph)]
+        _report(backend, projection, raw, time.perf_counter() - start, _RESOLUTION)
     except Exception:
         return []
 
+    degree = dict(zip(projection.nodes, projection.degree().tolist()))
     result = []
     for i, comm in enumerate(raw):
         book_nodes = list(comm)
-        if not book_nodes:
-            continue
+        if book_nodes:
+            result.append(_build_cluster(i, book_nodes, graph, degree))
+
+    return sorted(result, key=lambda c: c["book_count"], reverse=True)
 
-        analysis = _analyze_cluster(book_nodes, graph)
-        label = _generate_cluster_label(analysis, i)
-        signals = _generate_explanation_signals(analysis)
-        tooltip_html = _generate_tooltip_html(label, len(book_nodes), analysis)
 
+def _build_cluster(number: int, book_nodes: list, graph, degree: dict) -> dict:
+    analysis = _analyze_cluster(book_nodes, graph)
+    label = _generate_cluster_label(analysis, number)
+    signals = _generate_explanation_signals(analysis)
+    tooltip_html = _generate_tooltip_html(label, len(book_nodes), analysis)
+
+    return {
+        "id": f"cluster::{number}",
+        "name": label,
+        "book_count": len(book_nodes),
+        "book_nodes": book_nodes,
         # Representative book: most connected in the book-book projected graph
-        rep_book = max(book_nodes, key=lambda n: projected.degree(n))
-
-        result.append({
-            "id": f"cluster::{i}",
-            "name": label,
-            "book_count": len(book_nodes),
-            "book_nodes": book_nodes,
-            "representative_book": rep_book,
-            "top_genres": analysis["genres"][:3],
-            "explanation_signals": signals,
-            "tooltip_html": tooltip_html,
-        })
+        "representative_book": max(book_nodes, key=lambda n: degree.get(n, 0)),
+        "top_genres": analysis["genres"][:3],
+        "explanation_signals": signals,
+        "tooltip_html": tooltip_html,
+    }
+
+
+def _cluster_number(cluster: dict) -> int:
+    return int(cluster["id"].rsplit("::", 1)[1])
+
+
+def update_communities(graph, previous: list, changed_book_nodes, max_changed_share: float = 0.25) -> list:
+    """Update an earlier detect_communities result after some books changed.
+
+    Instead of re-running Louvain from scratch, the previous partition seeds
+    Louvain's local-moving phase (graph_engine/modularity.py), and only the
+    changed books, their projected neighbours, books new to the projection
+    and the clusters that lost a book are revisited. Clusters keep their
+    "cluster::N" ids; clusters whose membership and books are unchanged are
+    reused as-is, so their labels and tooltips are not regenerated.
+
+    changed_book_nodes are the book node ids whose subject (or author) links
+    changed, were added, or were removed. Falls back to detect_communities
+    when there is no previous partition or more than max_changed_share of
+    the library changed.
+    """
+    changed = set(changed_book_nodes)
+    if not previous or graph is None:
+        return detect_communities(graph)
+
+    try:
+        import numpy as np
+        from books.graph_engine.modularity import adjacency, local_moving
+        from books.graph_engine.projection import cached_projection
+
+        projection = cached_projection(graph)
+        nodes = projection.nodes
+        if len(nodes) < 4 or len(changed) > max_changed_share * len(nodes):
+            return detect_communities(graph)
+
+        start = time.perf_counter()
+        index = {node: i for i, node in enumerate(nodes)}
+        degree_array = projection.degree()
+        membership = np.full(len(nodes), -1, dtype=np.int64)
+        previous_members = {}
+        affected = set()
+        for cluster in previous:
+            number = _cluster_number(cluster)
+            previous_members[number] = set(cluster["book_nodes"])
+            for node in cluster["book_nodes"]:
+                i = index.get(node)
+                if i is None:
+                    affected.add(number)      # book removed from the library
+                elif degree_array[i] > 0:
+                    membership[i] = number
+                else:
+                    affected.add(number)      # book no longer shares a subject
+
+        next_number = max(previous_members, default=-1) + 1
+        active = set()
+        for i in np.flatnonzero((membership < 0) & (degree_array > 0)).tolist():
+            membership[i] = next_number       # new to the projection: start alone
+            next_number += 1
+            active.add(i)
+
+        indptr, indices, _ = adjacency(projection)
+        for node in changed:
+            i = index.get(node)
+            if i is not None:
+                active.add(i)
+                active.update(indices[indptr[i]:indptr[i + 1]].tolist())
+        for i in np.flatnonzero(np.isin(membership, list(affected))).tolist():
+            active.add(i)
+
+        local_moving(projection, membership, active, resolution=_RESOLUTION)
+    except Exception:
+        return detect_communities(graph)
+
+    members = {}
+    for node, number in zip(nodes, membership.tolist()):
+        if number >= 0:
+            members.setdefault(number, []).append(node)
+    _report("warm_start", projection, list(members.values()), time.perf_counter() - start, _RESOLUTION)
+
+    degree = dict(zip(nodes, degree_array.tolist()))
+    reusable = {_cluster_number(c): c for c in previous}
+    result = []
+    for number, book_nodes in members.items():
+        old = reusable.get(number)
+        if old is not None and previous_members[number] == set(book_nodes) and not changed & previous_members[number]:
+            result.append({**old, "representative_book": max(book_nodes, key=lambda n: degree.get(n, 0))})
+        else:
+            result.append(_build_cluster(number, book_nodes, graph, degree))
 
     return sorted(result, key=lambda c: c["book_count"], reverse=True)
 
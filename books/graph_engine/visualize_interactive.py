@@ -1,8 +1,9 @@
 import json
 
-import networkx as nx
 from pyvis.network import Network
 
+_FONT_COLOR = "#4c483c"
+
 
 def truncate(text, max_len=30):
     """Shorten text to max_len characters, appending an ellipsis if truncated."""
@@ -11,14 +12,171 @@ def truncate(text, max_len=30):
     return text if len(text) <= max_len else text[:27] + "…"
 
 
-def visualize_book_ego_graph_interactive(graph, focus_book_id):
+def _ego_nodes(graph, source, radius: int) -> dict:
+    """Nodes within `radius` hops of source, in breadth-first order (as nx.ego_graph).
+
+    Only uses graph.adj, so it works on both a networkx.Graph and an
+    OverlayGraph without materialising a subgraph.
+    """
+    seen = {source: 0}
+    frontier = [source]
+    for depth in range(1, radius + 1):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in graph.adj[node]:
+                if neighbour not in seen:
+                    seen[neighbour] = depth
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return seen
+
+
+def _ego_edges(graph, nodes):
+    """Yield (u, v, data) once for every edge between two of `nodes`."""
+    done = set()
+    for u in nodes:
+        for v, data in graph.adj[u].items():
+            if v in nodes and v not in done:
+                yield u, v, data
+        done.add(u)
+
+
+def _vis_node(node, data, focus_book_id) -> dict:
+    """vis.js options for one node, plus its click/hover card data and cover overlay.
+
+    Returns {"attrs": ...} with optional "click", "hover" and "cover" entries.
+    """
+    node_type = data.get("type")
+
+    if node_type == "book":
+        full_title = data.get("title", "")
+        label = truncate(full_title)
+        cover_url = data.get("cover_url")
+        rating = data.get("rating")
+        element = {}
+
+        if data.get("unread"):
+            border_color = "#e8a020"
+            size = 44
+            element["click"] = {
+                "title": full_title,
+                "author": data.get("author", ""),
+                "cover_url": cover_url or "",
+                "reason": data.get("reason", ""),
+                "signals": data.get("signals", []),
+                "similarity_score": data.get("similarity_score", 0.65),
+            }
+        else:
+            border_color = "#ebe8dd" if node == focus_book_id else "#b7c7c2"
+            size = 30 if node == focus_book_id else 22
+
+        element["hover"] = {
+            "title": full_title,
+            "author": data.get("author", ""),
+            "rating": rating,
+            "cover_url": cover_url or "",
+            "unread": bool(data.get("unread")),
+        }
+
+        if cover_url and data.get("unread"):
+            element["cover"] = {"url": cover_url, "color": border_color, "size": size}
+            element["attrs"] = {
+                "label": label,
+                "title": "",
+                "shape": "image",
+                "image": cover_url,
+                "color": {"border": border_color, "background": border_color},
+                "borderWidth": 6,
+                "size": size,
+            }
+        else:
+            element["attrs"] = {"label": label, "title": "", "color": border_color, "size": size}
+        return element
+
+    if node_type == "author":
+        return {"attrs": {"label": data.get("name", ""), "title": "", "color": "#c4b7a6", "size": 16}}
+
+    if node_type == "award":
+        return {"attrs": {
+            "label": data.get("name", ""),
+            "title": "",
+            "color": {"background": "#d4af7a", "border": "#b8922e"},
+            "size": 16,
+            "shape": "diamond",
+        }}
+
+    if node_type == "era":
+        return {"attrs": {
+            "label": data.get("name", ""),
+            "title": "",
+            "color": {"background": "#a8b8c8", "border": "#6a8ca8"},
+            "size": 16,
+            "shape": "triangle",
+        }}
+
+    return {"attrs": {
+        "label": data.get("name") or "",
+        "title": "",
+        "color": {"background": "#c4b7a6", "border": "#c4b7a6"},
+        "size": 14,
+    }}
+
+
+def _vis_edge(data) -> dict:
+    return {
+        "value": data.get("weight", 1.0),
+        "title": data.get("title"),
+        "color": "rgba(120, 110, 90, 0.35)",
+        "smooth": True,
+    }
+
+
+def ego_graph_elements(graph, focus_book_id):
+    """(node ids, edge keys) of the radius-4 ego graph as rendered; edge keys are frozensets."""
+    nodes = _ego_nodes(graph, focus_book_id, radius=4)
+    return set(nodes), {frozenset((u, v)) for u, v, _ in _ego_edges(graph, nodes)}
+
+
+def ego_graph_update(graph, focus_book_id, rendered_nodes: set, rendered_edges: set) -> dict:
+    """vis.js nodes and edges of the ego graph that are not yet rendered, with their card data.
+
+    Used to add late recommendations to a graph already on screen. The
+    returned elements are added to rendered_nodes / rendered_edges.
+    """
+    nodes = _ego_nodes(graph, focus_book_id, radius=4)
+    update = {"nodes": [], "edges": [], "click": {}, "hover": {}, "cover": {}}
+    for node in nodes:
+        if node in rendered_nodes:
+            continue
+        element = _vis_node(node, graph.nodes[node], focus_book_id)
+        update["nodes"].append({"id": node, "shape": "dot", "font": {"color": _FONT_COLOR}, **element["attrs"]})
+        for key in ("click", "hover", "cover"):
+            if key in element:
+                update[key][node] = element[key]
+        rendered_nodes.add(node)
+    for source, target, data in _ego_edges(graph, nodes):
+        key = frozenset((source, target))
+        if key not in rendered_edges:
+            update["edges"].append({"from": source, "to": target, **_vis_edge(data)})
+            rendered_edges.add(key)
+    return update
+
+
+def visualize_book_ego_graph_interactive(graph, focus_book_id, pending_url=None):
     """Generate an interactive PyVis ego-graph centered on the given book.
 
     Uses an ego-graph with radius 4 to show direct and indirect connections.
+    graph may be a networkx.Graph or an OverlayGraph of request-local
+    recommendations over the shared library graph.
     Clicking an unread recommendation node sends a postMessage to the React
     parent so the detail panel can display the full explanation.
     Returns the graph as a self-contained HTML string.
 
+    If pending_url is given, some recommendations are still being fetched:
+    the page long-polls that URL and adds the nodes and edges it returns
+    (see ego_graph_update) to the running network, posting a
+    RECOMMENDATIONS_UPDATE message to the parent after each poll.
+
     Node colors:
       - Selected book:          dark green  (#8fa6a0)
       - Other read books:       light green (#b7c7c2)
@@ -32,12 +190,12 @@ def visualize_book_ego_graph_interactive(graph, focus_book_id):
         height="670px",
         width="100%",
         bgcolor="#ebe8dd",
-        font_color="#4c483c",
+        font_color=_FONT_COLOR,
         notebook=False,
         cdn_resources="in_line",
     )
 
-    ego = graph.subgraph(nx.ego_graph(graph, focus_book_id, radius=4).nodes)
+    ego_nodes = _ego_nodes(graph, focus_book_id, radius=4)
 
     # Data sent via postMessage when an unread book node is clicked
     click_node_info = {}
@@ -48,98 +206,20 @@ def visualize_book_ego_graph_interactive(graph, focus_book_id):
     # Cover URL + size for each image node (used for custom cropped rendering)
     cover_nodes = {}
 
-    for node, data in ego.nodes(data=True):
-        node_type = data.get("type")
-
-        if node_type == "book":
-            full_title = data.get("title", "")
-            label = truncate(full_title)
-            cover_url = data.get("cover_url")
-            rating = data.get("rating")
-
-            if data.get("unread"):
-                border_color = "#e8a020"
-                size = 44
-                click_node_info[node] = {
-                    "title": full_title,
-                    "author": data.get("author", ""),
-                    "cover_url": cover_url or "",
-                    "reason": data.get("reason", ""),
-                    "signals": data.get("signals", []),
-                    "similarity_score": data.get("similarity_score", 0.65),
-                }
-            else:
-                border_color = "#ebe8dd" if node == focus_book_id else "#b7c7c2"
-                size = 30 if node == focus_book_id else 22
-
-            hover_node_info[node] = {
-                "title": full_title,
-                "author": data.get("author", ""),
-                "rating": rating,
-                "cover_url": cover_url or "",
-                "unread": bool(data.get("unread")),
-            }
-
-            if cover_url and data.get("unread"):
-                image_overlay_nodes[node] = {"color": border_color, "size": size}
-                cover_nodes[node] = {"url": cover_url, "size": size}
-                net.add_node(
-                    node,
-                    label=label,
-                    title="",
-                    shape="image",
-                    image=cover_url,
-                    color={"border": border_color, "background": border_color},
-                    borderWidth=6,
-                    size=size,
-                )
-            else:
-                net.add_node(node, label=label, title="", color=border_color, size=size)
-
-        elif node_type == "author":
-            label = data.get("name", "")
-            net.add_node(node, label=label, title="", color="#c4b7a6", size=16)
-
-        elif node_type == "award":
-            label = data.get("name", "")
-            net.add_node(
-                node,
-                label=label,
-                title="",
-                color={"background": "#d4af7a", "border": "#b8922e"},
-                size=16,
-                shape="diamond",
-            )
-
-        elif node_type == "era":
-            label = data.get("name", "")
-            net.add_node(
-                node,
-                label=label,
-                title="",
-                color={"background": "#a8b8c8", "border": "#6a8ca8"},
-                size=16,
-                shape="triangle",
-            )
-
-        else:
-            net.add_node(
-                node,
-                label=data.get("name") or "",
-                title="",
-                color={"background": "#c4b7a6", "border": "#c4b7a6"},
-                size=14,
-            )
-
-    for source, target, data in ego.edges(data=True):
-        net.add_edge(
-            source,
-            target,
-            value=data.get("weight", 1.0),
-            title=data.get("title"),
-            color="rgba(120, 110, 90, 0.35)",
-            smooth=True,
-        )
+    for node in ego_nodes:
+        element = _vis_node(node, graph.nodes[node], focus_book_id)
+        attrs = dict(element["attrs"])
+        net.add_node(node, shape=attrs.pop("shape", "dot"), **attrs)
+        if "click" in element:
+            click_node_info[node] = element["click"]
+        if "hover" in element:
+            hover_node_info[node] = element["hover"]
+        if "cover" in element:
+            image_overlay_nodes[node] = {"color": element["cover"]["color"], "size": element["cover"]["size"]}
+            cover_nodes[node] = {"url": element["cover"]["url"], "size": element["cover"]["size"]}
+
+    for source, target, data in _ego_edges(graph, ego_nodes):
+        net.add_edge(source, target, **_vis_edge(data))
 
     net.set_options("""
     {
@@ -182,6 +262,7 @@ def visualize_book_ego_graph_interactive(graph, focus_book_id):
     hover_node_info_json = json.dumps(hover_node_info)
     overlay_nodes_json = json.dumps(image_overlay_nodes)
     cover_nodes_json = json.dumps(cover_nodes)
+    pending_url_json = json.dumps(pending_url)
 
     injected_script = f"""
     <style>
@@ -220,13 +301,35 @@ def visualize_book_ego_graph_interactive(graph, focus_book_id):
       // Preload cover images for cropped rendering
       var coverNodes = {{}};
       var rawCoverNodes = {cover_nodes_json};
+      function preloadCover(nid, info) {{
+        var img = new Image();
+        img.onload = function() {{ if (typeof network !== "undefined") network.redraw(); }};
+        img.src = info.url;
+        coverNodes[nid] = {{ imgEl: img, size: info.size }};
+      }}
       for (var _nid in rawCoverNodes) {{
-        (function(nid, info) {{
-          var img = new Image();
-          img.onload = function() {{ if (typeof network !== "undefined") network.redraw(); }};
-          img.src = info.url;
-          coverNodes[nid] = {{ imgEl: img, size: info.size }};
-        }})(_nid, rawCoverNodes[_nid]);
+        preloadCover(_nid, rawCoverNodes[_nid]);
+      }}
+
+      // ── Late recommendations: long-poll and merge into the running network ─
+      var pendingUrl = {pending_url_json};
+      function pollPending() {{
+        fetch(pendingUrl + "?wait=5")
+          .then(function(response) {{ return response.ok ? response.json() : null; }})
+          .then(function(update) {{
+            if (!update) return;
+            network.body.data.nodes.update(update.nodes);
+            network.body.data.edges.add(update.edges);
+            Object.assign(clickNodeInfo, update.click);
+            Object.assign(hoverNodeInfo, update.hover);
+            for (var nid in update.cover) {{
+              overlayNodes[nid] = {{ color: update.cover[nid].color, size: update.cover[nid].size }};
+              preloadCover(nid, update.cover[nid]);
+            }}
+            window.parent.postMessage({{ type: "RECOMMENDATIONS_UPDATE", pending: update.pending }}, "*");
+            if (update.status === "pending") pollPending();
+          }})
+          .catch(function() {{}});
       }}
 
       // ── Graph load animation ─────────────────────────────────────────────
@@ -366,6 +469,8 @@ def visualize_book_ego_graph_interactive(graph, focus_book_id):
         network.on("blurNode", function() {{
           hoverCard.style.display = "none";
         }});
+
+        if (pendingUrl) pollPending();
       }}, 300);
 
       // Track mouse position for the hover card
@@ -1,5 +1,7 @@
-import requests
+from books import transport
+from books.book_cache import get_cached_book, update_book
 from books.openlibrary.client import safe_cache_key, normalize_title
+from books.singleflight import single_flight
 
 INVENTAIRE_URL = "https://inventaire.io/api/entities"
 
@@ -12,19 +14,25 @@ def _image_url(raw):
 
 
 def _search(query, limit=3):
-    """Raw search against the Inventaire entities API. Returns result list."""
+    """Raw search against the Inventaire entities API. Returns result list.
+
+    Raises transport.UpstreamUnavailable when the host is shedding load, so
+    callers don't mistake "not asked" for "nothing found".
+    """
     try:
-        resp = requests.get(
+        resp = transport.get(
             INVENTAIRE_URL,
             params={"action": "search", "search": query, "types": "works", "lang": "en", "limit": limit},
-            timeout=8,
         )
         resp.raise_for_status()
         return resp.json().get("results", [])
+    except transport.UpstreamUnavailable:
+        raise
     except Exception:
         return []
 
 
+@single_flight("inventaire.cover")
 def fetch_cover(title, author):
     """
     Fetch a cover image from Inventaire for a book.
@@ -34,23 +42,22 @@ def fetch_cover(title, author):
     the cover URL (or None). This ensures each book is only ever looked up once
     per 30-day period.
     """
-    from books.models import CachedBook
-
     # DB cache check
-    try:
-        cached = CachedBook.objects.get(title=title, author=author)
+    cached = get_cached_book(title, author)
+    if cached is not None:
         if cached.cover_url:
             return cached.cover_url
         if cached.inventaire_fetched and not cached.is_stale():
             return None  # Already tried; nothing found
-    except CachedBook.DoesNotExist:
-        pass
 
     clean_title = normalize_title(title)
-    results = (
-        _search(f"{clean_title} {author}")
-        or _search(clean_title)
-    )
+    try:
+        results = (
+            _search(f"{clean_title} {author}")
+            or _search(clean_title)
+        )
+    except transport.UpstreamUnavailable:
+        return None  # not recorded as tried; retried on the next pass
 
     cover_url = None
     inventaire_uri = ""
@@ -61,17 +68,12 @@ def fetch_cover(title, author):
             inventaire_uri = entity.get("uri", "")
             break
 
-    obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-    if not obj.cover_url and cover_url:
-        obj.cover_url = cover_url
-    if not obj.inventaire_uri and inventaire_uri:
-        obj.inventaire_uri = inventaire_uri
-    obj.inventaire_fetched = True
-    obj.save()
+    update_book(title, author, cover_url=cover_url, inventaire_uri=inventaire_uri, inventaire_fetched=True)
 
     return cover_url
 
 
+@single_flight("inventaire.subject")
 def fetch_books_by_subject(subject, limit=8):
     """
     Fetch books in a given subject/genre from Inventaire.
@@ -87,7 +89,10 @@ def fetch_books_by_subject(subject, limit=8):
     if cached is not None:
         return cached
 
-    results = _search(subject, limit=limit + 5)
+    try:
+        results = _search(subject, limit=limit + 5)
+    except transport.UpstreamUnavailable:
+        return []
 
     books = []
     for entity in results:
@@ -131,7 +136,10 @@ def fetch_books_by_author(author, read_titles, limit=10):
     if cached is not None:
         return [b for b in cached if normalize_title(b["title"]).lower() not in read_titles]
 
-    results = _search(f"{author}", limit=limit + 5)
+    try:
+        results = _search(f"{author}", limit=limit + 5)
+    except transport.UpstreamUnavailable:
+        return []
 
     all_books = []
     for entity in results:
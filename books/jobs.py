@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+import uuid
+
+from books.graph_engine import state
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status polling; older ones are dropped when a new job starts.
+MAX_FINISHED_JOBS = 20
+
+_LOCK = threading.Lock()
+
+
+def _prune_finished() -> None:
+    finished = [j for j in state.UPLOAD_JOBS.values() if j["status"] in ("done", "failed")]
+    finished.sort(key=lambda j: j["finished_at"])
+    for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        state.UPLOAD_JOBS.pop(job["id"], None)
+
+
+def start_job(target, *args) -> str:
+    """Run target(job, *args) on a daemon thread and return the new job's id.
+
+    The job dict is stored in state.UPLOAD_JOBS and becomes the current job,
+    so any earlier job still running stops enriching and publishing results
+    (see is_current and superseded).
+    target updates job["phase"] / job["result"] as it goes; the final status
+    ("done" or "failed") is set here.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "phase": "queued",
+        "result": None,
+        "error": None,
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+    with _LOCK:
+        _prune_finished()
+        state.UPLOAD_JOBS[job_id] = job
+        state.CURRENT_JOB_ID = job_id
+
+    threading.Thread(target=_run, args=(job, target, args), daemon=True).start()
+    return job_id
+
+
+def finish_job(result: dict) -> str:
+    """Register an already-completed job carrying result, make it current, and return its id.
+
+    Used when an upload is answered from a snapshot, so the frontend's job
+    polling works the same as for a real run.
+    """
+    now = time.time()
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "done",
+        "phase": "done",
+        "result": result,
+        "error": None,
+        "started_at": now,
+        "finished_at": now,
+    }
+    with _LOCK:
+        _prune_finished()
+        state.UPLOAD_JOBS[job_id] = job
+        state.CURRENT_JOB_ID = job_id
+    return job_id
+
+
+def _run(job: dict, target, args) -> None:
+    job["status"] = "running"
+    try:
+        target(job, *args)
+        job["status"] = "done"
+    except Exception as e:
+        logger.exception("Upload job %s failed", job["id"])
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+        from django.db import connection
+        connection.close()
+
+
+def is_current(job: dict) -> bool:
+    """Return True if no newer upload has replaced this job."""
+    return state.CURRENT_JOB_ID == job["id"]
+
+
+def current_job_running() -> bool:
+    """True while the current job, including its background enrichment, has not finished."""
+    job = state.UPLOAD_JOBS.get(state.CURRENT_JOB_ID)
+    return job is not None and job["status"] not in ("done", "failed")
+
+
+def superseded(job: dict):
+    """A should_stop callable for books.enrichment: True once a newer upload has replaced job."""
+    return lambda: not is_current(job)
+
+
+def get_job(job_id: str):
+    return state.UPLOAD_JOBS.get(job_id)
+
+
+def job_status(job: dict) -> dict:
+    """The JSON-safe part of a job for the status endpoint (no result payload)."""
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "phase": job["phase"],
+        "error": job["error"],
+        "result_ready": job["result"] is not None,
+        "progress": dict(state.UPLOAD_PROGRESS) if is_current(job) else None,
+        "background_progress": dict(state.BACKGROUND_PROGRESS) if is_current(job) else None,
+    }
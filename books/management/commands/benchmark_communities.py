@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from books.graph_engine import state
+from books.graph_engine.projection import cached_projection
+from books.graph_engine.universe import COMMUNITY_BACKENDS, choose_backend, detect_communities
+from books.management.commands.benchmark_projection import _synthetic_genre_graph
+
+
+class Command(BaseCommand):
+    help = "Time each community detection backend and report the modularity it reaches (at its resolution)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, nargs="+", default=[1_000, 2_000, 5_000])
+        parser.add_argument("--backends", nargs="+", default=sorted(COMMUNITY_BACKENDS))
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'books':>7}  {'edges':>10}  {'backend':<18}  {'seconds':>8}  "
+            f"{'clusters':>8}  {'modularity':>10}  auto"
+        )
+        for books in options["books"]:
+            graph = _synthetic_genre_graph(books)
+            # Stamp a version so every backend shares one cached projection.
+            graph.graph["subject_version"] = 1
+            auto = choose_backend(cached_projection(graph))
+            for backend in options["backends"]:
+                detect_communities(graph, backend=backend)
+                report = state.COMMUNITY_REPORT
+                self.stdout.write(
+                    f"{books:>7}  {report['edges']:>10}  {backend:<18}  {report['seconds']:>8.2f}  "
+                    f"{report['communities']:>8}  {report['modularity']:>10.4f}  "
+                    f"{'*' if backend == auto else ''}"
+                )
@@ -0,0 +1,84 @@
+import time
+
+import networkx as nx
+import numpy as np
+from django.core.management.base import BaseCommand
+from networkx.algorithms import bipartite
+
+from books.graph_engine.projection import project
+
+
+def _synthetic_genre_graph(books: int, subjects: int = 400, seed: int = 7) -> nx.Graph:
+    """Build a genre-graph-shaped bipartite graph with Zipf-like subject popularity.
+
+    A handful of broad subjects ("Fantasy", "Romance", …) end up shared by a
+    large fraction of the library, which is what makes projection expensive.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, subjects + 1) ** 1.1
+    popularity /= popularity.sum()
+
+    G = nx.Graph()
+    for i in range(books):
+        book_node = f"book::Book {i}::Author {i % max(books // 8, 1)}"
+        G.add_node(book_node, type="book", title=f"Book {i}", author=f"Author {i % max(books // 8, 1)}")
+        for s in np.unique(rng.choice(subjects, size=rng.integers(0, 9), p=popularity)):
+            subject_node = f"subject::Subject {s}"
+            if not G.has_node(subject_node):
+                G.add_node(subject_node, type="subject", name=f"Subject {s}")
+            G.add_edge(book_node, subject_node, weight=1.0)
+    return G
+
+
+def _edge_set(graph) -> set:
+    return {(min(u, v), max(u, v), w) for u, v, w in graph.edges(data="weight")}
+
+
+class Command(BaseCommand):
+    help = "Compare the NumPy book-book projection with networkx's weighted_projected_graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, nargs="+", default=[1_000, 5_000, 10_000])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--networkx-max", type=int, default=5_000,
+            help="Skip the networkx baseline (and the NetworkX conversion) above this many books.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'books':>7}  {'edges':>10}  {'networkx ms':>12}  {'numpy ms':>9}  "
+            f"{'+to_networkx ms':>15}  {'speedup':>8}  match"
+        )
+        for books in options["books"]:
+            graph = _synthetic_genre_graph(books)
+            book_nodes = {n for n, d in graph.nodes(data=True) if d.get("type") == "book"}
+
+            numpy_ms, projection = self._time(lambda: project(graph, book_nodes), options["repeat"])
+
+            if books <= options["networkx_max"]:
+                full_ms, projected = self._time(lambda: project(graph, book_nodes).to_networkx(graph), 1)
+                nx_ms, reference = self._time(
+                    lambda: bipartite.weighted_projected_graph(graph, book_nodes), 1
+                )
+                match = "yes" if _edge_set(reference) == _edge_set(projected) else "NO"
+                speedup = f"{nx_ms / numpy_ms:>7.1f}x"
+                nx_col, full_col = f"{nx_ms:>12.1f}", f"{full_ms:>15.1f}"
+            else:
+                match, speedup = "-", f"{'-':>8}"
+                nx_col, full_col = f"{'skipped':>12}", f"{'skipped':>15}"
+
+            self.stdout.write(
+                f"{books:>7}  {projection.edge_count:>10}  {nx_col}  {numpy_ms:>9.1f}  "
+                f"{full_col}  {speedup}  {match}"
+            )
+
+    @staticmethod
+    def _time(fn, repeat):
+        """Return (best wall time in ms, last result) over `repeat` runs."""
+        best, result = float("inf"), None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return best, result
@@ -0,0 +1,218 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from books.stats import compute_reading_stats
+
+
+def _synthetic_export(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Build a Goodreads-export-shaped DataFrame with realistic gaps and NaNs."""
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    start = np.datetime64(today.replace(year=today.year - 15))
+    span = (np.datetime64(today) - start).astype(int)
+
+    dates = start + rng.integers(0, span, rows).astype("timedelta64[D]")
+    date_read = pd.Series(pd.to_datetime(dates).strftime("%Y/%m/%d"))
+    date_read[rng.random(rows) < 0.1] = None
+
+    pages = rng.integers(40, 1200, rows).astype(float)
+    pages[rng.random(rows) < 0.05] = np.nan
+    pub_years = rng.integers(1800, today.year + 1, rows).astype(float)
+    pub_years[rng.random(rows) < 0.05] = np.nan
+
+    return pd.DataFrame({
+        "Title": [f"Book {i}" for i in range(rows)],
+        "Author": [f"Author {i}" for i in rng.integers(0, max(rows // 8, 1), rows)],
+        "My Rating": rng.integers(0, 6, rows),
+        "Number of Pages": pages,
+        "Original Publication Year": pub_years,
+        "Date Read": date_read,
+        "Exclusive Shelf": rng.choice(["read", "read", "read", "to-read"], rows),
+    })
+
+
+# ── Reference implementation ──────────────────────────────────────────────────
+# The per-subset helpers views.py used before books.stats, kept here so the
+# benchmark can check compute_reading_stats against them.
+
+def compute_cadence(date_series):
+    """Calculate average, median, fastest, and slowest days between books."""
+    dates = (
+        date_series.dropna()
+        .dt.date
+        .drop_duplicates()
+        .sort_values()
+        .tolist()
+    )
+    if len(dates) < 2:
+        return None
+    gaps = [(dates[i] - dates[i - 1]).days for i in range(1, len(dates))]
+    return {
+        "avg_days": round(sum(gaps) / len(gaps), 1),
+        "median_days": sorted(gaps)[len(gaps) // 2],
+        "fastest_days": min(gaps),
+        "slowest_days": max(gaps),
+        "first_finished": dates[0].isoformat(),
+        "last_finished": dates[-1].isoformat(),
+    }
+
+
+def compute_stats(subset):
+    """Calculate summary statistics (books, pages, rating, top author) for a dataframe subset."""
+    if subset.empty:
+        return {"total_books": 0, "total_pages": 0, "avg_rating": 0, "top_author": None}
+
+    avg_rating = 0
+    if "My Rating" in subset.columns:
+        rated = subset[subset["My Rating"] > 0]
+        if not rated.empty:
+            avg_rating = round(rated["My Rating"].mean(), 2)
+
+    total_pages = int(subset["Number of Pages"].fillna(0).sum())
+    top_author = subset["Author"].mode()[0] if "Author" in subset.columns else None
+
+    return {
+        "total_books": len(subset),
+        "total_pages": total_pages,
+        "avg_rating": avg_rating,
+        "top_author": top_author,
+    }
+
+
+def compute_book_lengths(subset):
+    """Calculate page stats: average pages, longest book, and histogram by page range."""
+    pages = subset["Number of Pages"].dropna()
+    if pages.empty:
+        return None
+
+    longest = subset.loc[pages.idxmax()]
+    bins = [
+        (0, 200, "0-200"),
+        (200, 300, "200-300"),
+        (300, 400, "300-400"),
+        (400, 500, "400-500"),
+        (500, float("inf"), "500+"),
+    ]
+    histogram = [
+        {"range": label, "count": int(pages[(pages >= low) & (pages < high)].count())}
+        for low, high, label in bins
+    ]
+    return {
+        "average_pages": int(pages.mean()),
+        "longest_book": {
+            "title": longest.get("Title"),
+            "author": longest.get("Author"),
+            "pages": int(longest.get("Number of Pages")),
+        },
+        "histogram": histogram,
+    }
+
+
+def _legacy_stats(df: pd.DataFrame) -> dict:
+    """The upload_goodreads statistics code as it was before books.stats."""
+    read_df = df[df["Exclusive Shelf"] == "read"]
+    df["Date Read"] = pd.to_datetime(df.get("Date Read"), errors="coerce")
+    df["Year Read"] = df["Date Read"].dt.year
+    df["Month Read"] = df["Date Read"].dt.month
+
+    current_year = datetime.date.today().year
+    df_current_year = df[df["Year Read"] == current_year]
+
+    yearly_counts = df["Year Read"].dropna().value_counts().sort_index().to_dict()
+    monthly_counts = (
+        df_current_year["Month Read"].dropna().value_counts().sort_index().to_dict()
+        if not df_current_year.empty else {}
+    )
+
+    df["Original Publication Year"] = pd.to_numeric(df["Original Publication Year"], errors="coerce")
+    years = df["Original Publication Year"].dropna()
+    oldest_pub_year = int(years.min()) if not years.empty else None
+    pub_counts_all = years.astype(int).value_counts().sort_index().to_dict()
+    pub_counts_this_year = (
+        df_current_year["Original Publication Year"].dropna()
+        .astype(int).value_counts().sort_index().to_dict()
+        if not df_current_year.empty else {}
+    )
+
+    scatter_points_all = [
+        {"pub_year": int(row["Original Publication Year"]), "read_value": int(row["Year Read"])}
+        for _, row in df[["Original Publication Year", "Year Read"]].dropna().iterrows()
+    ]
+    scatter_points_this_year = [
+        {"pub_year": int(row["Original Publication Year"]), "read_value": int(row["Month Read"])}
+        for _, row in df_current_year[["Original Publication Year", "Month Read"]].dropna().iterrows()
+    ]
+
+    return {
+        "overall": {**compute_stats(read_df), "cadence": compute_cadence(df["Date Read"])},
+        "this_year": {
+            **compute_stats(df_current_year),
+            "cadence": compute_cadence(df_current_year["Date Read"]),
+        },
+        "yearly_books": yearly_counts,
+        "monthly_books": monthly_counts,
+        "publication_years_overall": pub_counts_all,
+        "publication_years_this_year": pub_counts_this_year,
+        "scatter_publication_vs_read_all": scatter_points_all,
+        "scatter_publication_vs_read_year": scatter_points_this_year,
+        "book_lengths": {
+            "overall": compute_book_lengths(read_df),
+            "this_year": compute_book_lengths(df_current_year[df_current_year["Exclusive Shelf"] == "read"]),
+        },
+        "oldest_pub_year": oldest_pub_year,
+    }
+
+
+def _normalize(value):
+    """Make legacy and vectorized results comparable.
+
+    The legacy counts are keyed by float years whenever the column contains
+    NaN (e.g. 2019.0); the vectorized engine always uses int keys.
+    """
+    if isinstance(value, dict):
+        return {
+            (int(k) if isinstance(k, float) else k): _normalize(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized statistics engine with the legacy per-subset helpers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'legacy ms':>10}  {'vectorized ms':>14}  {'speedup':>8}  match")
+        for rows in options["rows"]:
+            export = _synthetic_export(rows)
+
+            legacy_ms, legacy = self._time(_legacy_stats, export, options["repeat"])
+            vector_ms, vector = self._time(compute_reading_stats, export, options["repeat"])
+            match = _normalize(legacy) == _normalize(vector)
+
+            self.stdout.write(
+                f"{rows:>8}  {legacy_ms:>10.1f}  {vector_ms:>14.1f}  "
+                f"{legacy_ms / vector_ms:>7.1f}x  {'yes' if match else 'NO'}"
+            )
+
+    @staticmethod
+    def _time(fn, export, repeat):
+        """Return (best wall time in ms, last result) over `repeat` runs on fresh copies."""
+        best, result = float("inf"), None
+        for _ in range(repeat):
+            df = export.copy()
+            start = time.perf_counter()
+            result = fn(df)
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return best, result
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0005_remove_bookgenres"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cachedbook",
+            name="found_by_subjects",
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name="cachedbook",
+            name="found_by_award_slugs",
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0006_cachedbook_found_by"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cachedbook",
+            name="description_fetched",
+            field=models.BooleanField(default=False),
+        ),
+    ]
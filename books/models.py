@@ -35,6 +35,10 @@ class CachedBook(models.Model):
     ol_ratings_count = models.IntegerField(null=True, blank=True)
     want_to_read_count = models.IntegerField(null=True, blank=True)
 
+    # --- Searches that returned this book (local recommendation corpus) ---
+    found_by_subjects = models.JSONField(default=list)      # OL subject searches, e.g. ["Fantasy"]
+    found_by_award_slugs = models.JSONField(default=list)   # OL award searches, e.g. ["hugo_award"]
+
     # --- Google Books genres (permanent, keyed by title+author) ---
     google_books_genres = models.JSONField(default=list)   # e.g. ["Fantasy", "Science Fiction"]
     google_books_fetched = models.BooleanField(default=False)
@@ -45,6 +49,7 @@ class CachedBook(models.Model):
     # --- Fetch tracking ---
     openlibrary_fetched = models.BooleanField(default=False)
     inventaire_fetched = models.BooleanField(default=False)
+    description_fetched = models.BooleanField(default=False)  # True once OL was asked, even if it had none
 
     class Meta:
         unique_together = [("title", "author")]
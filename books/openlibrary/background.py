@@ -1,89 +1,281 @@
-from books.openlibrary.client import fetch_cover_for_read_book, fetch_work_data
-from books.inventaire.client import fetch_cover as inventaire_fetch_cover
+import logging
+import pickle
+import threading
+
+from networkx import NetworkXError
+
+from books import book_cache, snapshots
+from books.enrichment import enrich_by_isbn, enrich_concurrently
 from books.graph_engine import state
-from books.graph_engine.extract import _apply_ol_data, _apply_gb_genres
+from books.graph_engine.extract import enrich_books
+from books.graph_engine.library_index import LibraryIndex
+from books.jobs import is_current, superseded
+from books.precompute import start_precompute
+
+logger = logging.getLogger(__name__)
+
+
+def run_upload_job(job: dict, read_books: list, snapshot_key: str = None, stats: dict = None) -> None:
+    """Upload job body: enrich the first books, build the graphs, then enrich the rest.
+
+    Started via books.jobs.start_job from upload_goodreads, which has already
+    parsed the CSV and returned the statistics. Phases (job["phase"]):
+      fetching  — ISBN bulk lookup for every read book, then the remaining
+                  metadata for the first MAX_COVER_LOOKUPS books
+      building  — author graph, genre graph and community detection
+      enriching — load_remaining_covers for the whole library
+    job["result"] is set as soon as the graph is available, so the frontend
+    can show the universe while background enrichment continues.
+
+    CachedBook rows for the whole library (read and want-to-read) are loaded
+    up front in a few batched queries, so the provider clients answer cached
+    books from memory instead of one query per client per book.
+
+    Once everything is enriched, the library, graph, communities and the
+    upload's statistics are saved as a snapshot under snapshot_key (the CSV's
+    content hash), so uploading the same export again skips all of this.
+    """
+    job["phase"] = "fetching"
+    book_cache.prefetch(
+        (book.title, book.author) for book in [*read_books, *state.WANT_TO_READ_NODES]
+    )
+    enrich_by_isbn(read_books, is_read=True, should_stop=superseded(job))
+    enrich_books(read_books, should_stop=superseded(job))
+    book_cache.flush()
+    if not is_current(job):
+        return
+
+    job["phase"] = "building"
+    state.UPLOAD_PROGRESS["phase"] = "building"
+    from books.graph_engine.builder import IncrementalGraphBuilder
+    from books.graph_engine.universe import detect_communities
+    builder = IncrementalGraphBuilder.from_books(read_books, lock=state.GRAPH_LOCK)
+    communities = detect_communities(builder.genre_graph)
+    if not _publish(job, read_books, builder, communities):
+        return
+
+    job["phase"] = "enriching"
+    load_remaining_covers(job)
+    _save_snapshot(job, snapshot_key, stats)
+    job["phase"] = "done"
+
+
+def run_incremental_upload_job(job: dict, diff, wtr_books: list, snapshot_key: str = None, stats: dict = None) -> None:
+    """Upload job body for a re-upload that was diffed against the loaded library.
+
+    diff is a books.graph_engine.diff.LibraryDiff. Only added and changed
+    books — plus books an earlier, interrupted run never finished enriching —
+    go through enrichment. They are streamed into the live
+    IncrementalGraphBuilder (state.GRAPH_BUILDER) as each one finishes, and
+    removed books are dropped from it up front, so the cost follows the size
+    of the change. Communities are updated once at the end, starting from
+    the current clusters and revisiting only the books that changed.
+    """
+    from books.graph_engine.diff import is_enriched
+    from books.graph_engine.universe import update_communities
+
+    builder = state.GRAPH_BUILDER
+    read_books = diff.books
+    changed = [new for _, new in diff.changed]
+    pending = [*diff.added, *changed]
+    pending_ids = {id(book) for book in pending}
+    pending += [book for book in read_books if id(book) not in pending_ids and not is_enriched(book)]
+    wtr_pending = [book for book in wtr_books if not is_enriched(book)]
+
+    job["phase"] = "fetching"
+    state.UPLOAD_PROGRESS = {"phase": "fetching", "current": 0, "total": len(pending)}
+    progress_lock = threading.Lock()
+
+    touched = set()
+    for book in diff.removed:
+        builder.remove_book(book.id)
+        touched.add(f"book::{book.id}")
+    for old, new in diff.changed:
+        if old.id != new.id:
+            builder.remove_book(old.id)
+            touched.add(f"book::{old.id}")
+
+    def book_done(book):
+        if not is_current(job):
+            return
+        before = builder.subject_version
+        builder.add_book(book)
+        _reindex_read(book)
+        with progress_lock:
+            state.UPLOAD_PROGRESS["current"] += 1
+            if builder.subject_version != before:
+                touched.add(f"book::{book.id}")
 
+    book_cache.prefetch((book.title, book.author) for book in [*pending, *wtr_pending])
+    enrich_by_isbn(pending, is_read=True, should_stop=superseded(job))
+    enrich_concurrently(pending, is_read=True, on_book_done=book_done, should_stop=superseded(job))
+    book_cache.flush()
+    if not is_current(job):
+        return
 
-def load_remaining_covers():
+    job["phase"] = "building"
+    state.UPLOAD_PROGRESS["phase"] = "building"
+    with builder.lock:
+        communities = update_communities(builder.genre_graph, state.COMMUNITIES, touched)
+    if not _publish(job, read_books, builder, communities):
+        return
+    state.BACKGROUND_PROGRESS = {"current": len(read_books), "total": len(read_books), "done": True}
+
+    job["phase"] = "enriching"
+    enrich_by_isbn(wtr_pending, is_read=False, should_stop=superseded(job))
+    enrich_concurrently(wtr_pending, is_read=False, on_book_done=_reindex_want_to_read,
+                        should_stop=superseded(job))
+    book_cache.flush()
+    if is_current(job):
+        start_precompute(job)
+    _save_snapshot(job, snapshot_key, stats)
+    job["phase"] = "done"
+
+
+def _reindex_read(book) -> None:
+    """Refresh an enriched read book in state.LIBRARY_INDEX (ignored if it is no longer loaded)."""
+    if state.LIBRARY_INDEX is not None:
+        state.LIBRARY_INDEX.read.update(book)
+
+
+def _reindex_want_to_read(book) -> None:
+    if state.LIBRARY_INDEX is not None:
+        state.LIBRARY_INDEX.want_to_read.update(book)
+
+
+def _publish(job: dict, read_books: list, builder, communities) -> bool:
+    """Make a library's graphs live and set the job's result.
+
+    Returns False (publishing nothing) if a newer upload has replaced the job.
+    """
+    if not is_current(job):
+        return False
+
+    state.GRAPH_BUILDER = builder
+    state.GRAPH = builder.author_graph
+    state.GENRE_GRAPH = builder.genre_graph
+    # read_books were enriched in place since the index was built at upload time.
+    state.LIBRARY_INDEX = LibraryIndex(read_books, state.WANT_TO_READ_NODES)
+    state.COMMUNITIES = communities
+    state.UNIVERSE_VERSION += 1
+    state.UPLOAD_PROGRESS["phase"] = "done"
+    job["result"] = {
+        "books": [
+            {"id": book.id, "title": book.title, "author": book.author, "cover_url": book.cover_url}
+            for book in read_books
+        ],
+        "cluster_count": len(communities),
+        "universe_version": state.UNIVERSE_VERSION,
+    }
+    return True
+
+
+def _save_snapshot(job: dict, snapshot_key: str, stats: dict) -> None:
+    """Store the finished library under the upload's content hash (see books/snapshots.py)."""
+    if not snapshot_key or not is_current(job):
+        return
+    try:
+        snapshots.save(
+            snapshot_key,
+            stats=stats,
+            book_nodes=state.BOOK_NODES,
+            want_to_read_nodes=state.WANT_TO_READ_NODES,
+            graph_builder=state.GRAPH_BUILDER,
+            communities=state.COMMUNITIES,
+        )
+    except (OSError, pickle.PicklingError):
+        # The upload itself succeeded; only the next identical upload loses its shortcut.
+        logger.exception("Could not save upload snapshot %s", snapshot_key)
+
+
+def load_remaining_covers(job: dict = None):
     """
     Background task: fetch covers, metadata, and genres for every book in the library.
-    Started as a daemon thread from upload_goodreads so the initial response isn't blocked.
+    Runs at the end of the upload job so the initial response isn't blocked.
 
     Runs for ALL books — not just the first MAX_COVER_LOOKUPS fetched synchronously.
     DB lookups are instant for books already stored; only missing data triggers network calls.
 
-    Per-book strategy:
+    Books flow through books.enrichment's staged pipeline, one bounded worker
+    pool per provider:
       1. OpenLibrary work data  — subjects, awards, cover, description, metadata (DB-first)
       2. OpenLibrary cover search — cover only, if still missing
       3. Inventaire             — cover only, last resort
       4. Google Books genres    — stored permanently in CachedBook.google_books_genres
 
-    After all books are processed the genre graph and community clusters are rebuilt
-    so the Reading Universe reflects the full subject data rather than just the first
-    10 books that were processed synchronously during upload.
-    """
-    total = len(state.BOOK_NODES)
-    state.BACKGROUND_PROGRESS = {"current": 0, "total": total, "done": False}
-
-    for i, book in enumerate(state.BOOK_NODES, 1):
-        try:
-            needs_cover = not book.cover_url
-            needs_subjects = not book.subjects
+    Each book's new subjects are streamed into the live IncrementalGraphBuilder
+    (state.GRAPH_BUILDER) as it leaves the pipeline, so the graphs fill in as
+    enrichment progresses instead of being rebuilt at the end. Once all books are
+    processed the community clusters are updated, so the Reading Universe
+    reflects the full subject data. The update is warm-started from the
+    published clusters and only revisits books whose subjects changed (see
+    universe.update_communities).
 
-            # Steps 1–3: only hit the network if cover or subjects are missing.
-            # fetch_work_data returns instantly from DB if already stored.
-            if needs_cover or needs_subjects:
-                ol_data = fetch_work_data(book.title, book.author, is_read=True)
-                _apply_ol_data(book, ol_data)
+    When run as part of an upload job, enrichment stops and nothing more is
+    published (graphs, library index or progress) once a newer upload has
+    replaced that job.
+    Finally the precompute phase (books.precompute) is started in the
+    background.
+    """
+    from books.graph_engine.builder import IncrementalGraphBuilder
 
-                needs_cover = not book.cover_url
+    if job is not None and not is_current(job):
+        return
+    stale = superseded(job) if job is not None else None
+    books = list(state.BOOK_NODES)
+    wtr_books = list(state.WANT_TO_READ_NODES)
+    builder = state.GRAPH_BUILDER
+    if builder is None:
+        builder = IncrementalGraphBuilder.from_books(books, lock=state.GRAPH_LOCK)
+    progress = {"current": 0, "total": len(books), "done": False}
+    state.BACKGROUND_PROGRESS = progress
+    progress_lock = threading.Lock()
 
-                # 2. OL cover search fallback
-                if needs_cover:
-                    cover = fetch_cover_for_read_book(book.title, book.author, is_read=True)
-                    if cover:
-                        book.cover_url = cover
-                        needs_cover = False
+    changed = set()
 
-                # 3. Inventaire cover fallback
-                if needs_cover:
-                    cover = inventaire_fetch_cover(book.title, book.author)
-                    if cover:
-                        book.cover_url = cover
+    def book_done(book):
+        if job is not None and not is_current(job):
+            return
+        relinked = builder.update_book_subjects(book)
+        _reindex_read(book)
+        with progress_lock:
+            progress["current"] += 1
+            if relinked:
+                changed.add(f"book::{book.id}")
 
-            # Step 4: Google Books genres — always runs; DB-cached so instant on repeat uploads.
-            _apply_gb_genres(book)
+    enrich_concurrently(books, is_read=True, on_book_done=book_done, should_stop=stale)
 
-        except Exception:
-            pass  # Never let a single book stall the whole background thread
+    # Write buffered CachedBook updates before the (slow) clustering below.
+    book_cache.flush()
 
-        state.BACKGROUND_PROGRESS["current"] = i
+    # Update communities now that all subjects are populated, starting from the
+    # clusters published at upload time and revisiting only re-linked books.
+    if job is not None and not is_current(job):
+        return
 
-    # Rebuild graph and communities now that all subjects are populated.
-    # This replaces the initial clusters that were built with only the first 10 books.
+    from books.graph_engine.universe import update_communities
     try:
-        from books.graph_engine.builder import build_author_graph, build_genre_graph
-        from books.graph_engine.universe import detect_communities
-        state.GRAPH = build_author_graph(state.BOOK_NODES)
-        genre_graph = build_genre_graph(state.BOOK_NODES)
-        state.COMMUNITIES = detect_communities(genre_graph)
-        state.UNIVERSE_VERSION += 1
-    except Exception:
-        pass
+        with builder.lock:
+            communities = update_communities(builder.genre_graph, state.COMMUNITIES, changed)
+    except (NetworkXError, KeyError, ValueError):
+        # Publish the enriched graphs anyway, with the clusters from upload time.
+        logger.exception("Could not update communities after enrichment; keeping the previous clusters")
+        communities = state.COMMUNITIES
+    state.GRAPH_BUILDER = builder
+    state.GRAPH = builder.author_graph
+    state.GENRE_GRAPH = builder.genre_graph
+    state.COMMUNITIES = communities
+    state.UNIVERSE_VERSION += 1
 
     # Mark done so the frontend banner clears before WTR enrichment begins.
-    state.BACKGROUND_PROGRESS["done"] = True
+    progress["done"] = True
 
     # Enrich want-to-read books (subjects + covers) so genre matching works.
     # Runs silently after the banner clears; DB-cached so instant on repeat uploads.
-    for book in state.WANT_TO_READ_NODES:
-        try:
-            if not book.subjects or not book.cover_url:
-                ol_data = fetch_work_data(book.title, book.author, is_read=False)
-                _apply_ol_data(book, ol_data)
-                if not book.cover_url:
-                    cover = fetch_cover_for_read_book(book.title, book.author, is_read=False)
-                    if cover:
-                        book.cover_url = cover
-        except Exception:
-            pass
+    enrich_by_isbn(wtr_books, is_read=False, should_stop=stale)
+    enrich_concurrently(wtr_books, is_read=False, on_book_done=_reindex_want_to_read, should_stop=stale)
+    book_cache.flush()
+
+    # The library is fully enriched: render first clicks ahead of time.
+    if job is None or is_current(job):
+        start_precompute(job)
@@ -4,6 +4,10 @@ import re
 import requests
 from django.core.cache import cache  # used for search/award/era results only
 
+from books import corpus, transport
+from books.book_cache import get_cached_book, update_book
+from books.singleflight import single_flight
+
 BASE_URL = "https://openlibrary.org"
 
 # Fields to request from OL search in a single call
@@ -12,6 +16,9 @@ _SEARCH_FIELDS = (
     "want_to_read_count,first_publish_year,number_of_pages_median"
 )
 
+# Bibkeys per request to the multi-key /api/books endpoint
+ISBN_BATCH_SIZE = 50
+
 # Subject prefixes that are internal OL metadata, not human-readable genres
 _NOISE_PREFIXES = ("nyt:", "new york times", "in library", "overdrive", "accessible book")
 
@@ -52,38 +59,36 @@ def _clean_subjects(raw_subjects):
     return clean[:12], list(awards.keys())
 
 
-def _store_book(title: str, author: str, cover_url: str = "", openlibrary_id: str = "", is_read: bool = False) -> None:
+def _store_book(title: str, author: str, cover_url: str = "", openlibrary_id: str = "", is_read: bool = False,
+                subject: str = None, award_slug: str = None, **metadata) -> None:
     """Persist a minimal book record to CachedBook without overwriting richer data.
 
     Used by recommendation fetch functions to ensure every book returned by OL
     ends up in the DB (is_read=False), so the user can inspect and clean up.
-    Never downgrades is_read from True to False.
+    Never downgrades is_read from True to False. Written via the
+    book_cache write-behind buffer.
+
+    `subject` / `award_slug` name the search that found the book; they are
+    recorded in found_by_subjects / found_by_award_slugs (never in the work
+    data's subjects / award_slugs) so the local corpus can answer that search
+    next time. `metadata` fills want_to_read_count and first_publish_year.
     """
-    from books.models import CachedBook
+    if subject:
+        metadata["found_by_subjects"] = [subject]
+    if award_slug:
+        metadata["found_by_award_slugs"] = [award_slug]
     try:
-        obj, created = CachedBook.objects.get_or_create(
-            title=title,
-            author=author,
-            defaults={
-                "cover_url": cover_url,
-                "openlibrary_id": openlibrary_id,
-                "is_read": is_read,
-            },
-        )
-        if not created:
-            changed = False
-            if is_read and not obj.is_read:
-                obj.is_read = True
-                changed = True
-            if not obj.cover_url and cover_url:
-                obj.cover_url = cover_url
-                changed = True
-            if changed:
-                obj.save(update_fields=[f for f in ["is_read", "cover_url"] if changed])
+        update_book(title, author, cover_url=cover_url, openlibrary_id=openlibrary_id, is_read=is_read, **metadata)
     except Exception:
         pass
 
 
+def _mark_read(title: str, author: str) -> None:
+    """Flag an existing CachedBook row as read; never creates a row on its own."""
+    if get_cached_book(title, author) is not None:
+        update_book(title, author, is_read=True)
+
+
 def fetch_cover_for_read_book(title, author, is_read: bool = False):
     """
     Fetches a cover URL via the OL search API (title + author query, limit 5).
@@ -91,30 +96,34 @@ def fetch_cover_for_read_book(title, author, is_read: bool = False):
 
     DB-cached: if a cover is already stored (from any source) it is returned
     immediately. If OL was already tried and found nothing, returns None.
+    Concurrent lookups of the same book share one request.
     """
-    from books.models import CachedBook
+    cover_url = _fetch_cover(title, author)
+    if is_read:
+        _mark_read(title, author)
+    return cover_url
 
-    try:
-        cached = CachedBook.objects.get(title=title, author=author)
+
+@single_flight("openlibrary.cover")
+def _fetch_cover(title, author):
+    cached = get_cached_book(title, author)
+    if cached is not None:
         if cached.cover_url:
             return cached.cover_url
         if cached.openlibrary_fetched:
             return None  # already tried OL, nothing found — permanent
-    except CachedBook.DoesNotExist:
-        pass
 
     clean_title = normalize_title(title)
     try:
-        response = requests.get(
+        response = transport.get(
             f"{BASE_URL}/search.json",
             params={"title": clean_title, "author": author, "limit": 5},
-            timeout=10,
         )
         response.raise_for_status()
+    except transport.UpstreamUnavailable:
+        return None  # breaker open / rate limited — leave it for Inventaire and a later pass
     except Exception:
-        obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-        obj.openlibrary_fetched = True
-        obj.save(update_fields=["openlibrary_fetched"])
+        update_book(title, author, openlibrary_fetched=True)
         return None
 
     docs = response.json().get("docs", [])
@@ -132,7 +141,7 @@ def fetch_cover_for_read_book(title, author, is_read: bool = False):
 
         edition_id = edition_keys[0]
         try:
-            edition_resp = requests.get(f"{BASE_URL}/books/{edition_id}.json", timeout=5)
+            edition_resp = transport.get(f"{BASE_URL}/books/{edition_id}.json")
             if edition_resp.status_code != 200:
                 continue
             covers = edition_resp.json().get("covers")
@@ -142,13 +151,7 @@ def fetch_cover_for_read_book(title, author, is_read: bool = False):
         except Exception:
             continue
 
-    obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-    if not obj.cover_url and cover_url:
-        obj.cover_url = cover_url
-    obj.openlibrary_fetched = True
-    if is_read and not obj.is_read:
-        obj.is_read = True
-    obj.save()
+    update_book(title, author, cover_url=cover_url, openlibrary_fetched=True)
     return cover_url
 
 
@@ -156,6 +159,20 @@ def fetch_work_data(title, author, is_read: bool = False):
     """
     Fetch enriched OpenLibrary data for a single book.
 
+    Concurrent calls for the same book (e.g. the background enrichment and a
+    graph view) share one in-flight lookup; see _fetch_work_data.
+    """
+    data = _fetch_work_data(title, author)
+    if is_read:
+        _mark_read(title, author)
+    return data
+
+
+@single_flight("openlibrary.work_data")
+def _fetch_work_data(title, author):
+    """
+    Look up a single book on OpenLibrary, persisting the result.
+
     Single search call (using the `fields` param) returns:
       subjects, award_slugs, cover_url, ratings, want_to_read_count,
       first_publish_year, page_count.
@@ -167,33 +184,29 @@ def fetch_work_data(title, author, is_read: bool = False):
 
     Returns a dict with all fetched fields, or None on failure/miss.
     """
-    from books.models import CachedBook
-
     # Permanent DB lookup — fetched once, kept forever
-    try:
-        cached = CachedBook.objects.get(title=title, author=author)
-        if cached.openlibrary_fetched:
-            if not cached.openlibrary_id:
-                return None
-            return {
-                "openlibrary_id": cached.openlibrary_id,
-                "subjects": cached.subjects,
-                "award_slugs": cached.award_slugs,
-                "cover_url": cached.cover_url or None,
-                "description": cached.description,
-                "page_count": cached.page_count,
-                "first_publish_year": cached.first_publish_year,
-                "ol_ratings_average": cached.ol_ratings_average,
-                "ol_ratings_count": cached.ol_ratings_count,
-                "want_to_read_count": cached.want_to_read_count,
-            }
-    except CachedBook.DoesNotExist:
-        pass
+    cached = get_cached_book(title, author)
+    if cached is not None and cached.openlibrary_fetched:
+        if not cached.openlibrary_id:
+            return None
+        return {
+            "openlibrary_id": cached.openlibrary_id,
+            "subjects": cached.subjects,
+            "award_slugs": cached.award_slugs,
+            "cover_url": cached.cover_url or None,
+            # None until OL has been asked; "" when it has no description.
+            "description": cached.description if cached.description or cached.description_fetched else None,
+            "page_count": cached.page_count,
+            "first_publish_year": cached.first_publish_year,
+            "ol_ratings_average": cached.ol_ratings_average,
+            "ol_ratings_count": cached.ol_ratings_count,
+            "want_to_read_count": cached.want_to_read_count,
+        }
 
     clean_title = normalize_title(title)
 
     try:
-        response = requests.get(
+        response = transport.get(
             f"{BASE_URL}/search.json",
             params={
                 "title": clean_title,
@@ -201,7 +214,6 @@ def fetch_work_data(title, author, is_read: bool = False):
                 "limit": 1,
                 "fields": _SEARCH_FIELDS,
             },
-            timeout=5,
         )
         response.raise_for_status()
     except requests.RequestException:
@@ -209,9 +221,7 @@ def fetch_work_data(title, author, is_read: bool = False):
 
     docs = response.json().get("docs", [])
     if not docs:
-        obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-        obj.openlibrary_fetched = True
-        obj.save(update_fields=["openlibrary_fetched"])
+        update_book(title, author, openlibrary_fetched=True)
         return None
 
     doc = docs[0]
@@ -221,11 +231,11 @@ def fetch_work_data(title, author, is_read: bool = False):
 
     clean_subjects, award_slugs = _clean_subjects(doc.get("subject", []))
 
-    # Fetch description from the Works endpoint (one extra call)
-    description = ""
+    # Fetch description from the Works endpoint (one extra call); None if it failed
+    description = None
     if work_id:
         try:
-            work_resp = requests.get(f"{BASE_URL}{work_id}.json", timeout=5)
+            work_resp = transport.get(f"{BASE_URL}{work_id}.json")
             if work_resp.status_code == 200:
                 raw_desc = work_resp.json().get("description", "")
                 description = raw_desc.get("value", "") if isinstance(raw_desc, dict) else raw_desc
@@ -245,45 +255,177 @@ def fetch_work_data(title, author, is_read: bool = False):
         "want_to_read_count": doc.get("want_to_read_count"),
     }
 
-    # Persist to DB permanently — never overwrite a cover or is_read=True
-    obj, _ = CachedBook.objects.get_or_create(title=title, author=author)
-    obj.openlibrary_id = work_id
-    obj.subjects = clean_subjects
-    obj.award_slugs = award_slugs
-    obj.openlibrary_fetched = True
-    if is_read and not obj.is_read:
-        obj.is_read = True
-    if not obj.cover_url and cover_url:
-        obj.cover_url = cover_url
-    if not obj.description and description:
-        obj.description = description
-    if obj.page_count is None and data["page_count"]:
-        obj.page_count = data["page_count"]
-    if obj.first_publish_year is None and data["first_publish_year"]:
-        obj.first_publish_year = data["first_publish_year"]
-    if obj.ol_ratings_average is None and data["ol_ratings_average"]:
-        obj.ol_ratings_average = data["ol_ratings_average"]
-    if obj.ol_ratings_count is None and data["ol_ratings_count"]:
-        obj.ol_ratings_count = data["ol_ratings_count"]
-    if obj.want_to_read_count is None and data["want_to_read_count"]:
-        obj.want_to_read_count = data["want_to_read_count"]
-    obj.save()
+    # Persist to DB permanently — never overwrite a cover
+    update_book(
+        title,
+        author,
+        openlibrary_id=work_id,
+        subjects=clean_subjects,
+        award_slugs=award_slugs,
+        openlibrary_fetched=True,
+        cover_url=cover_url,
+        description=description or "",
+        description_fetched=description is not None,
+        page_count=data["page_count"],
+        first_publish_year=data["first_publish_year"],
+        ol_ratings_average=data["ol_ratings_average"],
+        ol_ratings_count=data["ol_ratings_count"],
+        want_to_read_count=data["want_to_read_count"],
+    )
 
     return data
 
 
+def _first(values):
+    return values[0] if values else ""
+
+
+def _isbn_record_data(record: dict) -> dict:
+    """Map an /api/books jscmd=data record onto the fetch_work_data result shape.
+
+    Edition records carry no ratings or description (None: not looked up
+    yet), and their publish date is the edition's, so first_publish_year is
+    a best-effort fallback.
+    """
+    clean_subjects, award_slugs = _clean_subjects(
+        [s.get("name", "") for s in record.get("subjects", []) if s.get("name")]
+    )
+    year = re.search(r"\d{4}", record.get("publish_date", ""))
+    return {
+        "openlibrary_id": record.get("key", ""),
+        "subjects": clean_subjects,
+        "award_slugs": award_slugs,
+        "cover_url": record.get("cover", {}).get("medium"),
+        "description": None,
+        "page_count": record.get("number_of_pages"),
+        "first_publish_year": int(year.group()) if year else None,
+        "ol_ratings_average": None,
+        "ol_ratings_count": None,
+        "want_to_read_count": None,
+    }
+
+
+def fetch_work_data_by_isbn(items, is_read: bool = False) -> dict:
+    """
+    Look up up to ISBN_BATCH_SIZE books in one request to OL's multi-key
+    books API (/api/books?bibkeys=ISBN:…,ISBN:…).
+
+    items: (title, author, isbn_13, isbn_10) tuples; ISBN-13 is preferred.
+    Books already looked up on OL are skipped — fetch_work_data answers those
+    from CachedBook. Hits are persisted like fetch_work_data results (plus
+    isbn_13/isbn_10, publisher, published_date) and marked openlibrary_fetched;
+    misses are left for the title search.
+
+    Returns {(title, author): data} for the hits, data shaped like
+    fetch_work_data's return value.
+    """
+    by_bibkey = {}
+    for title, author, isbn_13, isbn_10 in items:
+        if isbn_13 or isbn_10:
+            update_book(title, author, isbn_13=isbn_13 or "", isbn_10=isbn_10 or "")
+        cached = get_cached_book(title, author)
+        if cached is not None and cached.openlibrary_fetched:
+            continue
+        isbn = isbn_13 or isbn_10
+        if isbn:
+            by_bibkey[f"ISBN:{isbn}"] = (title, author)
+    if not by_bibkey:
+        return {}
+
+    try:
+        response = transport.get(
+            f"{BASE_URL}/api/books",
+            params={"bibkeys": ",".join(by_bibkey), "jscmd": "data", "format": "json"},
+        )
+        response.raise_for_status()
+        records = response.json()
+    except (requests.RequestException, ValueError):
+        return {}
+
+    results = {}
+    for bibkey, record in records.items():
+        if bibkey not in by_bibkey:
+            continue
+        title, author = by_bibkey[bibkey]
+        data = _isbn_record_data(record)
+        identifiers = record.get("identifiers", {})
+        update_book(
+            title,
+            author,
+            openlibrary_id=data["openlibrary_id"],
+            subjects=data["subjects"],
+            award_slugs=data["award_slugs"],
+            openlibrary_fetched=True,
+            is_read=is_read,
+            cover_url=data["cover_url"],
+            page_count=data["page_count"],
+            first_publish_year=data["first_publish_year"],
+            publisher=_first([p.get("name", "") for p in record.get("publishers", [])])[:300],
+            published_date=record.get("publish_date", "")[:20],
+            isbn_13=_first(identifiers.get("isbn_13", [])),
+            isbn_10=_first(identifiers.get("isbn_10", [])),
+        )
+        results[(title, author)] = data
+    return results
+
+
+@single_flight("openlibrary.description")
+def fetch_description(title, author, openlibrary_id):
+    """
+    Fetch a book's description from its OL work or edition record.
+
+    Books enriched through the ISBN path only know their edition key
+    ("/books/OL…M"); the description usually lives on the work, so the
+    edition's first work is followed. Persisted to CachedBook.description
+    together with description_fetched, and answered from there once stored,
+    so a book OL has no description for is only asked about once. Returns
+    "" if there is none.
+    """
+    if not openlibrary_id:
+        return ""
+    cached = get_cached_book(title, author)
+    if cached is not None and (cached.description or cached.description_fetched):
+        return cached.description
+    try:
+        resp = transport.get(f"{BASE_URL}{openlibrary_id}.json")
+        resp.raise_for_status()
+        record = resp.json()
+        raw_desc = record.get("description", "")
+        works = record.get("works") or []
+        if not raw_desc and works:
+            work_resp = transport.get(f"{BASE_URL}{works[0]['key']}.json")
+            work_resp.raise_for_status()
+            raw_desc = work_resp.json().get("description", "")
+    except (requests.RequestException, ValueError, KeyError):
+        return ""
+
+    description = raw_desc.get("value", "") if isinstance(raw_desc, dict) else raw_desc
+    update_book(title, author, description=description, description_fetched=True)
+    return description
+
+
+@single_flight("openlibrary.subject")
 def fetch_books_by_subject(subject, limit=8):
     """
     Fetch popular books for a subject from the OL search API.
     Sorted by want_to_read_count descending. Cached for 24 hours.
+
+    Answered from the local corpus instead when it holds at least `limit`
+    unread books with the subject, and falls back to the local books when
+    OL fails or finds nothing.
     """
     cache_key = safe_cache_key(f"subject_books::{subject}::{limit}")
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
 
+    local = corpus.books_by_subject(subject, limit)
+    corpus.record(len(local) >= limit)
+    if len(local) >= limit:
+        return local
+
     try:
-        response = requests.get(
+        response = transport.get(
             f"{BASE_URL}/search.json",
             params={
                 "subject": subject,
@@ -291,11 +433,10 @@ def fetch_books_by_subject(subject, limit=8):
                 "sort": "want_to_read_count desc",
                 "limit": limit,
             },
-            timeout=5,
         )
         response.raise_for_status()
     except Exception:
-        return []
+        return local
 
     books = []
     for doc in response.json().get("docs", []):
@@ -315,23 +456,34 @@ def fetch_books_by_subject(subject, limit=8):
     if books:
         cache.set(cache_key, books, 86400)
         for b in books:
-            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "")
-    return books
+            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "",
+                        subject=subject, want_to_read_count=b["want_to_read_count"])
+    return books or local
 
 
+@single_flight("openlibrary.award")
 def fetch_books_by_award(award_slug, limit=6):
     """
     Fetch popular award-winning books from OL by award slug.
     Uses OL's subject search with the "award:{slug}" convention.
     Results sorted by want_to_read_count. Cached for 24 hours.
+
+    Answered from the local corpus instead when it holds at least `limit`
+    unread winners, and falls back to the local books when OL fails or
+    finds nothing.
     """
     cache_key = safe_cache_key(f"ol_award::{award_slug}::{limit}")
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
 
+    local = corpus.books_by_award(award_slug, limit)
+    corpus.record(len(local) >= limit)
+    if len(local) >= limit:
+        return local
+
     try:
-        resp = requests.get(
+        resp = transport.get(
             f"{BASE_URL}/search.json",
             params={
                 "subject": f"award:{award_slug}",
@@ -339,11 +491,10 @@ def fetch_books_by_award(award_slug, limit=6):
                 "sort": "want_to_read_count desc",
                 "limit": limit + 5,
             },
-            timeout=8,
         )
         resp.raise_for_status()
     except Exception:
-        return []
+        return local
 
     books = []
     for doc in resp.json().get("docs", []):
@@ -365,10 +516,12 @@ def fetch_books_by_award(award_slug, limit=6):
     if books:
         cache.set(cache_key, books, 86400)
         for b in books:
-            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "")
-    return books
+            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "",
+                        award_slug=award_slug, want_to_read_count=b["want_to_read_count"])
+    return books or local
 
 
+@single_flight("openlibrary.era")
 def fetch_books_by_era(decade_start, primary_subject, limit=6):
     """
     Fetch popular books published in a given decade, optionally filtered by subject.
@@ -377,7 +530,10 @@ def fetch_books_by_era(decade_start, primary_subject, limit=6):
     ensure the decade bounds are respected. Falls back to a broader search
     (no subject filter) if the subject-filtered result has fewer than 3 books.
 
-    Cached for 24 hours.
+    Cached for 24 hours. Answered from the local corpus instead when it holds
+    at least `limit` unread books from the decade (with the subject, if
+    given); when OL fails or finds nothing, the local books are returned,
+    broadened the same way.
     """
     decade_end = decade_start + 9
     cache_key = safe_cache_key(f"ol_era::{decade_start}::{primary_subject}::{limit}")
@@ -385,6 +541,11 @@ def fetch_books_by_era(decade_start, primary_subject, limit=6):
     if cached is not None:
         return cached
 
+    local = corpus.books_by_era(decade_start, primary_subject, limit)
+    corpus.record(len(local) >= limit)
+    if len(local) >= limit:
+        return local
+
     def _search(subject):
         params = {
             "fields": "key,title,author_name,cover_i,want_to_read_count,first_publish_year",
@@ -395,7 +556,7 @@ def fetch_books_by_era(decade_start, primary_subject, limit=6):
         if subject:
             params["subject"] = subject
         try:
-            resp = requests.get(f"{BASE_URL}/search.json", params=params, timeout=8)
+            resp = transport.get(f"{BASE_URL}/search.json", params=params)
             resp.raise_for_status()
         except Exception:
             return []
@@ -423,14 +584,20 @@ def fetch_books_by_era(decade_start, primary_subject, limit=6):
         return results
 
     books = _search(primary_subject) if primary_subject else []
+    found_for = primary_subject
     if len(books) < 3:
-        books = _search(None)
+        books, found_for = _search(None), None
 
     if books:
         cache.set(cache_key, books, 86400)
         for b in books:
-            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "")
-    return books
+            _store_book(b["title"], b["author"], b.get("cover_url") or "", b.get("openlibrary_id") or "",
+                        subject=found_for, want_to_read_count=b["want_to_read_count"],
+                        first_publish_year=b["first_publish_year"])
+        return books
+    if len(local) < 3 and primary_subject:
+        local = corpus.books_by_era(decade_start, None, limit)
+    return local
 
 
 def fetch_unread_books_by_author(author, read_titles, limit=10):
@@ -446,10 +613,9 @@ def fetch_unread_books_by_author(author, read_titles, limit=10):
         return [b for b in cached if normalize_title(b["title"]).lower() not in read_titles]
 
     try:
-        response = requests.get(
+        response = transport.get(
             f"{BASE_URL}/search.json",
             params={"author": author, "limit": limit},
-            timeout=10,
         )
         response.raise_for_status()
     except Exception:
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from books import graph_cache
+from books.graph_engine import state
+from books.jobs import is_current
+from books.recommendations import MAX_RECOMMENDATION_BUDGET
+
+# Books rendered at a time, and upstream lookups in flight at a time, by the
+# precompute phase. Its lookups run on their own pool, so they never queue
+# ahead of a live request's.
+PRECOMPUTE_WORKERS = 2
+PRECOMPUTE_LOOKUP_WORKERS = 4
+
+# Default for the PRECOMPUTE_TOP_N setting. Every precomputed book costs
+# upstream lookups from the same per-host rate limits as live clicks, so a
+# large library is not precomputed in full unless asked to.
+_DEFAULT_TOP_N = 50
+
+_LOOKUPS = ThreadPoolExecutor(max_workers=PRECOMPUTE_LOOKUP_WORKERS, thread_name_prefix="precompute-lookups")
+
+_IDLE = threading.Condition()
+_LIVE_REQUESTS = 0
+
+
+@contextmanager
+def live_request():
+    """Mark a live ego-graph request as running; precomputation waits until none are."""
+    global _LIVE_REQUESTS
+    with _IDLE:
+        _LIVE_REQUESTS += 1
+    try:
+        yield
+    finally:
+        with _IDLE:
+            _LIVE_REQUESTS -= 1
+            _IDLE.notify_all()
+
+
+def _wait_until_idle() -> None:
+    with _IDLE:
+        _IDLE.wait_for(lambda: _LIVE_REQUESTS == 0)
+
+
+def start_precompute(job: dict = None) -> None:
+    """Run precompute_recommendations on a daemon thread."""
+    threading.Thread(target=precompute_recommendations, args=(job,), daemon=True).start()
+
+
+def precompute_recommendations(job: dict = None) -> None:
+    """Render and cache the default ego graph of every read book, highest rated first.
+
+    Meant to run once background enrichment has finished and the library is
+    idle, so a first click on a book is a graph_cache hit. Pages are rendered
+    with book_graph_view's defaults (min_similarity 0.5, started series
+    shown), PRECOMPUTE_WORKERS books at a time, and each book waits until no
+    live ego-graph request is running. Only the PRECOMPUTE_TOP_N (default
+    50, None for all) best-rated books are done; PRECOMPUTE_RECOMMENDATIONS =
+    False turns the phase off.
+
+    Stops early once the library changes (a new upload or enrichment), the
+    job is no longer current, or the page cache is full, since later books
+    would only evict earlier, better-rated ones. Progress is published in
+    state.PRECOMPUTE_PROGRESS.
+    """
+    if not getattr(settings, "PRECOMPUTE_RECOMMENDATIONS", True):
+        return
+    # views imports the upload jobs that start this phase.
+    from books.views import render_book_graph
+
+    version = graph_cache.library_version()
+    if version is None:
+        return
+    books = sorted(state.BOOK_NODES, key=lambda book: book.rating or 0, reverse=True)
+    top_n = getattr(settings, "PRECOMPUTE_TOP_N", _DEFAULT_TOP_N)
+    if top_n is not None:
+        books = books[:top_n]
+
+    progress = {"current": 0, "total": len(books), "rendered": 0, "done": False, "stopped": None}
+    state.PRECOMPUTE_PROGRESS = progress
+    lock = threading.Lock()
+
+    def stop_reason():
+        if progress["stopped"]:
+            return progress["stopped"]
+        if job is not None and not is_current(job):
+            return "replaced"
+        if graph_cache.library_version() != version:
+            return "library changed"
+        cached = graph_cache.stats()
+        if cached["entries"] and graph_cache.free_bytes() < cached["bytes"] / cached["entries"]:
+            return "cache full"
+        return None
+
+    def precompute(book):
+        _wait_until_idle()
+        with lock:
+            progress["stopped"] = stop_reason()
+            if progress["stopped"]:
+                return
+        book_id = f"book::{book.id}"
+        rendered = False
+        if not graph_cache.contains((book_id, 0.5, False), version):
+            rendered = render_book_graph(book_id, budget=MAX_RECOMMENDATION_BUDGET, version=version,
+                                         executor=_LOOKUPS, follow_up=False) is not None
+        with lock:
+            progress["current"] += 1
+            progress["rendered"] += rendered
+
+    with ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS, thread_name_prefix="precompute") as pool:
+        list(pool.map(precompute, books))
+    progress["done"] = True
@@ -0,0 +1,196 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from books.graph_engine import state
+from books.inventaire.client import (
+    fetch_books_by_author as inventaire_fetch_by_author,
+    fetch_books_by_subject as inventaire_fetch_by_subject,
+)
+from books.openlibrary.client import (
+    fetch_books_by_award,
+    fetch_books_by_era,
+    fetch_books_by_subject,
+    fetch_unread_books_by_author,
+    fetch_work_data,
+)
+
+# Default latency budget, in seconds, for one ego-graph request's upstream
+# lookups. Sources still running when it runs out are rendered as pending;
+# they finish in the background and are served by the follow-up endpoint.
+RECOMMENDATION_DEADLINE = 2.0
+# Upper bound for a budget requested with ?budget=.
+MAX_RECOMMENDATION_BUDGET = 10.0
+
+# Upper bound for a follow-up's ?wait=. Each long-poll holds a server worker
+# thread while it waits; the page polls with wait=5.
+MAX_PENDING_WAIT = 5.0
+
+# Lookup threads shared by all requests (one click submits at most eight).
+RECOMMENDATION_WORKERS = 16
+
+# Requests with pending sources are remembered this many seconds for their
+# follow-ups, and at most MAX_PENDING_REQUESTS of them at a time.
+PENDING_TTL = 120
+MAX_PENDING_REQUESTS = 50
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=RECOMMENDATION_WORKERS, thread_name_prefix="recommendations")
+_PENDING_LOCK = threading.Lock()
+
+
+def _author_books(author, read_titles):
+    books = fetch_unread_books_by_author(author=author, read_titles=read_titles, limit=8)
+    return books or inventaire_fetch_by_author(author=author, read_titles=read_titles, limit=8)
+
+
+def _genre_books(genre):
+    return fetch_books_by_subject(genre, limit=5) or inventaire_fetch_by_subject(genre, limit=5)
+
+
+def rank_genres(subjects, genre_scores) -> list:
+    """The (up to) three subjects the reader rates highest, best first."""
+    return sorted(subjects, key=lambda g: genre_scores.get(g, 0), reverse=True)[:3]
+
+
+class RecommendationSources:
+    """The upstream lookups behind one ego-graph request, running on a shared pool.
+
+    The author lookup (OpenLibrary, then Inventaire) starts right away,
+    alongside fetch_work_data. The genre, award and era lookups need the
+    work's subjects, awards and publish year, so they are started from
+    fetch_work_data's completion callback and then run in parallel. `kinds`
+    names the recommendation types the caller will show ("genre", "award",
+    "era"); lookups for the others are skipped. The author lookup always
+    runs, since its titles are de-duplicated against even when author
+    recommendations are hidden.
+
+    Sources are named after the node ids they feed: "author",
+    "genre::<subject>", "award::<slug>" and "era". Lookups keep running
+    after a caller stops waiting for them, so a late source can still be
+    picked up (see pending) and lands in the cache for the next click.
+    Lookups run on `executor`, by default the pool shared by live requests.
+    """
+
+    def __init__(self, book_title, author, read_titles, genre_scores, kinds, executor=None):
+        self._executor = executor or _EXECUTOR
+        self.genres, self.award_slugs, self.first_publish_year = [], [], None
+        self.ranked_genres = []
+        self._genre_scores = genre_scores
+        self._kinds = kinds
+        self._lock = threading.Lock()
+        self._planned = threading.Event()   # set once the work data is in
+        self._futures = {"author": self._executor.submit(_author_books, author, read_titles)}
+        if book_title:
+            self._executor.submit(fetch_work_data, book_title, author).add_done_callback(self._start_dependent)
+        else:
+            self._planned.set()
+
+    def _start_dependent(self, future) -> None:
+        work_data = (future.exception() is None and future.result()) or {}
+        self.genres = work_data.get("subjects", [])
+        self.award_slugs = work_data.get("award_slugs", [])
+        self.first_publish_year = work_data.get("first_publish_year")
+        self.ranked_genres = rank_genres(self.genres, self._genre_scores)
+
+        futures = {}
+        if "genre" in self._kinds:
+            for genre in self.ranked_genres:
+                futures[f"genre::{genre}"] = self._executor.submit(_genre_books, genre)
+        if "award" in self._kinds:
+            for slug in self.award_slugs[:2]:
+                futures[f"award::{slug}"] = self._executor.submit(fetch_books_by_award, slug, limit=5)
+        if "era" in self._kinds and self.first_publish_year:
+            decade_start = (self.first_publish_year // 10) * 10
+            primary_genre = self.ranked_genres[0] if self.ranked_genres else None
+            futures["era"] = self._executor.submit(fetch_books_by_era, decade_start, primary_genre, limit=5)
+        with self._lock:
+            self._futures.update(futures)
+        self._planned.set()
+
+    @property
+    def has_work_data(self) -> bool:
+        """True once fetch_work_data has returned (genres, awards and year are known)."""
+        return self._planned.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for every lookup; True if none is left pending."""
+        deadline = time.monotonic() + max(timeout, 0)
+        self._planned.wait(max(deadline - time.monotonic(), 0))
+        with self._lock:
+            futures = list(self._futures.values())
+        wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        return not self.pending
+
+    def ready(self, name) -> bool:
+        with self._lock:
+            future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def books(self, name) -> list:
+        """The source's books; empty if it failed, was not started or is still running."""
+        with self._lock:
+            future = self._futures.get(name)
+        if future is None or not future.done() or future.exception() is not None:
+            return []
+        return future.result() or []
+
+    @property
+    def pending(self) -> list:
+        """Names of the lookups still running ("work_data" until its dependents are started)."""
+        with self._lock:
+            names = [name for name, future in self._futures.items() if not future.done()]
+        return names if self.has_work_data else ["work_data"] + names
+
+
+def fetch_sources(book_title, author, read_titles, genre_scores, kinds, deadline=None,
+                  executor=None) -> RecommendationSources:
+    """Start the recommendation lookups for one book and wait up to `deadline` seconds for them.
+
+    Results are keyed by source, so callers merge them in a fixed order no
+    matter which lookup finished first; whatever is still running is listed
+    in the returned sources' `pending`.
+    """
+    sources = RecommendationSources(book_title, author, read_titles, genre_scores, kinds, executor)
+    sources.wait(RECOMMENDATION_DEADLINE if deadline is None else deadline)
+    return sources
+
+
+# ── Pending requests ──────────────────────────────────────────────────────────
+# An ego-graph response rendered with pending sources is remembered under a
+# token, so its follow-up requests can merge the late sources into the same
+# request-local graph.
+
+def _prune_pending(now: float) -> None:
+    expired = [token for token, entry in state.PENDING_RECOMMENDATIONS.items()
+               if now - entry["created_at"] > PENDING_TTL]
+    for token in expired:
+        del state.PENDING_RECOMMENDATIONS[token]
+    oldest = sorted(state.PENDING_RECOMMENDATIONS.values(), key=lambda e: e["created_at"])
+    for entry in oldest[:max(len(oldest) - MAX_PENDING_REQUESTS + 1, 0)]:
+        del state.PENDING_RECOMMENDATIONS[entry["token"]]
+
+
+def remember_pending(entry: dict) -> str:
+    """Store a request's merge state in state.PENDING_RECOMMENDATIONS and return its token."""
+    token = uuid.uuid4().hex
+    now = time.time()
+    entry.update(token=token, created_at=now, lock=threading.Lock())
+    with _PENDING_LOCK:
+        _prune_pending(now)
+        state.PENDING_RECOMMENDATIONS[token] = entry
+    return token
+
+
+def get_pending(token: str):
+    with _PENDING_LOCK:
+        entry = state.PENDING_RECOMMENDATIONS.get(token)
+        if entry is not None and time.time() - entry["created_at"] > PENDING_TTL:
+            del state.PENDING_RECOMMENDATIONS[token]
+            entry = None
+        return entry
+
+
+def forget_pending(token: str) -> None:
+    with _PENDING_LOCK:
+        state.PENDING_RECOMMENDATIONS.pop(token, None)
@@ -0,0 +1,88 @@
+import copy
+import functools
+import threading
+
+_LOCK = threading.Lock()
+_IN_FLIGHT: dict = {}   # (name, key) → _Call
+_STATS: dict = {}       # name → {"calls", "executed", "coalesced"}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _default_key(*args, **kwargs):
+    return args + tuple(sorted(kwargs.items()))
+
+
+def single_flight(name: str, key=None):
+    """Coalesce concurrent calls to the decorated function that share a key.
+
+    The first caller for a key runs the function; anyone calling with the
+    same key while it is in flight waits and receives a deep copy of the
+    same result (or the same exception). Nothing is cached once the call
+    returns — the CachedBook layer handles that.
+
+    `key` maps the call arguments to the coalescing key and defaults to all
+    arguments. Calls whose key is unhashable run without coalescing.
+    """
+    key_func = key or _default_key
+
+    def decorator(func):
+        with _LOCK:
+            _STATS.setdefault(name, {"calls": 0, "executed": 0, "coalesced": 0})
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = (name, key_func(*args, **kwargs))
+            try:
+                hash(call_key)
+            except TypeError:
+                return func(*args, **kwargs)
+
+            with _LOCK:
+                stats = _STATS[name]
+                stats["calls"] += 1
+                call = _IN_FLIGHT.get(call_key)
+                leader = call is None
+                if leader:
+                    call = _IN_FLIGHT[call_key] = _Call()
+                    stats["executed"] += 1
+                else:
+                    stats["coalesced"] += 1
+
+            if not leader:
+                call.done.wait()
+                if call.error is not None:
+                    raise call.error
+                return copy.deepcopy(call.result)
+
+            try:
+                call.result = func(*args, **kwargs)
+                return call.result
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                with _LOCK:
+                    del _IN_FLIGHT[call_key]
+                call.done.set()
+
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    """Per-fetcher call counts: total, actually executed, and coalesced onto another call."""
+    with _LOCK:
+        in_flight = {}
+        for name, _ in _IN_FLIGHT:
+            in_flight[name] = in_flight.get(name, 0) + 1
+        return {
+            name: {**counts, "in_flight": in_flight.get(name, 0)}
+            for name, counts in sorted(_STATS.items())
+        }
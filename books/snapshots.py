@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+# Bump when the snapshot contents change shape; older files are then ignored.
+SNAPSHOT_FORMAT = 5
+
+_DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+_LOCK = threading.Lock()
+
+
+def _directory() -> Path:
+    return Path(getattr(settings, "SNAPSHOT_DIR", Path(settings.BASE_DIR) / "snapshots"))
+
+
+def _path(key: str) -> Path:
+    return _directory() / f"{key}.pickle"
+
+
+def fingerprint(raw: bytes) -> str:
+    """Content hash of an uploaded CSV; identical exports map to the same snapshot."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def load(key: str):
+    """Return the snapshot stored for key, or None.
+
+    A hit refreshes the file's modification time, which is what eviction
+    orders by, so the store behaves as an LRU. Snapshots from another
+    format version or another calendar year (the "this year" statistics
+    would be stale) count as misses; unreadable files are deleted.
+    """
+    path = _path(key)
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        path.unlink(missing_ok=True)
+        return None
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("year") != datetime.date.today().year:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return snapshot
+
+
+def save(key: str, **contents) -> None:
+    """Write a snapshot for key, then evict least recently used ones over SNAPSHOT_MAX_BYTES.
+
+    contents is stored as-is (it must be picklable) alongside the format
+    version and current year. The file is written to a temporary name and
+    renamed into place, so a concurrent load never sees a partial snapshot.
+    """
+    snapshot = {"format": SNAPSHOT_FORMAT, "year": datetime.date.today().year, **contents}
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with _LOCK:
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, _path(key))
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        _evict(directory, keep=_path(key))
+
+
+def _evict(directory: Path, keep: Path) -> None:
+    """Delete the least recently used snapshots until the directory fits the size budget."""
+    max_bytes = getattr(settings, "SNAPSHOT_MAX_BYTES", _DEFAULT_MAX_BYTES)
+    entries = []
+    for path in directory.glob("*.pickle"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
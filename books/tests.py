@@ -1,3 +1,1252 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import networkx as nx
+import numpy as np
+import pandas as pd
+from django.db import DatabaseError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from networkx.algorithms import bipartite
+
+from books import (
+    book_cache, corpus, enrichment, graph_cache, jobs, precompute, recommendations, singleflight, snapshots, transport,
+)
+from books.graph_engine import state
+from books.graph_engine.builder import IncrementalGraphBuilder, build_author_graph, build_genre_graph
+from books.graph_engine.diff import diff_library
+from books.graph_engine import projection
+from books.graph_engine.modularity import local_moving, modularity
+from books.graph_engine.universe import detect_communities, update_communities
+from books.graph_engine.library_index import LibraryIndex, ShelfIndex
+from books.graph_engine.schemas import BookNode
+from books.graph_engine.series import SeriesIndex
+from books.models import CachedBook
+from books.stats import compute_reading_stats
+from books.management.commands.benchmark_stats import _legacy_stats, _normalize, _synthetic_export
+from books.openlibrary import background, client
+from books.openlibrary.client import normalize_title
+from books import views
+from books.views import _detect_series, book_details_view
+
+_EXPORT = Path(__file__).resolve().parent.parent / "goodreads_library_export.csv"
+
+_TITLES = [
+    "Harry Potter and the Sorcerer's Stone (Harry Potter, #1)",
+    "Harry Potter and the Chamber of Secrets (Harry Potter, #2)",
+    "Harry Potter: The Prequel (Harry Potter, #0.5)",
+    "The Hunger Games (The Hunger Games, #1)",
+    "Catching Fire (The Hunger Games, #2)",
+    "Mockingjay (The Hunger Games, #3)",
+    "The Way of Kings (The Stormlight Archive, #1)",
+    "The Way of Shadows (Night Angel, #1)",
+    "A Court of Thorns and Roses (A Court of Thorns and Roses, #1)",
+    "A Court of Mist and Fury (A Court of Thorns and Roses, #2)",
+    "A Game of Thrones (A Song of Ice and Fire, #1)",
+    "Dune",
+    "Dune Messiah (Dune #2)",
+    "Children of Dune (Dune #3)",
+    "Sapiens: A Brief History of Humankind",
+    "Homo Deus: A Brief History of Tomorrow",
+    "It",
+    "It Ends with Us (It Ends with Us, #1)",
+    "It Starts with Us (It Ends with Us, #2)",
+    "Emma",
+    "Emma (2)",
+    "Emma #1 story",
+    "The Hobbit",
+    "The Hobbit, or There and Back Again",
+    "The Fellowship of the Ring (The Lord of the Rings, #1)",
+    "The Two Towers (The Lord of the Rings, #2)",
+    "Atomic Habits: An Easy & Proven Way to Build Good Habits & Break Bad Ones",
+    "Good Omens",
+    "",
+    "   ",
+    "Abc",
+    "Abcd",
+    "ABCD: the sequel",
+    "1984",
+    "Animal Farm",
+    "The Name of the Wind (The Kingkiller Chronicle, #1)",
+    "The Wise Man's Fear (The Kingkiller Chronicle, #2)",
+]
+
+
+def _expected(read_titles, candidate):
+    return any(_detect_series(title, candidate) for title in read_titles)
+
+
+class SeriesIndexParityTests(SimpleTestCase):
+    """SeriesIndex must answer exactly like scanning every read title with _detect_series."""
+
+    def assertParity(self, read_titles, candidates):
+        index = SeriesIndex(read_titles)
+        for candidate in candidates:
+            with self.subTest(candidate=candidate):
+                self.assertEqual(index.matches(candidate), _expected(read_titles, candidate))
+
+    def test_hand_picked_titles(self):
+        for i, title in enumerate(_TITLES):
+            read = _TITLES[:i] + _TITLES[i + 1:]
+            self.assertParity(read, [title])
+        self.assertParity([], _TITLES)
+
+    def test_every_single_read_title(self):
+        for title in _TITLES:
+            self.assertParity([title], _TITLES)
+
+    def test_goodreads_export(self):
+        df = pd.read_csv(_EXPORT, dtype=str)
+        titles = df["Title"].dropna().tolist()
+        read = titles[::2]
+        self.assertParity(read, titles)
+
+    def test_random_titles(self):
+        rng = random.Random(20)
+        words = ["the", "of", "a", "war", "night", "kings", "blood", "#1", "(2)", "and", "house", "fire:"]
+        titles = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 7))) for _ in range(400)]
+        self.assertParity(titles[:150], titles[150:])
+
+    def test_removal_restores_previous_answers(self):
+        index = SeriesIndex(_TITLES[:20])
+        for title in _TITLES[10:20]:
+            index.remove(title)
+        for candidate in _TITLES:
+            with self.subTest(candidate=candidate):
+                self.assertEqual(index.matches(candidate), _expected(_TITLES[:10], candidate))
+
+
+class ShelfIndexSeriesTests(SimpleTestCase):
+    def test_in_started_series_follows_the_shelf(self):
+        books = [BookNode(id=f"{title}::Author", title=title, author="Author") for title in _TITLES[:6]]
+        shelf = ShelfIndex(books)
+        self.assertTrue(shelf.in_started_series("Harry Potter and the Goblet of Fire (Harry Potter, #4)"))
+
+        for book in books[:3]:
+            shelf.remove(book)
+        self.assertFalse(shelf.in_started_series("Harry Potter and the Goblet of Fire (Harry Potter, #4)"))
+        self.assertTrue(shelf.in_started_series("The Hunger Games: Sunrise on the Reaping"))
+
+
+def _scanned_similar(books, book):
+    """book_details_view's similar books as the original scans over BOOK_NODES found them."""
+    similar, seen_ids = [], {book.id}
+    if book.subjects:
+        for other in books:
+            if other.id in seen_ids or len(similar) >= 3:
+                break
+            if other.subjects and other.author != book.author and set(book.subjects) & set(other.subjects):
+                similar.append((other.id, "genre"))
+                seen_ids.add(other.id)
+    for other in books:
+        if other.id in seen_ids or len(similar) >= 5:
+            break
+        if other.author == book.author:
+            reason = "Shared universe" if _detect_series(book.title, other.title) else "Same author"
+            similar.append((other.id, reason))
+            seen_ids.add(other.id)
+    return similar
+
+
+class BookDetailsParityTests(SimpleTestCase):
+    """The indexed similar-books lookup must pick what the original shelf scans picked."""
+
+    def test_random_shelves(self):
+        rng = random.Random(19)
+        subjects = [f"subject {i}" for i in range(12)]
+        for _ in range(20):
+            books = []
+            for i in range(60):
+                title = rng.choice(_TITLES[:27]) if rng.random() < 0.5 else f"Book {i}"
+                author = f"Author {rng.randrange(6)}"
+                books.append(BookNode(id=f"{title}::{author}", title=title, author=author,
+                                      subjects=rng.sample(subjects, rng.randrange(3))))
+            with mock.patch.object(state, "LIBRARY_INDEX", LibraryIndex(books)):
+                for book in books:
+                    if book is not state.LIBRARY_INDEX.read.get(book.id):
+                        continue
+                    response = book_details_view(RequestFactory().get("/"), book.id)
+                    found = [(s["id"], "genre" if s["reason"].startswith("Shares genre") else s["reason"])
+                             for s in json.loads(response.content)["similar"]]
+                    with self.subTest(book=book.id):
+                        self.assertEqual(found, _scanned_similar(books, book))
+
+
+class _Owner:
+    """Stands in for the graph builder and library index a cached page belongs to."""
+
+
+class GraphCacheTests(SimpleTestCase):
+    def setUp(self):
+        graph_cache.clear()
+        self.builder, self.index = _Owner(), _Owner()
+        patcher = mock.patch.multiple(state, GRAPH_BUILDER=self.builder, LIBRARY_INDEX=self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(graph_cache.clear)
+
+    def version(self, *versions):
+        return self.builder, self.index, versions or (1, 1, 1)
+
+    def cached(self, key, version):
+        page = graph_cache.get(key, version)
+        return None if page is None else gzip.decompress(page).decode()
+
+    def test_hit_returns_the_stored_page(self):
+        graph_cache.put("a", self.version(), "<html>a</html>")
+        self.assertEqual(self.cached("a", self.version()), "<html>a</html>")
+        self.assertIsNone(self.cached("b", self.version()))
+
+    def test_newer_version_empties_the_cache(self):
+        graph_cache.put("a", self.version(1, 1, 1), "a")
+        self.assertIsNone(self.cached("a", self.version(1, 1, 2)))
+        # A page computed from the older version is no longer stored.
+        graph_cache.put("a", self.version(1, 1, 1), "a")
+        self.assertIsNone(self.cached("a", self.version(1, 1, 2)))
+
+    def test_replaced_library_empties_the_cache(self):
+        graph_cache.put("a", self.version(), "a")
+        old = self.version()
+        with mock.patch.object(state, "GRAPH_BUILDER", _Owner()):
+            self.assertIsNone(self.cached("a", (state.GRAPH_BUILDER, self.index, (1, 1, 1))))
+            self.assertIsNone(self.cached("a", old))
+
+    def test_least_recently_used_pages_are_evicted_over_the_byte_budget(self):
+        pages = {key: os.urandom(3000).hex() for key in "abc"}
+        size = len(gzip.compress(pages["a"].encode(), compresslevel=1, mtime=0))
+        with override_settings(GRAPH_CACHE_MAX_BYTES=int(size * 2.5)):
+            graph_cache.put("a", self.version(), pages["a"])
+            graph_cache.put("b", self.version(), pages["b"])
+            self.cached("a", self.version())
+            graph_cache.put("c", self.version(), pages["c"])
+        self.assertEqual(self.cached("a", self.version()), pages["a"])
+        self.assertIsNone(self.cached("b", self.version()))
+        self.assertEqual(self.cached("c", self.version()), pages["c"])
+        self.assertEqual(graph_cache.stats()["evictions"], 1)
+
+
+class LocalCorpusTests(TestCase):
+    def setUp(self):
+        CachedBook.objects.create(title="Dune", author="Frank Herbert", subjects=["Science fiction"],
+                                  first_publish_year=1965, want_to_read_count=900)
+        CachedBook.objects.create(title="Hyperion", author="Dan Simmons", subjects=["Science Fiction"],
+                                  award_slugs=["hugo_award"], first_publish_year=1989, want_to_read_count=300)
+        CachedBook.objects.create(title="Neuromancer", author="William Gibson", subjects=["science fiction"],
+                                  first_publish_year=1984, want_to_read_count=500, is_read=True)
+        corpus.clear()
+        self.addCleanup(corpus.clear)
+        self.addCleanup(book_cache.clear)
+
+    def test_unread_books_most_wanted_first(self):
+        titles = [b["title"] for b in corpus.books_by_subject("SCIENCE FICTION", limit=5)]
+        self.assertEqual(titles, ["Dune", "Hyperion"])
+        self.assertEqual([b["title"] for b in corpus.books_by_award("hugo_award", limit=5)], ["Hyperion"])
+        self.assertEqual([b["title"] for b in corpus.books_by_era(1980, "science fiction", limit=5)], ["Hyperion"])
+        self.assertEqual(corpus.books_by_era(1980, "fantasy", limit=5), [])
+
+    def test_enough_local_candidates_skip_the_network(self):
+        with mock.patch.object(client.transport, "get") as get:
+            books = client.fetch_books_by_subject("Science fiction", limit=2)
+        get.assert_not_called()
+        self.assertEqual([b["title"] for b in books], ["Dune", "Hyperion"])
+
+    def test_network_results_are_filed_under_their_search(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"docs": [
+            {"key": "/works/OL1W", "title": "The Left Hand of Darkness", "author_name": ["Ursula K. Le Guin"],
+             "want_to_read_count": 700},
+        ]}
+        with mock.patch.object(client.transport, "get", return_value=response):
+            client.fetch_books_by_award("nebula_award", limit=1)
+        self.assertEqual([b["title"] for b in corpus.books_by_award("nebula_award", limit=5)],
+                         ["The Left Hand of Darkness"])
+        row = book_cache.get_cached_book("The Left Hand of Darkness", "Ursula K. Le Guin")
+        self.assertEqual((row.award_slugs, row.found_by_award_slugs), ([], ["nebula_award"]))
+
+    def test_offline_lookups_fall_back_to_local_books(self):
+        with mock.patch.object(client.transport, "get", side_effect=client.requests.ConnectionError):
+            books = client.fetch_books_by_era(1960, "Science fiction", limit=5)
+        self.assertEqual([b["title"] for b in books], ["Dune"])
+
+
+_SUBJECTS = [
+    "Fantasy fiction", "Fantasy", "Science Fiction", "Fiction, Romance, Historical, Regency",
+    "Young adult fiction, vampires", "Wizards -- Fiction", "Magic", "Dragons", "fiction", "series:Dune",
+    "Space opera", "History",
+]
+
+
+def _graph_contents(G):
+    return dict(G.nodes(data=True)), {frozenset((u, v)): d for u, v, d in G.edges(data=True)}
+
+
+class IncrementalGraphBuilderTests(SimpleTestCase):
+    """Any sequence of add / remove / update must leave the graphs a from-scratch build would give."""
+
+    def assertMatchesRebuild(self, builder, books):
+        books = list(books)
+        self.assertEqual(_graph_contents(builder.author_graph), _graph_contents(build_author_graph(books)))
+        self.assertEqual(_graph_contents(builder.genre_graph), _graph_contents(build_genre_graph(books)))
+        genre_scores = Counter()
+        for book in books:
+            for subject in dict.fromkeys(book.subjects):
+                genre_scores[subject] += book.rating or 3
+        self.assertEqual(builder.genre_scores, genre_scores)
+        self.assertEqual(builder.read_titles, Counter(normalize_title(b.title).lower() for b in books))
+
+    def test_random_operations(self):
+        rng = random.Random(12)
+        live = {}
+        builder = IncrementalGraphBuilder()
+        for step in range(400):
+            op = rng.random()
+            if op < 0.5 or not live:
+                title = rng.choice(_TITLES[:27])
+                book = BookNode(id=f"{title}::{step}", title=title, author=f"Author {rng.randrange(8)}",
+                                rating=rng.randrange(6) or None, subjects=rng.sample(_SUBJECTS, rng.randrange(4)))
+                builder.add_book(book)
+                live[book.id] = book
+            elif op < 0.75:
+                book = live.pop(rng.choice(sorted(live)))
+                self.assertTrue(builder.remove_book(book.id))
+            else:
+                book = live[rng.choice(sorted(live))]
+                book.subjects = rng.sample(_SUBJECTS, rng.randrange(5))
+                builder.update_book_subjects(book)
+            if step % 20 == 0:
+                self.assertMatchesRebuild(builder, live.values())
+        self.assertMatchesRebuild(builder, live.values())
+
+        for book_id in sorted(live):
+            builder.remove_book(book_id)
+        self.assertEqual((builder.author_graph.number_of_nodes(), builder.genre_graph.number_of_nodes()), (0, 0))
+        self.assertFalse(builder.genre_scores or builder.read_titles)
+
+    def test_versions(self):
+        builder = IncrementalGraphBuilder()
+        book = BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert", subjects=["Space opera"])
+        builder.add_book(book)
+        version, subject_version = builder.version, builder.subject_version
+        self.assertFalse(builder.update_book_subjects(book))
+        self.assertEqual((builder.version, builder.subject_version), (version, subject_version))
+        book.subjects = ["Space opera", "Deserts"]
+        self.assertTrue(builder.update_book_subjects(book))
+        self.assertEqual(builder.author_graph.graph["subject_version"], subject_version + 1)
+        self.assertFalse(builder.remove_book("missing"))
+
+
+def _row(title, author="Author", goodreads_id=None, **fields):
+    return BookNode(id=f"{title}::{author}", title=title, author=author, goodreads_id=goodreads_id, **fields)
+
+
+class DiffLibraryTests(SimpleTestCase):
+    def test_matching(self):
+        enriched = {"subjects": ["Fantasy"], "cover_url": "cover.jpg", "openlibrary_id": "/works/OL1W"}
+        old = [
+            _row("Kept", goodreads_id="1", rating=4, **enriched),
+            _row("Rated", goodreads_id="2", rating=3, **enriched),
+            _row("Renamed", goodreads_id="3", **enriched),
+            _row("No Id", rating=5, **enriched),
+            _row("Gone", goodreads_id="5"),
+        ]
+        new = [
+            _row("Moved", goodreads_id="6"),
+            _row("Kept", goodreads_id="1", rating=4),
+            _row("Rated", goodreads_id="2", rating=5),
+            _row("Renamed (Deluxe Edition)", goodreads_id="3"),
+            _row("No Id", rating=5),
+        ]
+        donor = _row("Moved", goodreads_id="6", shelf="to-read", **enriched)
+
+        diff = diff_library(old, new, donors=[donor])
+
+        self.assertEqual(diff.summary(), {"added": 1, "removed": 1, "changed": 2, "unchanged": 2})
+        self.assertEqual([b.title for b in diff.books], ["Moved", "Kept", "Rated", "Renamed (Deluxe Edition)", "No Id"])
+        self.assertIs(diff.books[1], old[0])
+        self.assertIs(diff.books[4], old[3])
+        self.assertEqual(diff.removed, [old[4]])
+        self.assertEqual([(o.title, n.title) for o, n in diff.changed],
+                         [("Rated", "Rated"), ("Renamed", "Renamed (Deluxe Edition)")])
+
+        # Metadata carries over when the book itself is the same, and is fetched again when it was renamed.
+        moved, rated, renamed = diff.books[0], diff.books[2], diff.books[3]
+        self.assertEqual((moved.cover_url, moved.subjects, moved.shelf), ("cover.jpg", ["Fantasy"], None))
+        self.assertEqual((rated.cover_url, rated.subjects), ("cover.jpg", ["Fantasy"]))
+        self.assertIsNot(rated.subjects, old[1].subjects)
+        self.assertEqual((renamed.cover_url, renamed.subjects), (None, []))
+
+    def test_donor_for_other_book_is_ignored(self):
+        donor = _row("Other Title", goodreads_id="7", cover_url="cover.jpg")
+        diff = diff_library([], [_row("Title", goodreads_id="7")], donors=[donor])
+        self.assertIsNone(diff.added[0].cover_url)
+
+
+def _random_bipartite(rng, books, subjects, links):
+    G = nx.Graph()
+    G.add_nodes_from((f"b{i}", {"type": "book", "label": i}) for i in range(books))
+    G.add_nodes_from((f"s{i}", {"type": "subject"}) for i in range(subjects))
+    G.add_edges_from((f"b{rng.randrange(books)}", f"s{rng.randrange(subjects)}") for _ in range(links))
+    return G
+
+
+class ProjectionParityTests(SimpleTestCase):
+    """project() must give the same graph as networkx's weighted_projected_graph."""
+
+    def assertParity(self, G, book_nodes=None):
+        if book_nodes is None:
+            book_nodes = [n for n, d in G.nodes(data=True) if d["type"] == "book"]
+        expected = bipartite.weighted_projected_graph(G, book_nodes)
+        actual = projection.projected_graph(G, book_nodes)
+        self.assertEqual(_graph_contents(actual), _graph_contents(expected))
+
+    def test_random_graphs(self):
+        rng = random.Random(13)
+        for seed in range(15):
+            G = _random_bipartite(rng, rng.randrange(1, 60), rng.randrange(1, 20), rng.randrange(150))
+            with self.subTest(seed=seed):
+                self.assertParity(G)
+
+    def test_book_subset(self):
+        # A subset projects like networkx does over the graph holding only those books.
+        rng = random.Random(31)
+        for seed in range(10):
+            G = _random_bipartite(rng, rng.randrange(1, 60), rng.randrange(1, 20), rng.randrange(150))
+            books = [n for n, d in G.nodes(data=True) if d["type"] == "book"]
+            subset = rng.sample(books, len(books) // 2)
+            subjects = [n for n, d in G.nodes(data=True) if d["type"] == "subject"]
+            with self.subTest(seed=seed):
+                expected = bipartite.weighted_projected_graph(G.subgraph(subset + subjects), subset)
+                self.assertEqual(_graph_contents(projection.projected_graph(G, subset)), _graph_contents(expected))
+
+    def test_chunked_reduction(self):
+        G = _random_bipartite(random.Random(5), 80, 6, 300)
+        with mock.patch.object(projection, "CHUNK_PAIRS", 7):
+            self.assertParity(G)
+
+    def test_min_weight(self):
+        G = _random_bipartite(random.Random(8), 40, 10, 200)
+        full = projection.project(G)
+        pruned = projection.project(G, min_weight=2)
+        self.assertEqual(pruned.edge_count, int((full.weights >= 2).sum()))
+        self.assertEqual(_graph_contents(pruned.to_networkx()), _graph_contents(full.pruned(2).to_networkx()))
+
+
+_GENRES = {
+    "fantasy": ["Dragons", "Magic", "Wizards"],
+    "sf": ["Space opera", "Robots", "Aliens"],
+    "romance": ["Regency", "Courtship", "Ballrooms"],
+}
+
+
+def _genre_book(genre, i, rng):
+    return BookNode(id=f"{genre} {i}::Author", title=f"{genre} {i}", author="Author",
+                    subjects=rng.sample(_GENRES[genre], 2))
+
+
+def _cluster_of(clusters, node):
+    return next(c for c in clusters if node in c["book_nodes"])
+
+
+class LocalMovingTests(SimpleTestCase):
+    def test_moves_only_improve_modularity(self):
+        rng = random.Random(15)
+        for seed in range(10):
+            G = _random_bipartite(rng, 40, 12, 120)
+            proj = projection.project(G)
+            membership = np.array([rng.randrange(5) for _ in proj.nodes])
+            membership[proj.degree() == 0] = -1
+            before = membership.copy()
+            with self.subTest(seed=seed):
+                moves = local_moving(proj, membership, range(len(proj.nodes)), resolution=1.5)
+                self.assertEqual(moves > 0, bool((membership != before).any()))
+                self.assertGreaterEqual(modularity(proj, membership, 1.5), modularity(proj, before, 1.5) - 1e-12)
+                self.assertTrue(((membership < 0) == (before < 0)).all())
+
+    def test_separates_two_cliques(self):
+        G = nx.Graph()
+        G.add_nodes_from((f"b{i}", {"type": "book"}) for i in range(8))
+        G.add_edges_from((f"b{i}", f"s{i // 4}") for i in range(8))
+        G.add_edge("b3", "s1")
+        proj = projection.project(G)
+        membership = np.arange(len(proj.nodes))
+        local_moving(proj, membership, range(len(proj.nodes)))
+        self.assertEqual(len(set(membership[:4].tolist())), 1)
+        self.assertEqual(len(set(membership[4:].tolist())), 1)
+        self.assertNotEqual(membership[0], membership[4])
+
+    def test_inactive_nodes_stay(self):
+        G = _random_bipartite(random.Random(2), 20, 5, 60)
+        proj = projection.project(G)
+        membership = np.arange(len(proj.nodes))
+        self.assertEqual(local_moving(proj, membership, []), 0)
+        self.assertEqual(membership.tolist(), list(range(len(proj.nodes))))
+
+
+class UpdateCommunitiesTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.books = {b.id: b for genre in _GENRES for b in (_genre_book(genre, i, rng) for i in range(8))}
+        self.builder = IncrementalGraphBuilder.from_books(self.books.values())
+        self.previous = detect_communities(self.builder.genre_graph)
+
+    def test_previous_partition_follows_genres(self):
+        self.assertEqual(len(self.previous), 3)
+        for cluster in self.previous:
+            self.assertEqual(len({node.split()[0] for node in cluster["book_nodes"]}), 1)
+
+    def test_changed_book_moves(self):
+        book = self.books["fantasy 0::Author"]
+        book.subjects = ["Space opera", "Robots"]
+        self.builder.update_book_subjects(book)
+        graph = self.builder.genre_graph
+        result = update_communities(graph, self.previous, ["book::fantasy 0::Author"])
+
+        self.assertEqual(state.COMMUNITY_REPORT["backend"], "warm_start")
+        self.assertEqual({c["id"] for c in result}, {c["id"] for c in self.previous})
+        self.assertIs(_cluster_of(result, "book::fantasy 0::Author"), _cluster_of(result, "book::sf 0::Author"))
+        old_romance = _cluster_of(self.previous, "book::romance 0::Author")
+        romance = _cluster_of(result, "book::romance 0::Author")
+        # Reused as-is; only the representative book is re-picked.
+        self.assertEqual({**romance, "representative_book": None}, {**old_romance, "representative_book": None})
+        self.assertEqual(sorted(n for c in result for n in c["book_nodes"]), sorted(f"book::{i}" for i in self.books))
+
+    def test_added_and_removed_books(self):
+        self.builder.remove_book("sf 1::Author")
+        added = BookNode(id="new::Author", title="new", author="Author", subjects=["Regency", "Ballrooms"])
+        self.builder.add_book(added)
+        result = update_communities(self.builder.genre_graph, self.previous, ["book::sf 1::Author", "book::new::Author"])
+
+        nodes = [n for c in result for n in c["book_nodes"]]
+        self.assertNotIn("book::sf 1::Author", nodes)
+        self.assertIs(_cluster_of(result, "book::new::Author"), _cluster_of(result, "book::romance 0::Author"))
+        self.assertEqual(_cluster_of(result, "book::sf 0::Author")["id"],
+                         _cluster_of(self.previous, "book::sf 0::Author")["id"])
+
+    def test_report_scores_modularity_at_the_backend_resolution(self):
+        for backend in ("louvain", "label_propagation"):
+            with self.subTest(backend=backend):
+                clusters = detect_communities(self.builder.genre_graph, backend=backend)
+                proj = projection.cached_projection(self.builder.genre_graph)
+                membership = np.full(len(proj.nodes), -1)
+                for label, cluster in enumerate(clusters):
+                    membership[[proj.nodes.index(node) for node in cluster["book_nodes"]]] = label
+                report = state.COMMUNITY_REPORT
+                self.assertEqual(report["resolution"], 1.5)
+                self.assertAlmostEqual(report["modularity"], modularity(proj, membership, 1.5), places=4)
+                self.assertNotAlmostEqual(report["modularity"], modularity(proj, membership), places=4)
+
+    def test_large_change_falls_back_to_full_detection(self):
+        changed = [f"book::{book_id}" for book_id in list(self.books)[:8]]
+        with mock.patch("books.graph_engine.universe.detect_communities", return_value=["full"]) as detect:
+            self.assertEqual(update_communities(self.builder.genre_graph, self.previous, changed), ["full"])
+        detect.assert_called_once_with(self.builder.genre_graph)
+
+
+class TransportSessionTests(SimpleTestCase):
+    def setUp(self):
+        self._reset()
+        self.addCleanup(self._reset)
+
+    @staticmethod
+    def _reset():
+        transport._ADAPTERS.clear()
+        transport._local.__dict__.pop("session", None)
+
+    @override_settings(HTTP_POOL_SIZES={"covers.openlibrary.org": 3}, HTTP_POOL_SIZE=7)
+    def test_sessions_per_thread_share_adapters(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(transport.session())) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(transport.session(), transport.session())
+        self.assertIsNot(sessions[0], sessions[1])
+
+        covers = [s.get_adapter("https://covers.openlibrary.org/b/id/1-M.jpg") for s in sessions]
+        default = [s.get_adapter("https://openlibrary.org/search.json") for s in sessions]
+        self.assertIs(covers[0], covers[1])
+        self.assertIs(default[0], default[1])
+        self.assertIs(default[0], sessions[0].get_adapter("http://openlibrary.org/"))
+        self.assertEqual((covers[0]._pool_maxsize, default[0]._pool_maxsize), (3, 7))
+
+
+class _Clock:
+    """Stands in for transport.time: monotonic() is only moved by sleep() and advance()."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    advance = sleep
+
+
+class BreakerAndLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch.object(transport, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_breaker_transitions(self):
+        breaker = transport.CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.failures), ("closed", 0))
+
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.clock.advance(29)
+        with self.assertRaises(transport.CircuitOpenError):
+            breaker.before_call()
+
+        # Half-open: one probe at a time; a failed probe reopens for another reset_timeout.
+        self.clock.advance(1)
+        breaker.before_call()
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(transport.CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.snapshot()["retry_in_seconds"], 30)
+
+        self.clock.advance(30)
+        breaker.before_call()
+        breaker.release_probe()
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot()["state"], "closed")
+        self.assertEqual(breaker.rejected, 2)
+
+    def test_token_bucket(self):
+        bucket = transport.TokenBucket(rate=2.0, capacity=3)
+        self.assertTrue(all(bucket.acquire(0) for _ in range(3)))
+        self.assertFalse(bucket.acquire(0.4))
+        self.assertEqual(self.clock.now, 1000.0)
+        self.assertTrue(bucket.acquire(0.5))
+        self.assertEqual(self.clock.now, 1000.5)
+
+        self.clock.advance(60)
+        self.assertEqual(bucket.snapshot()["tokens_available"], 3)
+
+    @override_settings(HTTP_BREAKER_FAILURES=2, HTTP_BREAKER_RESET=10, HTTP_RATE_LIMITS={}, HTTP_RATE_LIMIT=(1.0, 1),
+                       HTTP_RATE_LIMIT_WAIT=0)
+    def test_get_fails_fast(self):
+        self.addCleanup(transport._UPSTREAMS.pop, "breaker.test", None)
+        url = "https://breaker.test/search.json"
+        fake = mock.Mock()
+        fake.get.side_effect = transport.requests.ConnectionError
+        with mock.patch.object(transport, "session", return_value=fake):
+            with self.assertRaises(transport.requests.ConnectionError):
+                transport.get(url)
+            with self.assertRaises(transport.RateLimitedError):
+                transport.get(url)
+            self.clock.advance(1)
+            with self.assertRaises(transport.requests.ConnectionError):
+                transport.get(url)
+            with self.assertRaises(transport.CircuitOpenError):
+                transport.get(url)
+        self.assertEqual(fake.get.call_count, 2)
+        self.assertEqual(transport.diagnostics()["breaker.test"]["breaker"]["state"], "open")
+
+
+class SingleFlightTests(SimpleTestCase):
+    def _run_concurrently(self, name, callers, result=None, error=None):
+        """Call a single-flight function from `callers` threads while its first call is blocked."""
+        release = threading.Event()
+        runs = []
+
+        @singleflight.single_flight(name, key=lambda query, limit: query.lower())
+        def fetch(query, limit):
+            runs.append(query)
+            release.wait(5)
+            if error is not None:
+                raise error
+            return result
+
+        outcomes = []
+
+        def call(i):
+            try:
+                outcomes.append(fetch("Dune" if i % 2 else "dune", limit=i))
+            except Exception as exc:
+                outcomes.append(exc)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        while singleflight.stats()[name]["calls"] < callers:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return fetch, runs, outcomes
+
+    def test_concurrent_calls_share_one_execution(self):
+        result = [{"title": "Dune"}]
+        fetch, runs, outcomes = self._run_concurrently("sf_share", 6, result=result)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(outcomes, [result] * 6)
+        # Waiters get their own copy, so mutating one answer cannot leak into another.
+        self.assertEqual(len({id(o) for o in outcomes}), 6)
+        self.assertEqual(singleflight.stats()["sf_share"],
+                         {"calls": 6, "executed": 1, "coalesced": 5, "in_flight": 0})
+
+        # Nothing is cached once the call has returned.
+        fetch("dune", limit=1)
+        self.assertEqual(len(runs), 2)
+
+    def test_error_reaches_every_caller(self):
+        error = ValueError("upstream down")
+        _, runs, outcomes = self._run_concurrently("sf_error", 4, error=error)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(outcomes, [error] * 4)
+
+    def test_distinct_and_unhashable_keys_run_separately(self):
+        calls = []
+
+        @singleflight.single_flight("sf_keys")
+        def fetch(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual(fetch(["unhashable"]), ["unhashable"])
+        fetch("a")
+        fetch("b")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(singleflight.stats()["sf_keys"]["calls"], 2)
+
+
+def _run_stages(book):
+    """Take one read book through the enrichment stages on this thread."""
+    stage = enrichment._first_stage(book, True)
+    while stage is not None:
+        stage = enrichment._STAGES[stage](book, True)
+
+
+class DescriptionStageTests(TestCase):
+    def setUp(self):
+        CachedBook.objects.create(title="Dune", author="Frank Herbert", openlibrary_id="/works/OL1W",
+                                  openlibrary_fetched=True, google_books_fetched=True,
+                                  cover_url="https://covers.openlibrary.org/b/id/1-M.jpg", subjects=["Space opera"])
+        self.addCleanup(book_cache.clear)
+
+    def _upload(self, response):
+        book_cache.clear()
+        book = BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert")
+        with mock.patch.object(transport, "get", return_value=response) as get:
+            _run_stages(book)
+        book_cache.flush()
+        return book, [call.args[0] for call in get.call_args_list]
+
+    def test_missing_description_is_asked_for_once(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {}
+        first, urls = self._upload(response)
+        self.assertEqual((first.description, urls), ("", ["https://openlibrary.org/works/OL1W.json"]))
+
+        second, urls = self._upload(response)
+        self.assertEqual((second.description, urls), ("", []))
+        self.assertTrue(CachedBook.objects.get(title="Dune").description_fetched)
+
+    def test_failed_lookup_is_retried(self):
+        CachedBook.objects.filter(title="Dune").update(openlibrary_id="/books/OL1M")
+        with mock.patch.object(transport, "get", side_effect=transport.requests.ConnectionError):
+            book = BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert")
+            _run_stages(book)
+        book_cache.flush()
+        self.assertFalse(CachedBook.objects.get(title="Dune").description_fetched)
+
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"description": {"value": "Arrakis."}}
+        book, urls = self._upload(response)
+        self.assertEqual((book.description, urls), ("Arrakis.", ["https://openlibrary.org/books/OL1M.json"]))
+
+
+class WriteBehindTests(TestCase):
+    def setUp(self):
+        book_cache.clear()
+        self.addCleanup(book_cache.clear)
+
+    def test_merge_rules(self):
+        CachedBook.objects.create(title="Dune", author="Frank Herbert", cover_url="https://example.com/old.jpg",
+                                  is_read=True, subjects=["Old"], found_by_subjects=["Fantasy"])
+        book_cache.update_book("Dune", "Frank Herbert", cover_url="https://example.com/new.jpg", is_read=False,
+                               subjects=["Space opera"], found_by_subjects=["Fantasy", "Deserts"], page_count=412)
+        with self.assertRaises(ValueError):
+            book_cache.update_book("Dune", "Frank Herbert", title_typo="x")
+        book_cache.flush()
+
+        row = CachedBook.objects.get(title="Dune")
+        self.assertEqual(
+            (row.cover_url, row.is_read, row.subjects, row.found_by_subjects, row.page_count),
+            ("https://example.com/old.jpg", True, ["Space opera"], ["Fantasy", "Deserts"], 412),
+        )
+
+    def test_flushed_rows_are_updated_not_recreated(self):
+        book_cache.update_book("Dune", "Frank Herbert", page_count=412)
+        book_cache.flush()
+        book_cache.update_book("Dune", "Frank Herbert", openlibrary_fetched=True)
+        book_cache.flush()
+        row = CachedBook.objects.get(title="Dune")
+        self.assertEqual((row.page_count, row.openlibrary_fetched), (412, True))
+
+    def test_failed_flush_is_logged_and_kept(self):
+        book_cache.update_book("Dune", "Frank Herbert", page_count=412)
+        with mock.patch.object(CachedBook.objects, "bulk_create", side_effect=DatabaseError("locked")), \
+                self.assertLogs("books.book_cache", "ERROR"):
+            book_cache.flush()
+        self.assertFalse(CachedBook.objects.exists())
+        book_cache.flush()
+        self.assertEqual(CachedBook.objects.get(title="Dune").page_count, 412)
+
+
+class UploadJobTests(SimpleTestCase):
+    def test_failure_is_logged_with_traceback(self):
+        def target(job):
+            raise ValueError("bad export")
+
+        job = {"id": "job-1", "status": "queued"}
+        with self.assertLogs("books.jobs", "ERROR") as logs:
+            jobs._run(job, target, ())
+        self.assertEqual((job["status"], job["error"]), ("failed", "bad export"))
+        self.assertIn("ValueError: bad export", logs.output[0])
+
+
+class BackgroundEnrichmentTests(SimpleTestCase):
+    def test_failed_community_update_still_publishes_the_graphs(self):
+        books = [BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert", subjects=["Space opera"])]
+        previous = [{"id": "cluster::0"}]
+        patches = [
+            mock.patch.multiple(state, BOOK_NODES=books, WANT_TO_READ_NODES=[], GRAPH_BUILDER=None, GRAPH=None,
+                                GENRE_GRAPH=None, COMMUNITIES=previous, UNIVERSE_VERSION=3,
+                                LIBRARY_INDEX=LibraryIndex(books, [])),
+            mock.patch.object(background, "enrich_concurrently"),
+            mock.patch.object(background, "enrich_by_isbn"),
+            mock.patch.object(background, "start_precompute"),
+            mock.patch.object(background.book_cache, "flush"),
+            mock.patch("books.graph_engine.universe.update_communities", side_effect=KeyError("book::gone")),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with self.assertLogs("books.openlibrary.background", "ERROR"):
+            background.load_remaining_covers()
+        self.assertIsNotNone(state.GRAPH_BUILDER)
+        self.assertIs(state.GENRE_GRAPH, state.GRAPH_BUILDER.genre_graph)
+        self.assertIs(state.COMMUNITIES, previous)
+        self.assertEqual(state.UNIVERSE_VERSION, 4)
+
+
+class ReadingStatsParityTests(SimpleTestCase):
+    """compute_reading_stats must give what the legacy per-subset helpers gave."""
+
+    def assertParity(self, df):
+        self.assertEqual(_normalize(compute_reading_stats(df.copy())), _normalize(_legacy_stats(df.copy())))
+
+    def test_synthetic_exports(self):
+        for rows in (1, 2, 5, 40, 300):
+            for seed in range(3):
+                with self.subTest(rows=rows, seed=seed):
+                    self.assertParity(_synthetic_export(rows, seed))
+
+    def test_sample_export(self):
+        self.assertParity(pd.read_csv(_EXPORT))
+
+
+class PrefetchTests(TestCase):
+    def setUp(self):
+        book_cache.clear()
+        self.addCleanup(book_cache.clear)
+        for i in range(5):
+            CachedBook.objects.create(title=f"Book {i}", author="Author", page_count=100 + i)
+        CachedBook.objects.create(title="Book 0", author="Other Author")
+
+    def test_rows_and_misses_are_answered_from_memory(self):
+        pairs = [(f"Book {i}", "Author") for i in range(7)]
+        with mock.patch.object(book_cache, "PREFETCH_BATCH_SIZE", 2), self.assertNumQueries(4):
+            book_cache.prefetch(pairs)
+        with self.assertNumQueries(0):
+            rows = [book_cache.get_cached_book(title, author) for title, author in pairs]
+        self.assertEqual([row.page_count if row else None for row in rows], [100, 101, 102, 103, 104, None, None])
+
+        # Pairs outside the prefetch fall through to the DB.
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(book_cache.get_cached_book("Book 0", "Other Author"))
+
+    def test_next_prefetch_replaces_the_previous_one(self):
+        book_cache.prefetch([("Book 0", "Author")])
+        book_cache.prefetch([("Book 1", "Author")])
+        with self.assertNumQueries(1):
+            self.assertEqual(book_cache.get_cached_book("Book 0", "Author").page_count, 100)
+
+
+class EnrichmentPipelineTests(SimpleTestCase):
+    """Books take the documented route through the provider stages."""
+
+    def setUp(self):
+        self.visits = {}
+        lock = threading.Lock()
+
+        def visit(stage, result=None):
+            def fake(title, *args, **kwargs):
+                with lock:
+                    self.visits.setdefault(title, []).append(stage)
+                return result(title) if callable(result) else result
+            return fake
+
+        def work_data(title):
+            data = {"openlibrary_id": "/works/OL1W", "subjects": ["Space opera"], "description": ""}
+            return {**data, "cover_url": "ol.jpg"} if title == "work cover" else data
+
+        patches = {
+            "fetch_work_data": visit("work_data", work_data),
+            "fetch_cover_for_read_book": visit("ol_cover", lambda title: "cover.jpg" if title == "ol cover" else None),
+            "inventaire_fetch_cover": visit("inventaire"),
+            "_apply_gb_genres": lambda book: visit("google_books")(book.title),
+            "fetch_description": visit("description", ""),
+        }
+        for name, fake in patches.items():
+            patcher = mock.patch.object(enrichment, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_read_books(self):
+        books = [BookNode(id=t, title=t, author="A") for t in ("work cover", "ol cover", "no cover")]
+        books.append(BookNode(id="isbn hit", title="isbn hit", author="A", cover_url="isbn.jpg",
+                              subjects=["Space opera"], openlibrary_id="/books/OL1M"))
+        done = []
+        enrichment.enrich_concurrently(books, is_read=True, on_book_done=done.append)
+
+        self.assertEqual(self.visits, {
+            "work cover": ["work_data", "google_books"],
+            "ol cover": ["work_data", "ol_cover", "google_books"],
+            "no cover": ["work_data", "ol_cover", "inventaire", "google_books"],
+            "isbn hit": ["google_books", "description"],
+        })
+        self.assertCountEqual(done, books)
+
+    def test_want_to_read_books_skip_read_only_stages(self):
+        books = [BookNode(id=t, title=t, author="A") for t in ("work cover", "no cover")]
+        enrichment.enrich_concurrently(books, is_read=False)
+        self.assertEqual(self.visits, {"work cover": ["work_data"], "no cover": ["work_data", "ol_cover"]})
+
+    def test_stopped_pipeline_drops_books(self):
+        done = []
+        books = [BookNode(id=f"b{i}", title="no cover", author="A") for i in range(5)]
+        enrichment.enrich_concurrently(books, on_book_done=done.append, should_stop=lambda: True)
+        self.assertEqual((self.visits, done), ({}, []))
+
+
+class IsbnLookupTests(TestCase):
+    def setUp(self):
+        book_cache.clear()
+        self.addCleanup(book_cache.clear)
+
+    def test_one_request_per_batch_and_cached_books_skipped(self):
+        CachedBook.objects.create(title="Known", author="A", openlibrary_fetched=True)
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"ISBN:9780441013593": {
+            "key": "/books/OL1M", "subjects": [{"name": "Space opera"}, {"name": "award:hugo_award=1966"}],
+            "cover": {"medium": "https://covers.openlibrary.org/b/id/1-M.jpg"}, "number_of_pages": 412,
+            "publish_date": "August 2005", "publishers": [{"name": "Ace"}],
+            "identifiers": {"isbn_13": ["9780441013593"]},
+        }}
+        items = [("Dune", "Frank Herbert", "9780441013593", None), ("Known", "A", "9780000000002", None),
+                 ("Missing", "B", None, "0000000019"), ("No Isbn", "C", None, None)]
+        with mock.patch.object(transport, "get", return_value=response) as get:
+            results = client.fetch_work_data_by_isbn(items, is_read=True)
+
+        get.assert_called_once()
+        self.assertEqual(get.call_args.kwargs["params"]["bibkeys"], "ISBN:9780441013593,ISBN:0000000019")
+        self.assertEqual(list(results), [("Dune", "Frank Herbert")])
+        self.assertEqual(results[("Dune", "Frank Herbert")]["description"], None)
+        book_cache.flush()
+        row = CachedBook.objects.get(title="Dune")
+        self.assertEqual(
+            (row.openlibrary_id, row.subjects, row.award_slugs, row.page_count, row.first_publish_year,
+             row.openlibrary_fetched, row.isbn_13, row.publisher),
+            ("/books/OL1M", ["Space opera"], ["hugo_award"], 412, 2005, True, "9780441013593", "Ace"),
+        )
+        # An ISBN miss is left for the title search.
+        self.assertFalse(CachedBook.objects.get(title="Missing").openlibrary_fetched)
+
+
+class IsbnPassTests(SimpleTestCase):
+    def test_books_are_looked_up_in_batches(self):
+        books = [BookNode(id=f"b{i}", title=f"b{i}", author="A", isbn_13=f"978{i:010d}" if i % 3 else None)
+                 for i in range(12)]
+        looked_up = []
+
+        def lookup(items, is_read):
+            looked_up.append([title for title, *_ in items])
+            return {(title, author): {"subjects": ["Space opera"]} for title, author, *_ in items}
+
+        with mock.patch.object(enrichment, "ISBN_BATCH_SIZE", 3), \
+                mock.patch.object(enrichment, "fetch_work_data_by_isbn", side_effect=lookup):
+            hits = enrichment.enrich_by_isbn(books)
+
+        self.assertEqual(hits, 8)
+        self.assertCountEqual([len(batch) for batch in looked_up], [3, 3, 2])
+        self.assertEqual([bool(b.subjects) for b in books], [bool(b.isbn_13) for b in books])
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        patcher = override_settings(SNAPSHOT_DIR=self.dir)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def test_round_trip(self):
+        books = [BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert", rating=5,
+                          subjects=["Space opera"], cover_url="dune.jpg")]
+        builder = IncrementalGraphBuilder.from_books(books, lock=state.GRAPH_LOCK)
+        snapshots.save("key", stats={"total_books": 1}, book_nodes=books, graph_builder=builder,
+                       communities=[{"id": "cluster::0"}])
+
+        snapshot = snapshots.load("key")
+        self.assertEqual(snapshot["book_nodes"], books)
+        self.assertEqual(snapshot["stats"], {"total_books": 1})
+        self.assertEqual(snapshot["communities"], [{"id": "cluster::0"}])
+        restored = snapshot["graph_builder"]
+        self.assertEqual(_graph_contents(restored.author_graph), _graph_contents(builder.author_graph))
+        self.assertEqual((restored.genre_scores, restored.read_titles), (builder.genre_scores, builder.read_titles))
+        restored.remove_book("Dune::Frank Herbert")
+        self.assertEqual(restored.author_graph.number_of_nodes(), 0)
+
+    def test_misses(self):
+        self.assertIsNone(snapshots.load("absent"))
+        snapshots.save("old")
+        with mock.patch.object(snapshots, "SNAPSHOT_FORMAT", snapshots.SNAPSHOT_FORMAT + 1):
+            self.assertIsNone(snapshots.load("old"))
+        (self.dir / "broken.pickle").write_bytes(b"not a pickle")
+        self.assertIsNone(snapshots.load("broken"))
+        self.assertFalse((self.dir / "broken.pickle").exists())
+
+    def test_least_recently_used_are_evicted(self):
+        payload = os.urandom(4000)
+        snapshots.save("a", data=payload)
+        size = (self.dir / "a.pickle").stat().st_size
+        snapshots.save("b", data=payload)
+        os.utime(self.dir / "a.pickle", (1, 1))
+        os.utime(self.dir / "b.pickle", (2, 2))
+        snapshots.load("a")   # a is now the most recently used
+        with override_settings(SNAPSHOT_MAX_BYTES=int(size * 2.5)):
+            snapshots.save("c", data=payload)
+        self.assertEqual(sorted(p.stem for p in self.dir.glob("*.pickle")), ["a", "c"])
+
+
+class ProjectionCacheTests(SimpleTestCase):
+    def test_reused_until_subject_links_change(self):
+        books = [BookNode(id=f"b{i}", title=f"b{i}", author="A", subjects=["Space opera", "Robots"][:i % 2 + 1])
+                 for i in range(4)]
+        builder = IncrementalGraphBuilder.from_books(books)
+        graph = builder.genre_graph
+        first = projection.cached_projection(graph)
+        self.assertIs(projection.cached_projection(graph), first)
+
+        self.assertFalse(builder.update_book_subjects(books[0]))
+        self.assertIs(projection.cached_projection(graph), first)
+
+        books[0].subjects = ["Deserts"]
+        builder.update_book_subjects(books[0])
+        second = projection.cached_projection(graph)
+        self.assertIsNot(second, first)
+        self.assertEqual(_graph_contents(second.to_networkx()), _graph_contents(projection.project(graph).to_networkx()))
+
+    def test_unversioned_graphs_are_not_cached(self):
+        G = _random_bipartite(random.Random(4), 10, 3, 20)
+        self.assertIsNot(projection.cached_projection(G), projection.cached_projection(G))
+
+
+def _rec(title, author="Someone"):
+    return {"title": title, "author": author, "cover_url": None}
+
+
+class RecommendationSourcesTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.addCleanup(self.executor.shutdown)
+        self.work_data = {"subjects": ["Deserts", "Space opera", "Ecology", "Politics"],
+                          "award_slugs": ["hugo_award", "nebula_award", "locus_award"], "first_publish_year": 1965}
+        # The six genre/award/era lookups only get past this if they all run at the same time.
+        barrier = threading.Barrier(6, timeout=5)
+
+        def dependent(name):
+            def fake(key, *args, **kwargs):
+                barrier.wait()
+                return [_rec(f"{name} {key}")]
+            return fake
+
+        fakes = {
+            "fetch_work_data": lambda title, author: self.work_data,
+            "fetch_unread_books_by_author": lambda author, read_titles, limit: [],
+            "inventaire_fetch_by_author": lambda author, read_titles, limit: [_rec("Children of Dune", author)],
+            "fetch_books_by_subject": dependent("genre"),
+            "fetch_books_by_award": dependent("award"),
+            "fetch_books_by_era": dependent("era"),
+        }
+        for name, fake in fakes.items():
+            patcher = mock.patch.object(recommendations, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sources(self, kinds):
+        genre_scores = Counter({"Space opera": 9, "Ecology": 4, "Deserts": 2})
+        return recommendations.fetch_sources("Dune", "Frank Herbert", Counter(), genre_scores, kinds,
+                                             deadline=5, executor=self.executor)
+
+    def test_lookups_run_in_parallel_and_are_keyed_by_source(self):
+        sources = self.sources({"genre", "award", "era"})
+        self.assertEqual(sources.pending, [])
+        self.assertEqual(sources.ranked_genres, ["Space opera", "Ecology", "Deserts"])
+        self.assertEqual(sources.books("author"), [_rec("Children of Dune", "Frank Herbert")])
+        self.assertEqual(sources.books("genre::Ecology"), [_rec("genre Ecology")])
+        self.assertEqual(sources.books("award::nebula_award"), [_rec("award nebula_award")])
+        self.assertFalse(sources.ready("award::locus_award"))
+        self.assertEqual(sources.books("era"), [_rec("era 1960")])
+
+    def test_hidden_kinds_are_not_looked_up(self):
+        with mock.patch.object(recommendations, "fetch_books_by_subject") as genre, \
+                mock.patch.object(recommendations, "fetch_books_by_award", lambda slug, limit: [_rec(slug)]):
+            sources = self.sources({"award"})
+        genre.assert_not_called()
+        self.assertEqual(sources.pending, [])
+        self.assertEqual(sources.books("award::hugo_award"), [_rec("hugo_award")])
+        self.assertFalse(sources.ready("era"))
+
+
+class PartialRecommendationTests(SimpleTestCase):
+    def setUp(self):
+        book = BookNode(id="Dune::Frank Herbert", title="Dune", author="Frank Herbert", rating=5,
+                        subjects=["Space opera"])
+        builder = IncrementalGraphBuilder.from_books([book])
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.release = threading.Event()
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.release.set)
+        self.addCleanup(graph_cache.clear)
+
+        def by_subject(genre, limit):
+            if genre == "Space opera":
+                self.release.wait(5)
+                return [_rec("Hyperion"), _rec("Foundation")]
+            return [_rec("Foundation"), _rec("Silent Spring")]
+
+        patches = [
+            mock.patch.multiple(state, GRAPH=builder.author_graph, GRAPH_BUILDER=builder,
+                                LIBRARY_INDEX=LibraryIndex([book], []), PENDING_RECOMMENDATIONS={}),
+            mock.patch.object(recommendations, "fetch_work_data",
+                              lambda title, author: {"subjects": ["Space opera", "Ecology"]}),
+            mock.patch.object(recommendations, "fetch_unread_books_by_author",
+                              lambda author, read_titles, limit: [_rec("Children of Dune", author)]),
+            mock.patch.object(recommendations, "fetch_books_by_subject", by_subject),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        graph_cache.clear()
+
+    def test_late_sources_are_merged_in_priority_order(self):
+        version = graph_cache.library_version()
+        html = views.render_book_graph("book::Dune::Frank Herbert", budget=0.2, version=version,
+                                       executor=self.executor)
+        self.assertIn("Children of Dune", html)
+        # Ecology is in, but it ranks after the pending Space opera lookup, so it waits.
+        self.assertNotIn("Silent Spring", html)
+        self.assertIsNone(graph_cache.get(("book::Dune::Frank Herbert", 0.5, False), version))
+        pending_url = json.loads(re.search(r"var pendingUrl = (.*);", html).group(1))
+        token = pending_url.rstrip("/").rsplit("/", 1)[1]
+
+        request = RequestFactory().get(pending_url, {"wait": "0"})
+        self.assertEqual(json.loads(views.book_graph_pending_view(request, token).content)["status"], "pending")
+
+        self.release.set()
+        request = RequestFactory().get(pending_url, {"wait": "5"})
+        update = json.loads(views.book_graph_pending_view(request, token).content)
+        self.assertEqual((update["status"], update["pending"]), ("done", []))
+        added = {node["id"] for node in update["nodes"]}
+        self.assertLessEqual({"rec::Hyperion::Someone", "rec::Foundation::Someone", "rec::Silent Spring::Someone"},
+                             added)
+
+        page = gzip.decompress(graph_cache.get(("book::Dune::Frank Herbert", 0.5, False), version)).decode()
+        # Foundation came back from both genres and stays with the higher-ranked one.
+        self.assertIn("Shares genre: Space opera", page)
+        self.assertEqual(page.count("Shares genre: Ecology"), 1)
+        self.assertNotIn(token, state.PENDING_RECOMMENDATIONS)
+
+    def test_bad_budget_and_wait_are_rejected(self):
+        request = RequestFactory().get("/api/graph/x/", {"budget": "soon"})
+        self.assertEqual(views.book_graph_view(request, "book::Dune::Frank Herbert").status_code, 400)
+        token = recommendations.remember_pending({"graph": mock.Mock(base=state.GRAPH)})
+        request = RequestFactory().get("/api/graph/pending/x/", {"wait": "nan"})
+        self.assertEqual(views.book_graph_pending_view(request, token).status_code, 400)
+
+
+@override_settings(PRECOMPUTE_RECOMMENDATIONS=True, PRECOMPUTE_TOP_N=2)
+class PrecomputeTests(SimpleTestCase):
+    def setUp(self):
+        self.books = [BookNode(id=f"b{rating}", title=f"b{rating}", author="A", rating=rating) for rating in (3, 5, 1, 4)]
+        self.rendered = []
+        self.version = ("builder", "index", (1, 1, 1))
+        patches = [
+            mock.patch.object(state, "BOOK_NODES", self.books),
+            mock.patch.object(graph_cache, "library_version", return_value=self.version),
+            mock.patch.object(state, "PRECOMPUTE_PROGRESS", {}),
+            mock.patch.object(views, "render_book_graph",
+                              side_effect=lambda book_id, **kwargs: self.rendered.append(book_id)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(graph_cache.clear)
+        graph_cache.clear()
+
+    def test_best_rated_books_only(self):
+        precompute.precompute_recommendations()
+        self.assertCountEqual(self.rendered, ["book::b5", "book::b4"])
+        self.assertEqual(state.PRECOMPUTE_PROGRESS,
+                         {"current": 2, "total": 2, "rendered": 0, "done": True, "stopped": None})
+
+    def test_waits_for_live_requests(self):
+        with precompute.live_request():
+            thread = threading.Thread(target=precompute.precompute_recommendations)
+            thread.start()
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(self.rendered, [])
+        thread.join(5)
+        self.assertEqual(len(self.rendered), 2)
+
+    def test_stops_once_the_library_changes(self):
+        versions = iter([self.version])
+        graph_cache.library_version.side_effect = lambda: next(versions, ("builder", "index", (2, 1, 1)))
+        precompute.precompute_recommendations()
+        self.assertEqual((self.rendered, state.PRECOMPUTE_PROGRESS["stopped"]), ([], "library changed"))
+
+    @override_settings(PRECOMPUTE_RECOMMENDATIONS=False)
+    def test_can_be_turned_off(self):
+        precompute.precompute_recommendations()
+        self.assertEqual((self.rendered, state.PRECOMPUTE_PROGRESS), ([], {}))
@@ -0,0 +1,269 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Defaults for the HTTP_* settings (see backend/settings.py).
+_DEFAULT_TIMEOUT = (3.05, 8)          # (connect, read) seconds
+_DEFAULT_POOL_SIZE = 10
+_DEFAULT_RETRIES = 2
+_DEFAULT_BACKOFF = 0.5
+
+_DEFAULT_RATE_LIMIT = (10.0, 10)     # (tokens per second, burst)
+_DEFAULT_RATE_LIMIT_WAIT = 5.0       # seconds a call may queue for a token
+_DEFAULT_BREAKER_FAILURES = 5
+_DEFAULT_BREAKER_RESET = 30.0        # seconds before an open breaker lets a probe through
+
+# Retried with exponential backoff; anything else is returned to the caller.
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_LOCK = threading.Lock()
+_ADAPTERS: dict = {}   # URL prefix → HTTPAdapter (one keep-alive pool set per host)
+_UPSTREAMS: dict = {}  # host → _Upstream
+_local = threading.local()
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Raised without touching the network when a host is shedding load.
+
+    Subclasses RequestException so existing error handling treats it as a
+    failed call, but callers that persist "nothing found" markers should
+    catch it first — the upstream was never asked.
+    """
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The host's circuit breaker is open."""
+
+
+class RateLimitedError(UpstreamUnavailable):
+    """No rate-limit token became available within HTTP_RATE_LIMIT_WAIT."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, sleeping up to max_wait seconds for it. Returns False on timeout."""
+        deadline = time.monotonic() + max_wait
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    delay = (1 - self._tokens) / self.rate
+                if now + delay > deadline:
+                    return False
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "tokens_available": round(self._tokens, 2),
+                "occupancy": round(1 - self._tokens / self.capacity, 2),
+                "waiting": self._waiting,
+            }
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open, calls are rejected immediately. After `reset_timeout` seconds
+    the breaker goes half-open and lets a single probe through: success
+    closes it, failure opens it again for another reset_timeout.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("circuit open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError("circuit half-open, probe in flight")
+                self._probe_in_flight = True
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot when the call never reached the host."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "rejected_calls": self.rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+
+class _Upstream:
+    def __init__(self, host: str):
+        rate, burst = getattr(settings, "HTTP_RATE_LIMITS", {}).get(
+            host, getattr(settings, "HTTP_RATE_LIMIT", _DEFAULT_RATE_LIMIT)
+        )
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(
+            getattr(settings, "HTTP_BREAKER_FAILURES", _DEFAULT_BREAKER_FAILURES),
+            getattr(settings, "HTTP_BREAKER_RESET", _DEFAULT_BREAKER_RESET),
+        )
+
+
+def _upstream(url: str) -> _Upstream:
+    host = urlsplit(url).hostname or ""
+    with _LOCK:
+        if host not in _UPSTREAMS:
+            _UPSTREAMS[host] = _Upstream(host)
+        return _UPSTREAMS[host]
+
+
+def diagnostics() -> dict:
+    """Breaker state and limiter occupancy for every host contacted so far."""
+    with _LOCK:
+        upstreams = dict(_UPSTREAMS)
+    return {
+        host: {"breaker": up.breaker.snapshot(), "limiter": up.limiter.snapshot()}
+        for host, up in sorted(upstreams.items())
+    }
+
+
+def _retry() -> Retry:
+    return Retry(
+        total=getattr(settings, "HTTP_RETRIES", _DEFAULT_RETRIES),
+        backoff_factor=getattr(settings, "HTTP_BACKOFF_FACTOR", _DEFAULT_BACKOFF),
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        # A long Retry-After would hold a worker for minutes; back off instead.
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+
+
+def _adapters() -> dict:
+    """Build the shared adapters on first use.
+
+    Each host in HTTP_POOL_SIZES gets its own adapter sized to that host;
+    every other URL shares the default adapter. Adapters (and so their
+    connection pools) are shared by all threads.
+    """
+    with _LOCK:
+        if not _ADAPTERS:
+            pool_sizes = getattr(settings, "HTTP_POOL_SIZES", {})
+            default_size = getattr(settings, "HTTP_POOL_SIZE", _DEFAULT_POOL_SIZE)
+            for host, size in pool_sizes.items():
+                _ADAPTERS[f"https://{host}"] = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=size, max_retries=_retry(),
+                )
+            _ADAPTERS["https://"] = HTTPAdapter(pool_maxsize=default_size, max_retries=_retry())
+            _ADAPTERS["http://"] = _ADAPTERS["https://"]
+        return _ADAPTERS
+
+
+def session() -> requests.Session:
+    """Return this thread's Session, mounted on the shared per-host adapters.
+
+    Sessions are per thread (cookies and headers are not shared), but the
+    keep-alive connection pools behind them are.
+    """
+    sess = getattr(_local, "session", None)
+    if sess is None:
+        sess = requests.Session()
+        for prefix, adapter in _adapters().items():
+            sess.mount(prefix, adapter)
+        _local.session = sess
+    return sess
+
+
+def get(url: str, params=None, headers=None, timeout=None) -> requests.Response:
+    """GET through the shared connection pools with retry and a uniform timeout.
+
+    Each host has a token-bucket rate limiter and a circuit breaker. A call
+    to a host whose breaker is open, or that cannot get a token within
+    HTTP_RATE_LIMIT_WAIT seconds, fails fast with UpstreamUnavailable so the
+    caller moves on to its fallback. Connection errors, timeouts and 429/5xx
+    responses (after retries) count as breaker failures.
+
+    Raises requests.RequestException on connection errors and timeouts, like
+    requests.get. Error statuses are returned (after retries for 429/5xx), so
+    callers keep using raise_for_status() / status_code checks.
+    """
+    upstream = _upstream(url)
+    upstream.breaker.before_call()
+    if not upstream.limiter.acquire(getattr(settings, "HTTP_RATE_LIMIT_WAIT", _DEFAULT_RATE_LIMIT_WAIT)):
+        upstream.breaker.release_probe()
+        raise RateLimitedError("rate limit wait exceeded")
+
+    timeout = timeout or getattr(settings, "HTTP_TIMEOUT", _DEFAULT_TIMEOUT)
+    try:
+        response = session().get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        upstream.breaker.record_failure()
+        raise
+
+    if response.status_code in _RETRY_STATUSES:
+        upstream.breaker.record_failure()
+    else:
+        upstream.breaker.record_success()
+    return response
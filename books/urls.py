@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path("upload_goodreads/", views.upload_goodreads),
     path("upload_progress/", views.upload_progress_view),
+    path("jobs/<str:job_id>/", views.upload_job_view),
+    path("jobs/<str:job_id>/result/", views.upload_job_result_view),
+    path("graph/pending/<str:token>/", views.book_graph_pending_view),
     path("graph/<str:book_id>/", views.book_graph_view),
     path("covers/", views.book_covers_view),
     path("universe_graph/", views.universe_graph_view),
@@ -12,4 +15,5 @@ urlpatterns = [
     path("book_details/<str:book_id>/", views.book_details_view),
     path("best_recommendation/", views.best_recommendation_view),
     path("filter_options/", views.filter_options_view),
+    path("diagnostics/upstreams/", views.upstream_diagnostics_view),
 ]
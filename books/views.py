@@ -1,29 +1,37 @@
-import datetime
-import re
-import threading
+import gzip
+import io
+import math
 
 import pandas as pd
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
+from books import corpus, graph_cache, precompute, singleflight, snapshots, transport
 from books.graph_engine import state
-from books.graph_engine.extract import extract_books_from_df
-from books.graph_engine.schemas import BookNode
+from books.graph_engine.diff import diff_library
+from books.graph_engine.extract import parse_books_from_df, parse_want_to_read_from_df
+from books.graph_engine.library_index import LibraryIndex
+from books.graph_engine.overlay import OverlayGraph
+from books.graph_engine.series import series_base
 from books.graph_engine.universe import detect_communities, render_universe_graph, render_cluster_graph
-from books.graph_engine.visualize_interactive import visualize_book_ego_graph_interactive
-from books.openlibrary.background import load_remaining_covers
-from books.openlibrary.client import (
-    fetch_books_by_award,
-    fetch_books_by_era,
-    fetch_books_by_subject,
-    fetch_unread_books_by_author,
-    fetch_work_data,
-    normalize_title,
+from books.graph_engine.visualize_interactive import (
+    ego_graph_elements,
+    ego_graph_update,
+    visualize_book_ego_graph_interactive,
 )
-from books.inventaire.client import (
-    fetch_books_by_subject as inventaire_fetch_by_subject,
-    fetch_books_by_author as inventaire_fetch_by_author,
+from books.jobs import current_job_running, finish_job, get_job, job_status, start_job
+from books.openlibrary.background import run_incremental_upload_job, run_upload_job
+from books.recommendations import (
+    MAX_PENDING_WAIT,
+    MAX_RECOMMENDATION_BUDGET,
+    RECOMMENDATION_DEADLINE,
+    fetch_sources,
+    forget_pending,
+    get_pending,
+    remember_pending,
 )
+from books.stats import compute_reading_stats
+from books.openlibrary.client import fetch_books_by_subject, normalize_title
 
 _AWARD_DISPLAY = {
     "hugo_award": "Hugo Award",
@@ -47,94 +55,21 @@ _SIMILARITY_SCORES = {
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
-def compute_cadence(date_series):
-    """Calculate average, median, fastest, and slowest days between books."""
-    dates = (
-        date_series.dropna()
-        .dt.date
-        .drop_duplicates()
-        .sort_values()
-        .tolist()
-    )
-    if len(dates) < 2:
-        return None
-    gaps = [(dates[i] - dates[i - 1]).days for i in range(1, len(dates))]
-    return {
-        "avg_days": round(sum(gaps) / len(gaps), 1),
-        "median_days": sorted(gaps)[len(gaps) // 2],
-        "fastest_days": min(gaps),
-        "slowest_days": max(gaps),
-        "first_finished": dates[0].isoformat(),
-        "last_finished": dates[-1].isoformat(),
-    }
-
-
-def compute_stats(subset):
-    """Calculate summary statistics (books, pages, rating, top author) for a dataframe subset."""
-    if subset.empty:
-        return {"total_books": 0, "total_pages": 0, "avg_rating": 0, "top_author": None}
-
-    avg_rating = 0
-    if "My Rating" in subset.columns:
-        rated = subset[subset["My Rating"] > 0]
-        if not rated.empty:
-            avg_rating = round(rated["My Rating"].mean(), 2)
-
-    total_pages = int(subset["Number of Pages"].fillna(0).sum())
-    top_author = subset["Author"].mode()[0] if "Author" in subset.columns else None
-
-    return {
-        "total_books": len(subset),
-        "total_pages": total_pages,
-        "avg_rating": avg_rating,
-        "top_author": top_author,
-    }
-
-
-def compute_book_lengths(subset):
-    """Calculate page stats: average pages, longest book, and histogram by page range."""
-    pages = subset["Number of Pages"].dropna()
-    if pages.empty:
-        return None
-
-    longest = subset.loc[pages.idxmax()]
-    bins = [
-        (0, 200, "0-200"),
-        (200, 300, "200-300"),
-        (300, 400, "300-400"),
-        (400, 500, "400-500"),
-        (500, float("inf"), "500+"),
-    ]
-    histogram = [
-        {"range": label, "count": int(pages[(pages >= low) & (pages < high)].count())}
-        for low, high, label in bins
-    ]
-    return {
-        "average_pages": int(pages.mean()),
-        "longest_book": {
-            "title": longest.get("Title"),
-            "author": longest.get("Author"),
-            "pages": int(longest.get("Number of Pages")),
-        },
-        "histogram": histogram,
-    }
-
-
 def _detect_series(title_a: str, title_b: str) -> bool:
     """Return True if two titles appear to belong to the same series.
 
     Checks two signals:
       1. Titles share 2+ leading words (e.g. "Harry Potter and…" / "Harry Potter: …")
       2. Stripping trailing series numbers/subtitles leaves identical base titles
-    """
-    def base(t: str) -> str:
-        t = re.sub(r'\s*[#(]\d+[)\s].*$', '', t)   # strip "#1", "(1)"
-        t = t.split(":")[0]                          # strip ": subtitle"
-        return t.lower().strip()
 
-    if len(base(title_a)) < 4:
+    To test a candidate against every read title at once, use
+    state.LIBRARY_INDEX.read.in_started_series (graph_engine/series.py),
+    which gives the same answer without the pairwise scan.
+    """
+    base_a = series_base(title_a)
+    if len(base_a) < 4:
         return False
-    if base(title_a) == base(title_b):
+    if base_a == series_base(title_b):
         return True
 
     words_a = title_a.lower().split()
@@ -147,8 +82,12 @@ def _detect_series(title_a: str, title_b: str) -> bool:
 
 @csrf_exempt
 def upload_goodreads(request):
-    """Process an uploaded Goodreads CSV and return reading statistics as JSON.
-    Also builds the global graph, computes communities, and starts cover loading.
+    """Parse an uploaded Goodreads CSV and return reading statistics as JSON.
+
+    Only the cheap work happens in the request: CSV parsing and statistics.
+    Metadata enrichment, graph building and community detection run as an
+    upload job; the response carries its `job_id` for upload_job_view /
+    upload_job_result_view.
     """
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=400)
@@ -157,107 +96,127 @@ def upload_goodreads(request):
     if not file:
         return JsonResponse({"error": "No file uploaded"}, status=400)
 
-    df = pd.read_csv(file)
+    raw = file.read()
+    snapshot_key = snapshots.fingerprint(raw)
+    snapshot = snapshots.load(snapshot_key)
+    if snapshot is not None:
+        return JsonResponse(_restore_snapshot(snapshot))
+
+    df = pd.read_csv(io.BytesIO(raw))
     read_df = df
     if "Exclusive Shelf" in df.columns:
         read_df = df[df["Exclusive Shelf"] == "read"]
 
-    state.UPLOAD_PROGRESS = {"phase": "parsing", "current": 0, "total": 0}
-    state.UNIVERSE_VERSION = 0
-    read_books = extract_books_from_df(read_df)
-    state.BOOK_NODES = read_books
+    read_books = parse_books_from_df(read_df)
+    wtr_books = parse_want_to_read_from_df(df)
+    reading_stats = compute_reading_stats(df)
 
-    # Extract to-read / currently-reading as lightweight BookNodes (metadata fetched in background)
-    wtr_books = []
-    if "Exclusive Shelf" in df.columns:
-        wtr_df = df[df["Exclusive Shelf"].isin(["to-read", "currently-reading"])]
-        for _, wtr_row in wtr_df.iterrows():
-            wt = wtr_row.get("Title")
-            wa = wtr_row.get("Author")
-            if not wt or not wa:
-                continue
-            raw_gid = wtr_row.get("Book Id")
-            try:
-                wgid = str(int(raw_gid)) if raw_gid and str(raw_gid) not in ("", "nan") else None
-            except (ValueError, TypeError):
-                wgid = None
-            wtr_books.append(BookNode(id=f"{wt}::{wa}", title=wt, author=wa, goodreads_id=wgid))
+    # A library with finished graphs is already loaded: patch it instead of starting over.
+    # The patch reuses its BookNodes and builder, so only once its job has finished
+    # enriching them; otherwise the new upload starts over and the old job stops.
+    if state.BOOK_NODES and state.GRAPH_BUILDER is not None and not current_job_running():
+        return JsonResponse(_start_incremental_upload(read_books, wtr_books, snapshot_key, reading_stats))
+
+    state.BOOK_NODES = read_books
     state.WANT_TO_READ_NODES = wtr_books
+    state.LIBRARY_INDEX = LibraryIndex(read_books, wtr_books)
+    state.GRAPH_BUILDER = None
+    state.GRAPH = None
+    state.GENRE_GRAPH = None
+    state.COMMUNITIES = None
+    state.UNIVERSE_VERSION = 0
+    state.UPLOAD_PROGRESS = {"phase": "parsing", "current": 0, "total": len(read_books)}
+    state.BACKGROUND_PROGRESS = {"current": 0, "total": 0, "done": False}
 
-    state.UPLOAD_PROGRESS["phase"] = "building"
-    from books.graph_engine.builder import build_author_graph, build_genre_graph
-    state.GRAPH = build_author_graph(read_books)
-    genre_graph = build_genre_graph(read_books)
-    state.COMMUNITIES = detect_communities(genre_graph)
-    state.UPLOAD_PROGRESS["phase"] = "done"
+    stats = {
+        **reading_stats,
+        "books": _book_list(read_books),
+        "job_id": start_job(run_upload_job, read_books, snapshot_key, reading_stats),
+    }
+    return JsonResponse(stats)
 
-    df["Date Read"] = pd.to_datetime(df.get("Date Read"), errors="coerce")
-    df["Year Read"] = df["Date Read"].dt.year
-    df["Month Read"] = df["Date Read"].dt.month
 
-    current_year = datetime.date.today().year
-    df_current_year = df[df["Year Read"] == current_year]
+def _start_incremental_upload(read_books, wtr_books, snapshot_key, reading_stats):
+    """Diff a re-upload against the loaded library and start an incremental upload job.
 
-    yearly_counts = df["Year Read"].dropna().value_counts().sort_index().to_dict()
-    monthly_counts = (
-        df_current_year["Month Read"].dropna().value_counts().sort_index().to_dict()
-        if not df_current_year.empty else {}
-    )
+    Unchanged books keep their enriched BookNodes; the job updates the live
+    graphs through state.GRAPH_BUILDER as the changed books are enriched.
+    """
+    previous_read = state.BOOK_NODES
+    previous_wtr = state.WANT_TO_READ_NODES
+    diff = diff_library(previous_read, read_books, donors=previous_wtr)
+    wtr_books = diff_library(previous_wtr, wtr_books, donors=previous_read).books
 
-    pub_counts_all, pub_counts_this_year = {}, {}
-    oldest_pub_year = None
-    if "Original Publication Year" in df.columns:
-        df["Original Publication Year"] = pd.to_numeric(
-            df["Original Publication Year"], errors="coerce"
-        )
-        years = df["Original Publication Year"].dropna()
-        if not years.empty:
-            oldest_pub_year = int(years.min())
-        pub_counts_all = years.astype(int).value_counts().sort_index().to_dict()
-        pub_counts_this_year = (
-            df_current_year["Original Publication Year"].dropna()
-            .astype(int).value_counts().sort_index().to_dict()
-            if not df_current_year.empty else {}
-        )
+    state.BOOK_NODES = diff.books
+    state.WANT_TO_READ_NODES = wtr_books
+    state.LIBRARY_INDEX = LibraryIndex(diff.books, wtr_books)
+    state.UPLOAD_PROGRESS = {"phase": "parsing", "current": 0, "total": 0}
+    state.BACKGROUND_PROGRESS = {"current": 0, "total": 0, "done": False}
 
-    scatter_points_all = [
-        {"pub_year": int(row["Original Publication Year"]), "read_value": int(row["Year Read"])}
-        for _, row in df[["Original Publication Year", "Year Read"]].dropna().iterrows()
-    ]
-    scatter_points_this_year = [
-        {"pub_year": int(row["Original Publication Year"]), "read_value": int(row["Month Read"])}
-        for _, row in df_current_year[["Original Publication Year", "Month Read"]].dropna().iterrows()
+    job_id = start_job(run_incremental_upload_job, diff, wtr_books, snapshot_key, reading_stats)
+    return {
+        **reading_stats,
+        "books": _book_list(diff.books),
+        "job_id": job_id,
+        "changes": diff.summary(),
+    }
+
+
+def _book_list(books):
+    return [
+        {"id": book.id, "title": book.title, "author": book.author, "cover_url": book.cover_url}
+        for book in books
     ]
 
-    stats = {
-        "overall": {**compute_stats(read_df), "cadence": compute_cadence(df["Date Read"])},
-        "this_year": {
-            **compute_stats(df_current_year),
-            "cadence": compute_cadence(df_current_year["Date Read"]),
-        },
-        "yearly_books": yearly_counts,
-        "monthly_books": monthly_counts,
-        "publication_years_overall": pub_counts_all,
-        "publication_years_this_year": pub_counts_this_year,
-        "scatter_publication_vs_read_all": scatter_points_all,
-        "scatter_publication_vs_read_year": scatter_points_this_year,
-        "book_lengths": {
-            "overall": compute_book_lengths(read_df),
-            "this_year": compute_book_lengths(
-                df_current_year[df_current_year["Exclusive Shelf"] == "read"]
-                if "Exclusive Shelf" in df_current_year.columns
-                else df_current_year
-            ),
-        },
-        "oldest_pub_year": oldest_pub_year,
-        "books": [
-            {"id": book.id, "title": book.title, "author": book.author, "cover_url": book.cover_url}
-            for book in read_books
-        ],
-    }
 
-    threading.Thread(target=load_remaining_covers, daemon=True).start()
-    return JsonResponse(stats)
+def _restore_snapshot(snapshot):
+    """Publish a stored upload into state and build the upload response for it.
+
+    The snapshot was taken after background enrichment finished, so the
+    graph and clusters are final: the returned job is already done and its
+    result (books with covers) is available immediately.
+    """
+    books = snapshot["book_nodes"]
+    state.BOOK_NODES = books
+    state.WANT_TO_READ_NODES = snapshot["want_to_read_nodes"]
+    state.LIBRARY_INDEX = LibraryIndex(books, state.WANT_TO_READ_NODES)
+    builder = snapshot["graph_builder"]
+    builder.lock = state.GRAPH_LOCK
+    state.GRAPH_BUILDER = builder
+    state.GRAPH = builder.author_graph
+    state.GENRE_GRAPH = builder.genre_graph
+    state.COMMUNITIES = snapshot["communities"]
+    state.UNIVERSE_VERSION = 1
+    state.UPLOAD_PROGRESS = {"phase": "done", "current": len(books), "total": len(books)}
+    state.BACKGROUND_PROGRESS = {"current": len(books), "total": len(books), "done": True}
+    precompute.start_precompute()
+
+    job_id = finish_job({
+        "books": _book_list(books),
+        "cluster_count": len(snapshot["communities"] or []),
+        "universe_version": state.UNIVERSE_VERSION,
+    })
+    return {**snapshot["stats"], "books": _book_list(books), "job_id": job_id, "restored": True}
+
+
+def upload_job_view(request, job_id):
+    """Return the status and phase of an upload job."""
+    job = get_job(job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    return JsonResponse(job_status(job))
+
+
+def upload_job_result_view(request, job_id):
+    """Return an upload job's result (books with covers, cluster count) once the graph is built."""
+    job = get_job(job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    if job["status"] == "failed":
+        return JsonResponse({"error": job["error"]}, status=500)
+    if job["result"] is None:
+        return JsonResponse({"status": job["status"], "phase": job["phase"]}, status=202)
+    return JsonResponse(job["result"])
 
 
 def upload_progress_view(request):
@@ -290,7 +249,9 @@ def universe_graph_view(request):
     clusters = state.COMMUNITIES
     if not clusters or len(clusters) < 2:
         # Try computing on demand (e.g. if state was reset)
-        clusters = detect_communities(state.GRAPH)
+        with state.GRAPH_LOCK:
+            graph = state.GENRE_GRAPH if state.GENRE_GRAPH is not None else state.GRAPH
+            clusters = detect_communities(graph)
 
     if not clusters or len(clusters) < 2:
         return HttpResponse("""
@@ -309,7 +270,9 @@ def universe_graph_view(request):
         </body></html>
         """)
 
-    return HttpResponse(render_universe_graph(clusters, state.GRAPH))
+    with state.GRAPH_LOCK:
+        html = render_universe_graph(clusters, state.GRAPH)
+    return HttpResponse(html)
 
 
 def cluster_graph_view(request):
@@ -332,7 +295,8 @@ def cluster_graph_view(request):
         return HttpResponse("No book nodes provided", status=400)
 
     cover_map = {f"book::{b.id}": b.cover_url for b in state.BOOK_NODES if b.cover_url}
-    html = render_cluster_graph(book_nodes, state.GRAPH, cover_map=cover_map)
+    with state.GRAPH_LOCK:
+        html = render_cluster_graph(book_nodes, state.GRAPH, cover_map=cover_map)
     return HttpResponse(html)
 
 
@@ -343,39 +307,19 @@ def full_network_view(request):
 
     from books.graph_engine.full_network import render_full_network
     cover_map = {f"book::{b.id}": b.cover_url for b in state.BOOK_NODES if b.cover_url}
-    html = render_full_network(state.GRAPH, communities=state.COMMUNITIES, cover_map=cover_map)
+    with state.GRAPH_LOCK:
+        html = render_full_network(state.GRAPH, communities=state.COMMUNITIES, cover_map=cover_map)
     return HttpResponse(html)
 
 
-def book_graph_view(request, book_id):
-    """Generate an interactive ego-graph around the selected book with recommendations.
-
-    Adds four types of recommendations (author, genre, award, era) and
-    annotates each with a similarity_score so the frontend panel can explain it.
-
-    Accepts optional filter query params: genres, authors, year_min, year_max.
-    Returns a PyVis HTML visualization.
-    """
-    if state.GRAPH is None:
-        return HttpResponse("Graph not built yet", status=400)
-
-    graph = state.GRAPH.copy()
-
+def _scan_genre_index(graph):
+    """Build read_titles and genre_scores by walking the whole graph."""
     read_titles = {
         normalize_title(data["title"]).lower()
         for _, data in graph.nodes(data=True)
         if data.get("type") == "book" and not data.get("unread")
     }
 
-    author = graph.nodes.get(book_id, {}).get("author")
-    if not author:
-        return HttpResponse("Author not found", status=400)
-
-    min_similarity = float(request.GET.get("min_similarity", 0.5))
-    hide_started_series = request.GET.get("hide_started_series", "false").lower() == "true"
-    all_read_titles = [b.title for b in state.BOOK_NODES]
-
-    # Score genres by sum of ratings of their connected read books
     genre_scores: dict = {}
     for node, data in graph.nodes(data=True):
         if data.get("type") != "subject":
@@ -385,63 +329,60 @@ def book_graph_view(request, book_id):
             nb_data = graph.nodes.get(neighbor, {})
             if nb_data.get("type") == "book" and not nb_data.get("unread"):
                 genre_scores[genre_name] = genre_scores.get(genre_name, 0) + (nb_data.get("rating") or 3)
+    return read_titles, genre_scores
+
+
+# ── Ego-graph recommendation steps ───────────────────────────────────────────
+# Each step adds one source's recommendations to a request's OverlayGraph.
+# `rec` is the request's merge state (see book_graph_view); steps share its
+# already_added set, so earlier steps win when two sources suggest a title.
+
+def _add_want_to_read_author_recs(rec, key, books):
+    """Want-to-read: author matches (from user's own Goodreads to-read list)."""
+    graph, book_id, author = rec["graph"], rec["book_id"], rec["author"]
+    ranked_genres = rec["sources"].ranked_genres
+    index = rec["index"]
+    if _SIMILARITY_SCORES["author"] < rec["min_similarity"]:
+        return
+    for wtr in index.want_to_read.by_author(author):
+        norm = normalize_title(wtr.title).lower()
+        if norm in rec["read_titles"] or norm in rec["already_added"]:
+            continue
+        if rec["hide_started_series"] and index.read.in_started_series(wtr.title):
+            continue
+        unread_node = f"rec::{wtr.title}::{wtr.author}"
+        if not graph.has_node(unread_node):
+            signals = [{"label": "Author", "value": author}, {"label": "Source", "value": "Your to-read list"}]
+            if ranked_genres:
+                signals.append({"label": "Genres", "value": ", ".join(ranked_genres[:2])})
+            graph.add_node(
+                unread_node,
+                type="book",
+                title=wtr.title,
+                author=wtr.author,
+                unread=True,
+                cover_url=wtr.cover_url or "",
+                reason=f"Same author as {author}",
+                signals=signals,
+                similarity_score=_SIMILARITY_SCORES["author"],
+            )
+        graph.add_edge(book_id, unread_node, type="recommendation", weight=0.6)
+        author_node = f"author::{author}"
+        if not graph.has_node(author_node):
+            graph.add_node(author_node, type="author", name=author)
+        graph.add_edge(unread_node, author_node, weight=0.4)
+        rec["already_added"].add(norm)
 
-    # Fetch OL metadata for the selected book
-    book_title = graph.nodes.get(book_id, {}).get("title", "")
-    book_genres, book_award_slugs, book_first_publish_year = [], [], None
-    if book_title:
-        ol_data = fetch_work_data(book_title, author)
-        if ol_data:
-            book_genres = ol_data.get("subjects", [])
-            book_award_slugs = ol_data.get("award_slugs", [])
-            book_first_publish_year = ol_data.get("first_publish_year")
-
-    ranked_genres = sorted(book_genres, key=lambda g: genre_scores.get(g, 0), reverse=True)[:3]
-
-    already_added: set = set()
 
-    # --- Want-to-read: author matches (from user's own Goodreads to-read list) ---
-    if _SIMILARITY_SCORES["author"] >= min_similarity:
-        for wtr in state.WANT_TO_READ_NODES:
-            if wtr.author.lower() != author.lower():
-                continue
-            norm = normalize_title(wtr.title).lower()
-            if norm in read_titles or norm in already_added:
-                continue
-            if hide_started_series and any(_detect_series(rt, wtr.title) for rt in all_read_titles):
-                continue
-            unread_node = f"rec::{wtr.title}::{wtr.author}"
-            if not graph.has_node(unread_node):
-                signals = [{"label": "Author", "value": author}, {"label": "Source", "value": "Your to-read list"}]
-                if ranked_genres:
-                    signals.append({"label": "Genres", "value": ", ".join(ranked_genres[:2])})
-                graph.add_node(
-                    unread_node,
-                    type="book",
-                    title=wtr.title,
-                    author=wtr.author,
-                    unread=True,
-                    cover_url=wtr.cover_url or "",
-                    reason=f"Same author as {author}",
-                    signals=signals,
-                    similarity_score=_SIMILARITY_SCORES["author"],
-                )
-            graph.add_edge(book_id, unread_node, type="recommendation", weight=0.6)
-            author_node = f"author::{author}"
-            if not graph.has_node(author_node):
-                graph.add_node(author_node, type="author", name=author)
-            graph.add_edge(unread_node, author_node, weight=0.4)
-            already_added.add(norm)
-
-    # --- Author-based recommendations (API fallback) ---
-    unread_books = fetch_unread_books_by_author(author=author, read_titles=read_titles, limit=8)
-    if not unread_books:
-        unread_books = inventaire_fetch_by_author(author=author, read_titles=read_titles, limit=8)
-
-    for book in unread_books:
-        if _SIMILARITY_SCORES["author"] < min_similarity:
+def _add_author_recs(rec, key, books):
+    """Author-based recommendations (API fallback)."""
+    graph, book_id, author, book_title = rec["graph"], rec["book_id"], rec["author"], rec["book_title"]
+    ranked_genres = rec["sources"].ranked_genres
+    index = rec["index"]
+    for book in books:
+        if _SIMILARITY_SCORES["author"] < rec["min_similarity"]:
             break
-        if hide_started_series and any(_detect_series(rt, book["title"]) for rt in all_read_titles):
+        if rec["hide_started_series"] and index.read.in_started_series(book["title"]):
             continue
         unread_node = f"rec::{book['title']}::{book['author']}"
         if not graph.has_node(unread_node):
@@ -467,187 +408,419 @@ def book_graph_view(request, book_id):
             graph.add_node(author_node, type="author", name=author)
         graph.add_edge(unread_node, author_node, weight=0.4)
 
-    already_added |= {normalize_title(b["title"]).lower() for b in unread_books}
+    rec["already_added"] |= {normalize_title(b["title"]).lower() for b in books}
 
-    # --- Want-to-read: genre matches (only once background has enriched subjects) ---
-    if _SIMILARITY_SCORES["genre"] >= min_similarity:
-        for wtr in state.WANT_TO_READ_NODES:
-            norm = normalize_title(wtr.title).lower()
-            if norm in read_titles or norm in already_added or not wtr.subjects:
-                continue
-            shared = [g for g in ranked_genres if g in wtr.subjects]
-            if not shared:
-                continue
-            if hide_started_series and any(_detect_series(rt, wtr.title) for rt in all_read_titles):
-                continue
-            match_genre = shared[0]
-            genre_node = f"subject::{match_genre}"
-            if not graph.has_node(genre_node):
-                graph.add_node(genre_node, type="subject", name=match_genre)
-            if not graph.has_edge(book_id, genre_node):
-                graph.add_edge(book_id, genre_node, weight=0.8)
-            unread_node = f"rec::{wtr.title}::{wtr.author}"
-            if not graph.has_node(unread_node):
-                graph.add_node(
-                    unread_node,
-                    type="book",
-                    title=wtr.title,
-                    author=wtr.author,
-                    unread=True,
-                    cover_url=wtr.cover_url or "",
-                    reason=f"Shares genre: {match_genre}",
-                    signals=[
-                        {"label": "Genre", "value": match_genre},
-                        {"label": "Source", "value": "Your to-read list"},
-                    ],
-                    similarity_score=_SIMILARITY_SCORES["genre"],
-                )
-                graph.add_edge(unread_node, genre_node, type="recommendation", weight=0.5)
-            already_added.add(norm)
-
-    # --- Genre-based recommendations ---
-    for genre in ranked_genres:
-        if _SIMILARITY_SCORES["genre"] < min_similarity:
-            break
-        genre_node = f"subject::{genre}"
+
+def _add_want_to_read_genre_recs(rec, key, books):
+    """Want-to-read: genre matches (only once background has enriched subjects)."""
+    graph, book_id = rec["graph"], rec["book_id"]
+    ranked_genres = rec["sources"].ranked_genres
+    index = rec["index"]
+    if _SIMILARITY_SCORES["genre"] < rec["min_similarity"]:
+        return
+    for wtr in index.want_to_read.with_any_subject(ranked_genres):
+        norm = normalize_title(wtr.title).lower()
+        if norm in rec["read_titles"] or norm in rec["already_added"] or not wtr.subjects:
+            continue
+        shared = [g for g in ranked_genres if g in wtr.subjects]
+        if not shared:
+            continue
+        if rec["hide_started_series"] and index.read.in_started_series(wtr.title):
+            continue
+        match_genre = shared[0]
+        genre_node = f"subject::{match_genre}"
         if not graph.has_node(genre_node):
-            graph.add_node(genre_node, type="subject", name=genre)
+            graph.add_node(genre_node, type="subject", name=match_genre)
         if not graph.has_edge(book_id, genre_node):
             graph.add_edge(book_id, genre_node, weight=0.8)
-
-        genre_books = fetch_books_by_subject(genre, limit=5) or inventaire_fetch_by_subject(genre, limit=5)
-        for book in genre_books:
-            norm = normalize_title(book["title"]).lower()
-            if norm in read_titles or norm in already_added:
-                continue
-            if hide_started_series and any(_detect_series(rt, book["title"]) for rt in all_read_titles):
-                continue
-            unread_node = f"rec::{book['title']}::{book['author']}"
-            if not graph.has_node(unread_node):
-                graph.add_node(
-                    unread_node,
-                    type="book",
-                    title=book["title"],
-                    author=book.get("author", ""),
-                    unread=True,
-                    cover_url=book["cover_url"],
-                    reason=f"Shares genre: {genre}",
-                    signals=[{"label": "Genre", "value": genre}],
-                    similarity_score=_SIMILARITY_SCORES["genre"],
-                )
+        unread_node = f"rec::{wtr.title}::{wtr.author}"
+        if not graph.has_node(unread_node):
+            graph.add_node(
+                unread_node,
+                type="book",
+                title=wtr.title,
+                author=wtr.author,
+                unread=True,
+                cover_url=wtr.cover_url or "",
+                reason=f"Shares genre: {match_genre}",
+                signals=[
+                    {"label": "Genre", "value": match_genre},
+                    {"label": "Source", "value": "Your to-read list"},
+                ],
+                similarity_score=_SIMILARITY_SCORES["genre"],
+            )
             graph.add_edge(unread_node, genre_node, type="recommendation", weight=0.5)
-            already_added.add(norm)
-
-    # --- Award-based recommendations ---
-    if _SIMILARITY_SCORES["award"] >= min_similarity:
-        for slug in book_award_slugs[:2]:
-            award_name = _AWARD_DISPLAY.get(slug) or slug.replace("_", " ").title()
-            award_node = f"award::{slug}"
-            if not graph.has_node(award_node):
-                graph.add_node(award_node, type="award", name=award_name)
-            if not graph.has_edge(book_id, award_node):
-                graph.add_edge(book_id, award_node, weight=0.7)
-
-            for book in fetch_books_by_award(slug, limit=5):
-                norm = normalize_title(book["title"]).lower()
-                if norm in read_titles or norm in already_added:
-                    continue
-                if hide_started_series and any(_detect_series(rt, book["title"]) for rt in all_read_titles):
-                    continue
-                unread_node = f"rec::{book['title']}::{book['author']}"
-                if not graph.has_node(unread_node):
-                    graph.add_node(
-                        unread_node,
-                        type="book",
-                        title=book["title"],
-                        author=book.get("author", ""),
-                        unread=True,
-                        cover_url=book["cover_url"],
-                        reason=f"Also won the {award_name}",
-                        signals=[{"label": "Award", "value": award_name}],
-                        similarity_score=_SIMILARITY_SCORES["award"],
-                    )
-                graph.add_edge(unread_node, award_node, type="recommendation", weight=0.7)
-                already_added.add(norm)
-
-    # --- Era-based recommendations ---
-    if book_first_publish_year and _SIMILARITY_SCORES["era"] >= min_similarity:
-        decade_start = (book_first_publish_year // 10) * 10
-        decade_label = f"{decade_start}s"
-        era_node = f"era::{decade_start}"
-        if not graph.has_node(era_node):
-            graph.add_node(era_node, type="era", name=decade_label)
-        if not graph.has_edge(book_id, era_node):
-            graph.add_edge(book_id, era_node, weight=0.6)
-
-        primary_genre = ranked_genres[0] if ranked_genres else None
-        for book in fetch_books_by_era(decade_start, primary_genre, limit=5):
-            norm = normalize_title(book["title"]).lower()
-            if norm in read_titles or norm in already_added:
-                continue
-            if hide_started_series and any(_detect_series(rt, book["title"]) for rt in all_read_titles):
-                continue
-            unread_node = f"rec::{book['title']}::{book['author']}"
-            if not graph.has_node(unread_node):
-                graph.add_node(
-                    unread_node,
-                    type="book",
-                    title=book["title"],
-                    author=book.get("author", ""),
-                    unread=True,
-                    cover_url=book["cover_url"],
-                    reason=f"Popular from the {decade_label}",
-                    signals=[{"label": "Era", "value": decade_label}],
-                    similarity_score=_SIMILARITY_SCORES["era"],
-                )
-            graph.add_edge(unread_node, era_node, type="recommendation", weight=0.5)
-            already_added.add(norm)
-
-    html = visualize_book_ego_graph_interactive(graph, book_id)
+        rec["already_added"].add(norm)
+
+
+def _add_genre_recs(rec, genre, books):
+    """Genre-based recommendations for one of the book's top genres."""
+    graph, book_id = rec["graph"], rec["book_id"]
+    genre_node = f"subject::{genre}"
+    if not graph.has_node(genre_node):
+        graph.add_node(genre_node, type="subject", name=genre)
+    if not graph.has_edge(book_id, genre_node):
+        graph.add_edge(book_id, genre_node, weight=0.8)
+
+    for book in books:
+        norm = normalize_title(book["title"]).lower()
+        if norm in rec["read_titles"] or norm in rec["already_added"]:
+            continue
+        if rec["hide_started_series"] and rec["index"].read.in_started_series(book["title"]):
+            continue
+        unread_node = f"rec::{book['title']}::{book['author']}"
+        if not graph.has_node(unread_node):
+            graph.add_node(
+                unread_node,
+                type="book",
+                title=book["title"],
+                author=book.get("author", ""),
+                unread=True,
+                cover_url=book["cover_url"],
+                reason=f"Shares genre: {genre}",
+                signals=[{"label": "Genre", "value": genre}],
+                similarity_score=_SIMILARITY_SCORES["genre"],
+            )
+        graph.add_edge(unread_node, genre_node, type="recommendation", weight=0.5)
+        rec["already_added"].add(norm)
+
+
+def _add_award_recs(rec, slug, books):
+    """Award-based recommendations for one of the book's awards."""
+    graph, book_id = rec["graph"], rec["book_id"]
+    award_name = _AWARD_DISPLAY.get(slug) or slug.replace("_", " ").title()
+    award_node = f"award::{slug}"
+    if not graph.has_node(award_node):
+        graph.add_node(award_node, type="award", name=award_name)
+    if not graph.has_edge(book_id, award_node):
+        graph.add_edge(book_id, award_node, weight=0.7)
+
+    for book in books:
+        norm = normalize_title(book["title"]).lower()
+        if norm in rec["read_titles"] or norm in rec["already_added"]:
+            continue
+        if rec["hide_started_series"] and rec["index"].read.in_started_series(book["title"]):
+            continue
+        unread_node = f"rec::{book['title']}::{book['author']}"
+        if not graph.has_node(unread_node):
+            graph.add_node(
+                unread_node,
+                type="book",
+                title=book["title"],
+                author=book.get("author", ""),
+                unread=True,
+                cover_url=book["cover_url"],
+                reason=f"Also won the {award_name}",
+                signals=[{"label": "Award", "value": award_name}],
+                similarity_score=_SIMILARITY_SCORES["award"],
+            )
+        graph.add_edge(unread_node, award_node, type="recommendation", weight=0.7)
+        rec["already_added"].add(norm)
+
+
+def _add_era_recs(rec, key, books):
+    """Era-based recommendations from the book's publication decade."""
+    graph, book_id = rec["graph"], rec["book_id"]
+    decade_start = (rec["sources"].first_publish_year // 10) * 10
+    decade_label = f"{decade_start}s"
+    era_node = f"era::{decade_start}"
+    if not graph.has_node(era_node):
+        graph.add_node(era_node, type="era", name=decade_label)
+    if not graph.has_edge(book_id, era_node):
+        graph.add_edge(book_id, era_node, weight=0.6)
+
+    for book in books:
+        norm = normalize_title(book["title"]).lower()
+        if norm in rec["read_titles"] or norm in rec["already_added"]:
+            continue
+        if rec["hide_started_series"] and rec["index"].read.in_started_series(book["title"]):
+            continue
+        unread_node = f"rec::{book['title']}::{book['author']}"
+        if not graph.has_node(unread_node):
+            graph.add_node(
+                unread_node,
+                type="book",
+                title=book["title"],
+                author=book.get("author", ""),
+                unread=True,
+                cover_url=book["cover_url"],
+                reason=f"Popular from the {decade_label}",
+                signals=[{"label": "Era", "value": decade_label}],
+                similarity_score=_SIMILARITY_SCORES["era"],
+            )
+        graph.add_edge(unread_node, era_node, type="recommendation", weight=0.5)
+        rec["already_added"].add(norm)
+
+
+_RECOMMENDATION_STEPS = {
+    "wtr_author": _add_want_to_read_author_recs,
+    "author": _add_author_recs,
+    "wtr_genre": _add_want_to_read_genre_recs,
+    "genre": _add_genre_recs,
+    "award": _add_award_recs,
+    "era": _add_era_recs,
+}
+
+
+def _recommendation_step_names(rec) -> list:
+    """Step names in merge order; "<kind>::<key>" steps consume the source of the same name."""
+    sources, kinds = rec["sources"], rec["kinds"]
+    names = ["wtr_author", "author"]
+    if not sources.has_work_data:
+        return names
+    names.append("wtr_genre")
+    if "genre" in kinds:
+        names += [f"genre::{genre}" for genre in sources.ranked_genres]
+    if "award" in kinds:
+        names += [f"award::{slug}" for slug in sources.award_slugs[:2]]
+    if "era" in kinds and sources.first_publish_year:
+        names.append("era")
+    return names
+
+
+def _merge_recommendations(rec) -> None:
+    """Run the steps that have not run yet, in merge order, up to the first pending source.
+
+    Merging stops at the first step whose source is still pending (or at
+    the end of the author steps while the work data is); a later call (from
+    the follow-up endpoint) resumes there once it is in. Steps therefore
+    always run in merge order, so earlier steps win duplicates exactly as
+    with the sequential lookups, however late a source arrives.
+    """
+    sources = rec["sources"]
+    for name in _recommendation_step_names(rec):
+        if name in rec["merged"]:
+            continue
+        kind, _, key = name.partition("::")
+        if not kind.startswith("wtr_") and not sources.ready(name):
+            break
+        _RECOMMENDATION_STEPS[kind](rec, key, sources.books(name))
+        rec["merged"].add(name)
+
+
+def _seconds_param(request, name, default, maximum):
+    """A ?name= duration in seconds clamped to [0, maximum], or None if it isn't a number."""
+    try:
+        seconds = float(request.GET.get(name, default))
+    except ValueError:
+        return None
+    if not math.isfinite(seconds):
+        return None
+    return min(max(seconds, 0.0), maximum)
+
+
+def _gzipped_page_response(request, page: bytes) -> HttpResponse:
+    """Send a gzip-compressed HTML page as-is, or decompressed to clients that don't accept gzip."""
+    if "gzip" not in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        return HttpResponse(gzip.decompress(page))
+    response = HttpResponse(page)
+    response["Content-Encoding"] = "gzip"
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def render_book_graph(book_id, min_similarity=0.5, hide_started_series=False,
+                      budget=RECOMMENDATION_DEADLINE, version=None, executor=None, follow_up=True):
+    """Compute the recommendations for book_id and render its ego graph as HTML.
+
+    Returns None if the book is not in the graph. Complete pages are stored
+    in graph_cache under `version` (taken by the caller before anything was
+    read, see graph_cache.library_version). Sources that miss `budget` are
+    left pending: with follow_up the page long-polls book_graph_pending_view
+    for them, otherwise they are simply left out and the page is not cached.
+    `executor` runs the upstream lookups (default: the live request pool).
+    """
+    # Recommendations are layered over the shared library graph rather than
+    # added to a copy of it; state.GRAPH itself is never modified here.
+    base = state.GRAPH
+    graph = OverlayGraph(base)
+
+    # Read titles and genre scores (sum of ratings of the read books linked to
+    # each subject) are kept up to date by the graph builder as books are
+    # enriched; only a graph without one is scanned here.
+    builder = state.GRAPH_BUILDER
+    with state.GRAPH_LOCK:
+        if builder is not None and builder.author_graph is base:
+            read_titles, genre_scores = builder.read_titles, builder.genre_scores
+        else:
+            read_titles, genre_scores = _scan_genre_index(base)
+
+        author = base.nodes.get(book_id, {}).get("author")
+        book_title = base.nodes.get(book_id, {}).get("title", "")
+    if not author:
+        return None
+
+    # All upstream lookups run concurrently; whatever has arrived within the
+    # budget is merged below in a fixed order (author, genre, award, era).
+    kinds = {kind for kind, score in _SIMILARITY_SCORES.items() if score >= min_similarity}
+    sources = fetch_sources(book_title, author, read_titles, genre_scores, kinds, deadline=budget, executor=executor)
+    cache_key = (book_id, min_similarity, hide_started_series)
+    rec = {
+        "graph": graph,
+        "book_id": book_id,
+        "author": author,
+        "book_title": book_title,
+        "read_titles": read_titles,
+        "index": state.LIBRARY_INDEX,
+        "hide_started_series": hide_started_series,
+        "min_similarity": min_similarity,
+        "kinds": kinds,
+        "sources": sources,
+        "already_added": set(),
+        "merged": set(),
+        "cache": (cache_key, version),
+    }
+    _merge_recommendations(rec)
+
+    # Sources still pending are merged by book_graph_pending_view, which the
+    # rendered page long-polls until they are all in.
+    pending = bool(sources.pending)
+    pending_url = None
+    with state.GRAPH_LOCK:
+        if pending and follow_up:
+            rec["rendered_nodes"], rec["rendered_edges"] = ego_graph_elements(graph, book_id)
+            pending_url = f"/api/graph/pending/{remember_pending(rec)}/"
+        html = visualize_book_ego_graph_interactive(graph, book_id, pending_url=pending_url)
+    # A page with pending sources is cached once its follow-ups complete it.
+    if not pending:
+        graph_cache.put(cache_key, version, html)
+    return html
+
+
+def book_graph_view(request, book_id):
+    """Generate an interactive ego-graph around the selected book with recommendations.
+
+    Adds four types of recommendations (author, genre, award, era) and
+    annotates each with a similarity_score so the frontend panel can explain it.
+
+    Accepts optional filter query params: genres, authors, year_min, year_max.
+    ?budget= caps, in seconds, how long the upstream lookups are waited for
+    (default RECOMMENDATION_DEADLINE); sources that miss it are rendered as
+    pending and filled in through book_graph_pending_view; a non-numeric
+    value returns 400.
+    Returns a PyVis HTML visualization.
+    """
+    if state.GRAPH is None:
+        return HttpResponse("Graph not built yet", status=400)
+
+    min_similarity = float(request.GET.get("min_similarity", 0.5))
+    hide_started_series = request.GET.get("hide_started_series", "false").lower() == "true"
+    budget = _seconds_param(request, "budget", RECOMMENDATION_DEADLINE, MAX_RECOMMENDATION_BUDGET)
+    if budget is None:
+        return HttpResponse("budget must be a number of seconds", status=400)
+
+    # Precomputation (books/precompute.py) pauses while any of these run.
+    with precompute.live_request():
+        # Taken first, so a page computed while the library changes is cached
+        # under the version it started from (see graph_cache.library_version).
+        version = graph_cache.library_version()
+
+        # Repeat clicks are served from the rendered-page cache until the
+        # library or either shelf's enrichment changes.
+        page = graph_cache.get((book_id, min_similarity, hide_started_series), version)
+        if page is not None:
+            return _gzipped_page_response(request, page)
+
+        html = render_book_graph(book_id, min_similarity, hide_started_series, budget, version)
+    if html is None:
+        return HttpResponse("Author not found", status=400)
     return HttpResponse(html)
 
 
+def book_graph_pending_view(request, token):
+    """Return the ego-graph nodes and edges added by recommendation sources that arrived late.
+
+    Waits up to ?wait= seconds (default 0, at most MAX_PENDING_WAIT)
+    for the request's pending sources, merges the ones that are in, and
+    returns only elements the page does not have yet, in vis.js form:
+    {"status": "pending" | "done", "pending": [...], "nodes", "edges",
+    "click", "hover", "cover"}. Unknown or expired tokens return 404, a
+    non-numeric ?wait= returns 400.
+    """
+    rec = get_pending(token)
+    if rec is None:
+        return JsonResponse({"error": "No pending recommendations"}, status=404)
+    if rec["graph"].base is not state.GRAPH:
+        forget_pending(token)
+        return JsonResponse({"error": "Library graph was replaced"}, status=409)
+
+    wait = _seconds_param(request, "wait", 0, MAX_PENDING_WAIT)
+    if wait is None:
+        return JsonResponse({"error": "wait must be a number of seconds"}, status=400)
+    rec["sources"].wait(wait)
+    with rec["lock"]:
+        _merge_recommendations(rec)
+        pending = rec["sources"].pending
+        with state.GRAPH_LOCK:
+            update = ego_graph_update(rec["graph"], rec["book_id"], rec["rendered_nodes"], rec["rendered_edges"])
+    if not pending:
+        forget_pending(token)
+        with state.GRAPH_LOCK:
+            html = visualize_book_ego_graph_interactive(rec["graph"], rec["book_id"])
+        graph_cache.put(*rec["cache"], html)
+    return JsonResponse({"status": "pending" if pending else "done", "pending": pending, **update})
+
+
 def book_details_view(request, book_id):
-    """Return detailed book info and similar books for the sidebar detail panel."""
-    book = next((b for b in state.BOOK_NODES if b.id == book_id), None)
+    """Return detailed book info and similar books for the sidebar detail panel.
+
+    Answered from the loaded library only. The description is null until
+    background enrichment has fetched it (ISBN-enriched books).
+    """
+    index = state.LIBRARY_INDEX
+    book = index.read.get(book_id) if index is not None else None
     if not book:
         return JsonResponse({"error": "Book not found"}, status=404)
 
     similar = []
     seen_ids = {book.id}
+    read = index.read
+
+    # Both passes walk the shelf in order and, like the original scans over
+    # BOOK_NODES, stop at the first book already picked (the selected book
+    # included), so only books shelved before it are considered.
+    stop = read.position(book)
 
     # Genre matches first (up to 3)
     if book.subjects:
-        book_genre_set = set(book.subjects)
-        for other in state.BOOK_NODES:
-            if other.id in seen_ids or len(similar) >= 3:
+        others = read.with_any_subject(
+            book.subjects, limit=3,
+            where=lambda other: read.position(other) < stop and other.author != book.author,
+        )
+        for other in others:
+            if other.id in seen_ids or read.position(other) >= stop:
                 break
-            if other.subjects and other.author != book.author:
-                shared = book_genre_set & set(other.subjects)
-                if shared:
-                    similar.append({
-                        "id": other.id,
-                        "title": other.title,
-                        "author": other.author,
-                        "cover_url": other.cover_url,
-                        "reason": f"Shares genre: {next(iter(shared))}",
-                    })
-                    seen_ids.add(other.id)
-
-    # Same-author fills remaining slots (up to 2)
-    for other in state.BOOK_NODES:
-        if other.id in seen_ids or len(similar) >= 5:
-            break
-        if other.author == book.author:
-            reason = "Shared universe" if _detect_series(book.title, other.title) else "Same author"
+            other_subjects = set(other.subjects)
             similar.append({
                 "id": other.id,
                 "title": other.title,
                 "author": other.author,
                 "cover_url": other.cover_url,
-                "reason": reason,
+                "reason": f"Shares genre: {next(s for s in book.subjects if s in other_subjects)}",
             })
             seen_ids.add(other.id)
+            # A later duplicate row of this book ends the scan as well.
+            stop = min([stop, *(read.position(dup) for dup in read.all_with_id(other.id)
+                                if read.position(dup) > read.position(other))])
+
+    # Same-author fills remaining slots (up to 2)
+    stop = min(read.position(read.get(seen_id)) for seen_id in seen_ids)
+    others = read.by_author(
+        book.author, limit=5 - len(similar),
+        where=lambda other: read.position(other) < stop and other.author == book.author,
+    )
+    for other in others:
+        if other.id in seen_ids:
+            break
+        reason = "Shared universe" if _detect_series(book.title, other.title) else "Same author"
+        similar.append({
+            "id": other.id,
+            "title": other.title,
+            "author": other.author,
+            "cover_url": other.cover_url,
+            "reason": reason,
+        })
+        seen_ids.add(other.id)
 
     return JsonResponse({
         "id": book.id,
@@ -667,17 +840,14 @@ def best_recommendation_view(request):
     if not state.BOOK_NODES:
         return JsonResponse({"error": "No data loaded"}, status=404)
 
-    genre_counts: dict = {}
-    for book in state.BOOK_NODES:
-        for genre in book.subjects or []:
-            genre_counts[genre] = genre_counts.get(genre, 0) + 1
-
+    shelf = state.LIBRARY_INDEX.read
+    genre_counts = shelf.subject_counts
     if not genre_counts:
         return JsonResponse({"error": "No genre data available"}, status=404)
 
-    read_authors = {b.author for b in state.BOOK_NODES}
-    read_titles_norm = {normalize_title(b.title).lower() for b in state.BOOK_NODES}
-    top_genres = sorted(genre_counts, key=genre_counts.get, reverse=True)[:3]
+    read_authors = shelf.author_counts
+    read_titles_norm = shelf.titles()
+    top_genres = shelf.top_subjects(3)
 
     candidates = []
     seen_norms: set = set()
@@ -715,23 +885,26 @@ def filter_options_view(request):
     if not state.BOOK_NODES:
         return JsonResponse({"genres": [], "authors": [], "year_min": 1900, "year_max": 2024})
 
-    genre_counts: dict = {}
-    authors: set = set()
-    years = []
+    shelf = state.LIBRARY_INDEX.read
+    year_min, year_max = shelf.year_range() or (1900, 2024)
 
-    for book in state.BOOK_NODES:
-        if book.author:
-            authors.add(book.author)
-        for genre in book.subjects or []:
-            genre_counts[genre] = genre_counts.get(genre, 0) + 1
-        if book.first_publish_year:
-            years.append(book.first_publish_year)
+    return JsonResponse({
+        "genres": shelf.top_subjects(30),
+        "authors": sorted(author for author in shelf.author_counts if author),
+        "year_min": year_min,
+        "year_max": year_max,
+    })
 
-    top_genres = sorted(genre_counts, key=genre_counts.get, reverse=True)[:30]
 
+def upstream_diagnostics_view(request):
+    """Return per-host breaker/limiter state, per-fetcher single-flight counts, the last
+    community detection run, ego-graph page cache counters, precompute progress and
+    local corpus counters."""
     return JsonResponse({
-        "genres": top_genres,
-        "authors": sorted(authors),
-        "year_min": min(years) if years else 1900,
-        "year_max": max(years) if years else 2024,
+        "upstreams": transport.diagnostics(),
+        "single_flight": singleflight.stats(),
+        "communities": state.COMMUNITY_REPORT,
+        "graph_cache": graph_cache.stats(),
+        "precompute": state.PRECOMPUTE_PROGRESS,
+        "local_corpus": corpus.stats(),
     })
@@ -42,6 +42,7 @@ function App() {
   const [selectedBook, setSelectedBook] = useState(null);
   const [isUploading, setIsUploading] = useState(false);
   const [uploadProgress, setUploadProgress] = useState({ phase: "idle", current: 0, total: 0 });
+  const [uploadJobId, setUploadJobId] = useState(null);
 
   // Graph state
   const [graphMode, setGraphMode] = useState("universe"); // "universe" | "cluster" | "network" | "book"
@@ -176,6 +177,7 @@ function App() {
       setTimeView("overall");
       setUniverseVersion(0);
       setBgProgress({ current: 0, total: 0, done: false });
+      setUploadJobId(data.job_id || null);
       setError(null);
     } catch (err) {
       setError(err.message);
@@ -231,6 +233,41 @@ function App() {
     return () => clearInterval(interval);
   }, [stats, graphMode]);
 
+  // Poll the upload job until the graph is built, then merge its covers and load the universe
+  useEffect(() => {
+    if (!uploadJobId) return;
+    const interval = setInterval(async () => {
+      try {
+        const res = await fetch(`${API}/jobs/${uploadJobId}/`);
+        if (!res.ok) { setUploadJobId(null); return; }
+        const job = await res.json();
+        if (job.status === "failed") {
+          setError(job.error || "Building your reading graph failed");
+          setUploadJobId(null);
+          return;
+        }
+        if (!job.result_ready) return;
+        setUploadJobId(null);
+        const result = await (await fetch(`${API}/jobs/${uploadJobId}/result/`)).json();
+        setStats(prev => prev && ({
+          ...prev,
+          books: prev.books.map(book => {
+            const found = result.books?.find(b => b.id === book.id);
+            return found?.cover_url ? { ...book, cover_url: found.cover_url } : book;
+          }),
+        }));
+        setUniverseVersion(prev => {
+          if ((result.universe_version || 0) > prev) {
+            if (graphMode === "universe") setGraphLoading(true);
+            return result.universe_version;
+          }
+          return prev;
+        });
+      } catch (_) {}
+    }, 1000);
+    return () => clearInterval(interval);
+  }, [uploadJobId, graphMode]);
+
   // Poll upload progress
   useEffect(() => {
     if (!isUploading) return;